@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
+# requests run their sync code on short-lived threads, so don't keep
+# connections per thread; a PostgreSQL pool still reuses them
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
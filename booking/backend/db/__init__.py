@@ -0,0 +1,96 @@
+"""
+Database backends wrapping Django's SQLite and PostgreSQL ones, so each worker
+process can report how its connections are checked out, kept and
+health-checked.
+"""
+from django.db import connections
+import threading, time
+
+
+class ConnectionStats:
+    """
+    Per-process counters for every database alias. A checkout is a worker
+    thread getting a connection: opening a new one, or taking one from the
+    pool when the alias has one. A thread that keeps its connection across
+    requests (CONN_MAX_AGE) serves them without a checkout.
+    """
+    _lock = threading.Lock()
+    _counters = {}
+
+    @classmethod
+    def _get(cls, alias: str) -> dict:
+        return cls._counters.setdefault(alias, {
+            "checkouts": 0,
+            "checkoutErrors": 0,
+            "returns": 0,
+            "waitMs": 0.0,
+            "maxWaitMs": 0.0,
+            "healthChecks": 0,
+            "healthCheckFailures": 0,
+        })
+
+    @classmethod
+    def recordCheckout(cls, alias: str, seconds: float):
+        waitMs = seconds * 1000
+        with cls._lock:
+            counters = cls._get(alias)
+            counters["checkouts"] += 1
+            counters["waitMs"] += waitMs
+            counters["maxWaitMs"] = max(counters["maxWaitMs"], waitMs)
+
+    @classmethod
+    def record(cls, alias: str, name: str):
+        with cls._lock:
+            cls._get(alias)[name] += 1
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        result = {}
+        for alias in connections:
+            wrapper = connections[alias]
+            with cls._lock:
+                counters = dict(cls._get(alias))
+            counters["open"] = counters["checkouts"] - counters["returns"]
+            counters["avgWaitMs"] = counters["waitMs"] / counters["checkouts"] if counters["checkouts"] else 0.0
+            result[alias] = {
+                "vendor": wrapper.vendor,
+                "connMaxAge": wrapper.settings_dict["CONN_MAX_AGE"],
+                "healthChecksEnabled": wrapper.settings_dict["CONN_HEALTH_CHECKS"],
+                **counters,
+            }
+            # psycopg_pool's own view: size, idle connections, queued checkouts
+            pool = getattr(wrapper, "pool", None)
+            if pool is not None:
+                result[alias]["pool"] = pool.get_stats()
+        return result
+
+
+class InstrumentedDatabaseWrapper:
+    """
+    Mixin for a backend's DatabaseWrapper. With a pool `get_new_connection`
+    is the wait for a free pooled connection, otherwise the connect itself.
+    """
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        try:
+            connection = super().get_new_connection(conn_params)
+        except Exception:
+            ConnectionStats.record(self.alias, "checkoutErrors")
+            raise
+        ConnectionStats.recordCheckout(self.alias, time.perf_counter() - started)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            ConnectionStats.record(self.alias, "returns")
+        return super()._close()
+
+    def is_usable(self):
+        usable = self.checkHealth()
+        ConnectionStats.record(self.alias, "healthChecks")
+        if not usable:
+            ConnectionStats.record(self.alias, "healthCheckFailures")
+        return usable
+
+    def checkHealth(self) -> bool:
+        return super().is_usable()
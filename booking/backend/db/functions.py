@@ -0,0 +1,49 @@
+"""
+Database functions the backends in this package provide.
+"""
+from django.db.models import BooleanField, Func
+import datetime
+
+
+def occupancyBusy(bitmap, firstDay, start, end) -> bool:
+    """
+    Whether a RealtyOccupancy bitmap has a night in [start, end); SQLite
+    calls it as occupancy_busy() with the dates as ISO strings.
+    """
+    if bitmap is None:
+        return False
+    firstDay, start, end = (datetime.date.fromisoformat(day) for day in (firstDay, start, end))
+    offset = (start - firstDay).days
+    nights = (end - start).days
+    if offset < 0:
+        nights += offset
+        offset = 0
+    if nights <= 0:
+        return False
+    bits = int.from_bytes(bytes(bitmap), "little")
+    return bool(bits & (((1 << nights) - 1) << offset))
+
+
+class OccupancyBusy(Func):
+    """
+    `OccupancyBusy("bitmap", "first_day", start, end)`: true when the bitmap
+    has a night in [start, end), so availability is filtered in the query
+    instead of by a list of busy ids.
+    """
+    function = "occupancy_busy"
+    arity = 4
+    output_field = BooleanField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # bit n of get_bit() is bit n of the little-endian bitmap
+        (bitmap, bitmapParams), (firstDay, firstDayParams), (start, startParams), (end, endParams) = (
+            compiler.compile(expression) for expression in self.get_source_expressions()
+        )
+        sql = (
+            f"EXISTS (SELECT 1 FROM generate_series("
+            f"GREATEST(0, {start}::date - {firstDay}), "
+            f"LEAST({end}::date - {firstDay}, octet_length({bitmap}) * 8) - 1"
+            f") AS night WHERE get_bit({bitmap}, night) = 1)"
+        )
+        params = (*startParams, *firstDayParams, *endParams, *firstDayParams, *bitmapParams, *bitmapParams)
+        return sql, params
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from backend.db import InstrumentedDatabaseWrapper
+
+
+class DatabaseWrapper(InstrumentedDatabaseWrapper, base.DatabaseWrapper):
+    pass
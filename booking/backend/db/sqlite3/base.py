@@ -0,0 +1,20 @@
+from django.db.backends.sqlite3 import base
+
+from backend.db import InstrumentedDatabaseWrapper
+from backend.db.functions import occupancyBusy
+
+
+class DatabaseWrapper(InstrumentedDatabaseWrapper, base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        connection.create_function("occupancy_busy", 4, occupancyBusy, deterministic=True)
+        return connection
+
+    def checkHealth(self) -> bool:
+        # Django takes a SQLite connection as always usable; ping it so one kept
+        # across requests is checked the same way a server connection is
+        try:
+            self.connection.execute("SELECT 1").close()
+        except self.Database.Error:
+            return False
+        return True
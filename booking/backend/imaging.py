@@ -0,0 +1,88 @@
+"""
+Image derivative rendering. Kept free of Django imports so it can run in
+spawned worker processes without setting up the project.
+"""
+from pathlib import Path
+from PIL import Image, ImageOps, UnidentifiedImageError
+import os, re
+
+
+# Pillow save format for the original-format copy, by file extension
+SAVE_FORMATS = {
+    ".jpg": "JPEG",
+    ".jpeg": "JPEG",
+    ".png": "PNG",
+    ".bmp": "BMP",
+}
+
+SAVE_OPTIONS = {
+    "WEBP": {"quality": 82, "method": 4},
+    "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "BMP": {},
+}
+
+
+# "<sha256>.<ext>" and its derivatives "<sha256>.<size>.<ext>"
+CONTENT_NAME = re.compile(r"^([0-9a-f]{64})\.")
+
+
+def itemRelativePath(itemName: str) -> str:
+    """
+    Content-addressed names live in `ab/cd/` shards taken from the digest,
+    older random names stay at the storage root.
+    """
+    match = CONTENT_NAME.match(itemName)
+    if not match:
+        return itemName
+    digest = match.group(1)
+    return f"{digest[:2]}/{digest[2:4]}/{itemName}"
+
+
+def derivativeName(itemName: str, size: str, ext: str) -> str:
+    stem, _, _ = itemName.rpartition(".")
+    return f"{stem}.{size}{ext}"
+
+
+def renderDerivatives(basePath: str, itemName: str, sizes: dict, force: bool = False) -> list:
+    """
+    Writes a WebP and an original-format copy of `itemName` for every
+    `size -> longest side` entry and returns the names written. Files are
+    written under a temporary name and renamed, so a half-written derivative
+    is never served.
+    """
+    base = Path(basePath)
+    ext = Path(itemName).suffix.lower()
+    if ext not in SAVE_FORMATS:
+        return []
+
+    try:
+        with Image.open(base / itemRelativePath(itemName)) as source:
+            source = ImageOps.exif_transpose(source)
+            source.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        return []
+
+    written = []
+    for size, longestSide in sizes.items():
+        targets = [(".webp", "WEBP"), (ext, SAVE_FORMATS[ext])]
+        targets = [
+            (derivativeName(itemName, size, targetExt), imageFormat)
+            for targetExt, imageFormat in targets
+        ]
+        if not force and all((base / itemRelativePath(name)).exists() for name, _ in targets):
+            continue
+
+        image = source.copy()
+        image.thumbnail((longestSide, longestSide), Image.Resampling.LANCZOS)
+
+        for name, imageFormat in targets:
+            converted = image
+            if imageFormat == "JPEG" and converted.mode not in ("RGB", "L"):
+                converted = converted.convert("RGB")
+            path = base / itemRelativePath(name)
+            tmpPath = path.with_name(f".{name}.{os.getpid()}.tmp")
+            converted.save(tmpPath, format=imageFormat, **SAVE_OPTIONS[imageFormat])
+            os.replace(tmpPath, path)
+            written.append(name)
+    return written
@@ -0,0 +1,75 @@
+"""
+Read/write splitting across the primary ("default") and the replica aliases
+configured from DATABASE_REPLICAS.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+import random
+
+
+# reads of the current context go to the primary
+_pinned = ContextVar("pinned_to_primary", default=False)
+# set by ReplicaStickinessMiddleware, flagged once the request writes
+_writes = ContextVar("request_writes", default=None)
+
+
+def replicaAliases() -> list:
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+@contextmanager
+def usePrimary():
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+@contextmanager
+def trackWrites(pinned: bool):
+    """Scope of one request: `pinned` sends its reads to the primary."""
+    marker = {"wrote": False}
+    pinnedToken = _pinned.set(pinned)
+    writesToken = _writes.set(marker)
+    try:
+        yield marker
+    finally:
+        _writes.reset(writesToken)
+        _pinned.reset(pinnedToken)
+
+
+class ReplicaRouter:
+    """
+    Writes go to the primary, reads to a random replica unless the context is
+    pinned (a client that just wrote, a response-cache fill) or the primary
+    has a transaction open, whose reads must see its own writes.
+    Replicas are copies of the primary and are never migrated directly.
+    """
+    def __init__(self):
+        self.replicas = replicaAliases()
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or _pinned.get() or connections["default"].in_atomic_block:
+            return "default"
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        marker = _writes.get()
+        if marker is not None:
+            marker["wrote"] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {"default", *self.replicas}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
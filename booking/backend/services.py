@@ -1,10 +1,23 @@
 from abc import ABC, abstractmethod
-from django.db.models import Prefetch
+from django.db import connection, transaction
+from django.db.models import Prefetch, F, Q, Case, When, Value, FloatField, Exists, OuterRef, Count, Max
+from django.db.models.functions import Cast
+from django.utils import timezone
 from main.models import * 
 from pathlib import Path
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import UploadedFile
-import hashlib, hmac, base64, json, random
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from collections import OrderedDict, namedtuple
+from backend.imaging import CONTENT_NAME, derivativeName, itemRelativePath, renderDerivatives
+from backend.db.functions import OccupancyBusy
+from backend.routers import usePrimary
+import hashlib, hmac, base64, json, random, datetime, threading, time, multiprocessing, os, math, queue, functools, contextvars, logging
+
+
+logger = logging.getLogger(__name__)
 
 # SERVICES
 
@@ -24,6 +37,110 @@ class PbKdfService(IKdfService):
     
     def hash(self, input:str) -> str:
         return hashlib.sha1(input.encode('utf-8')).hexdigest().upper()
+
+class KdfBusyError(Exception):
+    pass
+
+class KdfService(IKdfService):
+    """
+    Password hashing with the algorithm and cost stored per record in `dk`:
+    `$scrypt$n=16384,r=8,p=1$<base64>` or `$pbkdf2-sha256$i=600000$<base64>`.
+    Values without the `$` prefix are legacy PbKdfService digests. New hashes
+    use KDF_ALGORITHM at the configured cost, and `needsRehash` flags every
+    record that is behind it.
+    """
+    def __init__(self, algorithm: str = None, params: dict = None):
+        self.algorithm = algorithm or settings.KDF_ALGORITHM
+        self.params = params or self.defaultParams(self.algorithm)
+        self.legacy = PbKdfService()
+
+    def defaultParams(self, algorithm: str) -> dict:
+        if algorithm == "scrypt":
+            return {"n": settings.KDF_SCRYPT_N, "r": settings.KDF_SCRYPT_R, "p": settings.KDF_SCRYPT_P}
+        if algorithm == "pbkdf2-sha256":
+            return {"i": settings.KDF_PBKDF2_ITERATIONS}
+        raise ValueError(f"Unsupported KDF algorithm '{algorithm}'")
+
+    def dk(self, password: str, salt: str) -> str:
+        derived = self._derive(self.algorithm, self.params, password, salt)
+        return self._encode(self.algorithm, self.params, derived)
+
+    def verify(self, password: str, salt: str, encoded: str) -> bool:
+        if not encoded.startswith("$"):
+            return hmac.compare_digest(self.legacy.dk(password, salt), encoded)
+        algorithm, params, expected = self._decode(encoded)
+        return hmac.compare_digest(self._derive(algorithm, params, password, salt), expected)
+
+    def needsRehash(self, encoded: str) -> bool:
+        if not encoded.startswith("$"):
+            return True
+        algorithm, params, _ = self._decode(encoded)
+        return algorithm != self.algorithm or params != self.params
+
+    def _derive(self, algorithm: str, params: dict, password: str, salt: str) -> bytes:
+        password, salt = password.encode('utf-8'), salt.encode('utf-8')
+        if algorithm == "scrypt":
+            n, r, p = params["n"], params["r"], params["p"]
+            return hashlib.scrypt(
+                password,
+                salt=salt,
+                n=n,
+                r=r,
+                p=p,
+                maxmem=128 * r * (n + p + 2) + 1024 * 1024,
+                dklen=32
+            )
+        if algorithm == "pbkdf2-sha256":
+            return hashlib.pbkdf2_hmac("sha256", password, salt, params["i"], dklen=32)
+        raise ValueError(f"Unsupported KDF algorithm '{algorithm}'")
+
+    def _encode(self, algorithm: str, params: dict, derived: bytes) -> str:
+        paramText = ",".join(f"{name}={value}" for name, value in params.items())
+        return f"${algorithm}${paramText}${base64.b64encode(derived).decode('utf-8').rstrip('=')}"
+
+    def _decode(self, encoded: str) -> tuple:
+        _, algorithm, paramText, derived = encoded.split("$")
+        params = {name: int(value) for name, value in (item.split("=") for item in paramText.split(","))}
+        return algorithm, params, base64.b64decode(derived + "=" * (-len(derived) % 4))
+
+class PasswordVerifier:
+    """
+    Runs KDF verification on a bounded thread pool; hashlib releases the GIL
+    while hashing, so verifications really run in parallel. At most
+    KDF_MAX_PENDING are admitted at once: past that a login waits up to
+    KDF_QUEUE_TIMEOUT seconds for a slot and then fails with KdfBusyError
+    instead of piling more work onto the CPU. Hashing a new password goes
+    through the same pool and slots.
+    """
+    _pool = None
+    _slots = None
+    _lock = threading.Lock()
+
+    def __init__(self, kdfService: KdfService = None):
+        self.kdfService = kdfService or KdfService()
+
+    def verify(self, password: str, salt: str, encoded: str) -> bool:
+        return self._run(self.kdfService.verify, password, salt, encoded)
+
+    def dk(self, password: str, salt: str) -> str:
+        return self._run(self.kdfService.dk, password, salt)
+
+    def _run(self, fn, *args):
+        pool, slots = self._getPool()
+        if not slots.acquire(timeout=settings.KDF_QUEUE_TIMEOUT):
+            raise KdfBusyError("Too many concurrent logins, try again later")
+        try:
+            return pool.submit(fn, *args).result()
+        finally:
+            slots.release()
+
+    @classmethod
+    def _getPool(cls) -> tuple:
+        with cls._lock:
+            if cls._pool is None:
+                cls._pool = ThreadPoolExecutor(max_workers=settings.KDF_WORKERS, thread_name_prefix="kdf")
+                cls._slots = threading.BoundedSemaphore(settings.KDF_MAX_PENDING)
+            return cls._pool, cls._slots
     
 class IRandomService(ABC):
     @abstractmethod
@@ -48,8 +165,6 @@ class IJwtService(ABC):
         pass
 
 class JwtService:
-    _default_secret = "JwtService"
-
     def _base64url_encode(self, data: bytes) -> str:
         return base64.urlsafe_b64encode(data).decode('utf-8').rstrip('=')
 
@@ -60,7 +175,7 @@ class JwtService:
         return base64.urlsafe_b64decode(payload)
 
     def sign(self, open_part: str, secret: str = None) -> str:
-        secret = secret or self._default_secret
+        secret = secret or settings.JWT_SECRET
         signature_bytes = hmac.new(
             secret.encode('utf-8'),
             open_part.encode('utf-8'),
@@ -69,7 +184,7 @@ class JwtService:
         return self._base64url_encode(signature_bytes)
 
     def encodeJwt(self, payload: dict, header: dict = None, secret: str = None) -> str:
-        secret = secret or self._default_secret
+        secret = secret or settings.JWT_SECRET
         if header is None:
             header = {"alg": "HS256", "typ": "JWT"}
 
@@ -89,7 +204,7 @@ class JwtService:
         if last_dot_index == -1:
             raise ValueError("Invalid format: dot was not found")
 
-        secret = secret or self._default_secret
+        secret = secret or settings.JWT_SECRET
         signature = jwt[last_dot_index + 1:]
         open_part = jwt[:last_dot_index]
 
@@ -111,6 +226,10 @@ class IStorageService(ABC):
     def getItemBytes(self, itemName: str) -> bytes:
         pass
 
+    @abstractmethod
+    def openItem(self, itemName: str):
+        pass
+
     @abstractmethod
     def tryGetMimeType(self, itemName: str) -> str:
         pass
@@ -119,16 +238,159 @@ class IStorageService(ABC):
     def saveItem(self, formFile: UploadedFile) -> str:
         pass
 
+class InvalidItemError(ValueError):
+    pass
+
+# name of a stored upload and whether this upload created the file
+StoredItem = namedtuple("StoredItem", ["name", "created"])
+
+class ByteLruCache:
+    """
+    Least-recently-used cache bounded by the total size of its values in
+    bytes. Values larger than `maxItemBytes` are never stored.
+    """
+    def __init__(self, maxBytes: int, maxItemBytes: int):
+        self.maxBytes = maxBytes
+        self.maxItemBytes = maxItemBytes
+        self.currentBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def accepts(self, size: int) -> bool:
+        return size <= self.maxItemBytes and size <= self.maxBytes
+
+    def get(self, key, version=None) -> bytes:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value: bytes, version=None):
+        if not self.accepts(len(value)):
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (version, value)
+            self.currentBytes += len(value)
+            while self.currentBytes > self.maxBytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.currentBytes,
+                "maxBytes": self.maxBytes,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.currentBytes -= len(entry[1])
+
+
 class DiskStorageService(IStorageService):
+    """
+    Stores uploads under STORAGE_PATH and renders the IMAGE_DERIVATIVES sizes
+    of every saved image in a shared process pool, off the request path.
+
+    In the "content" layout an upload is named after the SHA-256 of its bytes
+    and sharded as `ab/cd/<sha256>.<ext>`, so identical uploads share one
+    file. Names saved by the older "flat" layout keep resolving at the root.
+    """
+    MAGIC_NUMBERS = (
+        (b"\xff\xd8\xff", "image/jpeg"),
+        (b"\x89PNG\r\n\x1a\n", "image/png"),
+        (b"BM", "image/bmp"),
+    )
+
+    _derivativePool = None
+    _uploadPool = None
+    _poolLock = threading.Lock()
+    # shared by every instance in the process
+    itemCache = ByteLruCache(settings.STORAGE_CACHE_BYTES, settings.STORAGE_CACHE_MAX_ITEM_BYTES)
+
     def __init__(self):
         self.basePath = Path(settings.STORAGE_PATH)
 
     def getItemBytes(self, itemName: str) -> bytes:
-        path = self.basePath / itemName
-        if path.exists():
-            return path.read_bytes()
+        path = self.getItemPath(itemName)
+        stat = path.stat()
+        # a file re-rendered in place (a forced derivative) gets a new version
+        version = (stat.st_mtime_ns, stat.st_size)
+        content = self.itemCache.get(itemName, version)
+        if content is None:
+            content = path.read_bytes()
+            self.itemCache.put(itemName, content, version)
+        return content
+
+    def isCacheable(self, size: int) -> bool:
+        return self.itemCache.accepts(size)
+
+    def getItemPath(self, itemName: str) -> Path:
+        path = self.basePath / itemRelativePath(itemName)
+        if path.is_file():
+            return path
         raise FileNotFoundError(f"File '{itemName}' was not found in storage.")
 
+    def openItem(self, itemName: str):
+        return self.getItemPath(itemName).open("rb")
+
+    def resolveItem(self, itemName: str, size: str = None, acceptWebp: bool = False) -> str:
+        """
+        Name of the file to serve for `size`: the WebP derivative when the
+        client accepts it, then the original-format one, and the original
+        itself while the derivatives are not rendered yet.
+        """
+        if not size:
+            return itemName
+        candidates = [derivativeName(itemName, size, ".webp")] if acceptWebp else []
+        candidates.append(derivativeName(itemName, size, self._getFileExtension(itemName)))
+        for candidate in candidates:
+            if (self.basePath / itemRelativePath(candidate)).is_file():
+                return candidate
+        return itemName
+
+    def scheduleDerivatives(self, itemName: str, force: bool = False):
+        future = self._getDerivativePool().submit(
+            renderDerivatives,
+            str(self.basePath),
+            itemName,
+            settings.IMAGE_DERIVATIVES,
+            force
+        )
+        # nobody waits on the render, so its failure is only ever seen in the log
+        future.add_done_callback(functools.partial(self._logDerivativeFailure, itemName))
+        return future
+
+    def _logDerivativeFailure(self, itemName: str, future: Future):
+        if future.cancelled() or future.exception() is None:
+            return
+        logger.error("Rendering derivatives of '%s' failed", itemName, exc_info=future.exception())
+
+    @classmethod
+    def _getDerivativePool(cls) -> ProcessPoolExecutor:
+        with cls._poolLock:
+            if cls._derivativePool is None:
+                # spawned workers only import backend.imaging, never the project
+                cls._derivativePool = ProcessPoolExecutor(
+                    max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return cls._derivativePool
+
     def tryGetMimeType(self, itemName: str) -> str:
         ext = self._getFileExtension(itemName).lower()
         mapping = {
@@ -137,21 +399,124 @@ class DiskStorageService(IStorageService):
             ".png": "image/png",
             ".bmp": "image/bmp",
             ".svg": "image/svg+xml",
+            ".webp": "image/webp",
         }
         if ext in mapping:
             return mapping[ext]
         raise ValueError(f"Unsupported exception '{ext}'")
 
     def saveItem(self, formFile: UploadedFile) -> str:
+        stored = self._storeUpload(formFile)
+        self.scheduleDerivatives(stored.name)
+        return stored.name
+
+    def saveItems(self, formFiles: list) -> list:
+        """
+        Stores uploads concurrently on the upload pool and returns a
+        StoredItem per file, in order. If any upload fails, the files created
+        by this call are removed and the first error is raised. Derivatives
+        are left to the caller, which schedules them once the rows exist.
+        """
+        futures = [self._getUploadPool().submit(self._storeUpload, formFile) for formFile in formFiles]
+        stored, error = [], None
+        for future in futures:
+            try:
+                stored.append(future.result())
+            except Exception as e:
+                error = error or e
+        if error:
+            self.discardItems(stored)
+            raise error
+        return stored
+
+    def discardItems(self, storedItems: list):
+        """
+        Removes the files of a failed upload. A content-addressed blob is
+        kept even when this call created it: a concurrent upload of the same
+        bytes may already have deduplicated to it, with rows not committed
+        yet. `manage.py purge_storage` deletes it once nothing references it.
+        """
+        for stored in storedItems:
+            if stored.created and not CONTENT_NAME.match(stored.name):
+                self.deleteItem(stored.name)
+
+    def deleteItem(self, itemName: str):
+        ext = self._getFileExtension(itemName)
+        names = [itemName] + [
+            derivativeName(itemName, size, derivativeExt)
+            for size in settings.IMAGE_DERIVATIVES
+            for derivativeExt in (".webp", ext)
+        ]
+        for name in names:
+            (self.basePath / itemRelativePath(name)).unlink(missing_ok=True)
+
+    def _storeUpload(self, formFile: UploadedFile) -> "StoredItem":
+        """
+        One pass over the upload chunks: the first chunk is checked against
+        the magic bytes of the extension's type, every chunk is hashed (in
+        the content layout) and written to a temporary file that is then
+        moved into place.
+        """
         ext = self._getFileExtension(formFile.name)
-        savedName = f"{uuid.uuid4()}{ext}"
-        path = self.basePath / savedName
+        expected = self.tryGetMimeType(ext)
+        contentAddressed = settings.STORAGE_LAYOUT == "content"
+        digest = hashlib.sha256() if contentAddressed else None
+        tmpPath = self.basePath / f".upload-{uuid.uuid4()}.tmp"
+
+        try:
+            checked = False
+            with open(tmpPath, 'wb') as destination:
+                for chunk in formFile.chunks():
+                    if not checked:
+                        if self._sniffMimeType(chunk) != expected:
+                            raise InvalidItemError(f"'{formFile.name}' is not a valid {expected} file")
+                        checked = True
+                    if digest:
+                        digest.update(chunk)
+                    destination.write(chunk)
+            if not checked:
+                raise InvalidItemError(f"'{formFile.name}' is empty")
 
-        with open(path, 'wb+') as destination:
-            for chunk in formFile.chunks():
-                destination.write(chunk)
+            if contentAddressed:
+                savedName = f"{digest.hexdigest()}{ext.lower()}"
+            else:
+                savedName = f"{uuid.uuid4()}{ext}"
+            path = self.basePath / itemRelativePath(savedName)
+            created = not path.is_file()
+            if not created:
+                # a fresh mtime keeps purge_storage off the blob until our rows commit
+                try:
+                    os.utime(path)
+                except FileNotFoundError:
+                    created = True
+            if created:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # atomic, a concurrent upload of the same bytes just replaces it
+                os.replace(tmpPath, path)
+        finally:
+            tmpPath.unlink(missing_ok=True)
+        return StoredItem(savedName, created)
 
-        return savedName
+    def _sniffMimeType(self, head: bytes) -> str:
+        for magic, mimeType in self.MAGIC_NUMBERS:
+            if head.startswith(magic):
+                return mimeType
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return "image/webp"
+        text = head.lstrip()[:1024].lower()
+        if (text.startswith(b"<?xml") or text.startswith(b"<svg")) and b"<svg" in text:
+            return "image/svg+xml"
+        return None
+
+    @classmethod
+    def _getUploadPool(cls) -> ThreadPoolExecutor:
+        with cls._poolLock:
+            if cls._uploadPool is None:
+                cls._uploadPool = ThreadPoolExecutor(
+                    max_workers=settings.STORAGE_UPLOAD_WORKERS,
+                    thread_name_prefix="storage-upload"
+                )
+            return cls._uploadPool
     
     def _getFileExtension(self, filename: str) -> str:
         dotIndex = filename.rfind(".")
@@ -160,6 +525,506 @@ class DiskStorageService(IStorageService):
         return filename[dotIndex:]
 
 
+class OccupancyBitmap:
+    """
+    Nights of a realty as bits of a Python int: bit `n` is `origin + n days`.
+    A stay occupies the nights [check-in, check-out).
+    """
+    def __init__(self, origin: datetime.date = None, bits: int = 0):
+        self.origin = origin
+        self.bits = bits if origin else 0
+
+    @classmethod
+    def fromBytes(cls, origin: datetime.date, data: bytes) -> "OccupancyBitmap":
+        return cls(origin, int.from_bytes(bytes(data), "little"))
+
+    def toBytes(self) -> bytes:
+        return self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little")
+
+    @property
+    def isEmpty(self) -> bool:
+        return self.bits == 0
+
+    @property
+    def firstDay(self) -> datetime.date:
+        return self.origin
+
+    @property
+    def lastDay(self) -> datetime.date:
+        return self.origin + datetime.timedelta(days=self.bits.bit_length() - 1)
+
+    def mark(self, start: datetime.date, end: datetime.date):
+        nights = (end - start).days
+        if nights <= 0:
+            return
+        if self.origin is None or self.bits == 0:
+            self.origin = start
+        elif start < self.origin:
+            self.bits <<= (self.origin - start).days
+            self.origin = start
+        self.bits |= ((1 << nights) - 1) << (start - self.origin).days
+
+    def isFree(self, start: datetime.date, end: datetime.date) -> bool:
+        if self.bits == 0:
+            return True
+        offset = (start - self.origin).days
+        nights = (end - start).days
+        if offset < 0:
+            nights += offset
+            offset = 0
+        if nights <= 0:
+            return True
+        return not self.bits & (((1 << nights) - 1) << offset)
+
+
+class OccupancyService:
+    """
+    Keeps RealtyOccupancy in sync with live booking items and answers
+    "which realties are busy between two dates" without touching BookingItem.
+    """
+    def stayNights(self, startDate, endDate) -> tuple:
+        start = self._toDate(startDate)
+        end = self._toDate(endDate)
+        if end <= start:
+            end = start + datetime.timedelta(days=1)
+        return start, end
+
+    def markBooking(self, booking: BookingItem):
+        start, end = self.stayNights(booking.start_date, booking.end_date)
+        with transaction.atomic():
+            occupancy = RealtyOccupancy.objects.select_for_update().filter(realty_id=booking.realty_id).first()
+            bitmap = OccupancyBitmap()
+            if occupancy:
+                bitmap = OccupancyBitmap.fromBytes(occupancy.first_day, occupancy.bitmap)
+            bitmap.mark(start, end)
+            self._save(booking.realty_id, bitmap)
+
+    def rebuildRealty(self, realtyId):
+        with transaction.atomic():
+            RealtyOccupancy.objects.select_for_update().filter(realty_id=realtyId).first()
+            bitmap = OccupancyBitmap()
+            bookings = BookingItem.objects.filter(realty_id=realtyId, deleted_at__isnull=True)
+            for startDate, endDate in bookings.values_list("start_date", "end_date"):
+                bitmap.mark(*self.stayNights(startDate, endDate))
+            self._save(realtyId, bitmap)
+
+    def excludeBusy(self, realties, start: datetime.date, end: datetime.date):
+        """Realties of the queryset with every night of [start, end) free."""
+        busy = RealtyOccupancy.objects.filter(
+            OccupancyBusy("bitmap", "first_day", start, end),
+            realty=OuterRef("pk"),
+            first_day__lt=end,
+            last_day__gte=start
+        )
+        return realties.filter(~Exists(busy))
+
+    def _save(self, realtyId, bitmap: OccupancyBitmap):
+        if bitmap.isEmpty:
+            RealtyOccupancy.objects.filter(realty_id=realtyId).delete()
+            return
+        RealtyOccupancy.objects.update_or_create(
+            realty_id=realtyId,
+            defaults={
+                "first_day": bitmap.firstDay,
+                "last_day": bitmap.lastDay,
+                "bitmap": bitmap.toBytes()
+            }
+        )
+
+    def _toDate(self, value) -> datetime.date:
+        if isinstance(value, str):
+            value = datetime.datetime.fromisoformat(value)
+        if isinstance(value, datetime.datetime):
+            if timezone.is_aware(value):
+                value = timezone.localtime(value)
+            return value.date()
+        return value
+
+
+class AvailabilityCalendarService:
+    """
+    Merged occupied intervals of a realty. Intervals are cached per realty and
+    calendar month, so a window only queries the months that are not cached,
+    with one range query over `(realty, start_date, end_date)`. With
+    CALENDAR_CACHE off every window is queried.
+    """
+    def getOccupied(self, realtyId, start: datetime.date, end: datetime.date) -> list:
+        months = self._months(start, end)
+        keys = {month: self._key(realtyId, month) for month in months}
+        cached = cache.get_many(keys.values()) if settings.CALENDAR_CACHE else {}
+
+        missing = [month for month in months if keys[month] not in cached]
+        if missing:
+            # a lagging replica must not be frozen into the cache
+            with usePrimary():
+                fetched = self._fetchMonths(realtyId, missing)
+            if settings.CALENDAR_CACHE:
+                cache.set_many(
+                    {keys[month]: fetched[month] for month in missing},
+                    settings.CALENDAR_CACHE_TTL
+                )
+            cached.update({keys[month]: fetched[month] for month in missing})
+
+        windowStart, windowEnd = self._dayStart(start), self._dayStart(end)
+        intervals = []
+        for month in months:
+            for intervalStart, intervalEnd in cached[keys[month]]:
+                intervalStart = max(intervalStart, windowStart)
+                intervalEnd = min(intervalEnd, windowEnd)
+                if intervalStart < intervalEnd:
+                    intervals.append((intervalStart, intervalEnd))
+        return self._merge(intervals)
+
+    def invalidate(self, realtyId, startDate, endDate):
+        keys = [self._key(realtyId, month) for month in self._months(startDate, endDate)]
+        # after commit, so a reader cannot re-cache the rows we are replacing
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+    def _fetchMonths(self, realtyId, months: list) -> dict:
+        bounds = {month: (self._dayStart(month), self._dayStart(self._nextMonth(month))) for month in months}
+        rangeStart = min(lower for lower, _ in bounds.values())
+        rangeEnd = max(upper for _, upper in bounds.values())
+
+        rows = (
+            BookingItem.objects
+            .filter(
+                realty_id=realtyId,
+                deleted_at__isnull=True,
+                start_date__lt=rangeEnd,
+                end_date__gt=rangeStart
+            )
+            .order_by("start_date")
+            .values_list("start_date", "end_date")
+        )
+        result = {month: [] for month in months}
+        for bookingStart, bookingEnd in rows:
+            for month, (lower, upper) in bounds.items():
+                if bookingStart < upper and bookingEnd > lower:
+                    result[month].append((max(bookingStart, lower), min(bookingEnd, upper)))
+        return {month: self._merge(intervals) for month, intervals in result.items()}
+
+    def _merge(self, intervals: list) -> list:
+        merged = []
+        for intervalStart, intervalEnd in sorted(intervals):
+            if merged and intervalStart <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], intervalEnd))
+            else:
+                merged.append((intervalStart, intervalEnd))
+        return merged
+
+    def _months(self, start, end) -> list:
+        start, end = self._toDate(start), self._toDate(end)
+        month = start.replace(day=1)
+        months = []
+        while month <= end:
+            months.append(month)
+            month = self._nextMonth(month)
+        return months
+
+    def _nextMonth(self, month: datetime.date) -> datetime.date:
+        return (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+    def _dayStart(self, day: datetime.date) -> datetime.datetime:
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+    def _toDate(self, value) -> datetime.date:
+        if isinstance(value, datetime.datetime):
+            return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+        return value
+
+    def _key(self, realtyId, month: datetime.date) -> str:
+        return f"realty-calendar:{realtyId}:{month:%Y-%m}"
+
+
+class ResponseCacheService:
+    """
+    Serialized read responses keyed by the normalized request parameters and
+    the current version of every scope the response depends on. Writes bump
+    the versions instead of deleting entries: an outdated entry is never
+    addressed again and just expires.
+
+    Versions are only meaningful in a cache every worker shares; with
+    RESPONSE_CACHE off producers run on every call and ETags digest the row
+    count and latest `updated_at` of the tables behind each scope instead,
+    which every worker sees change.
+    """
+    def enabled(self) -> bool:
+        return settings.RESPONSE_CACHE
+
+    def getOrSet(self, namespace: str, params, scopes: list, producer):
+        if not self.enabled():
+            return producer()
+        # versions are read before the producer queries, so data read before a
+        # write can only ever be stored under a version the write has retired
+        key = self._key(namespace, params, self.versions(scopes))
+        data = cache.get(key)
+        if data is None:
+            # fills read the primary: one entry serves every later hit, so a
+            # replica lagging behind the version bump must not be cached
+            with usePrimary():
+                data = producer()
+            cache.set(key, data, settings.RESPONSE_CACHE_TTL)
+        return data
+
+    def versions(self, scopes: list) -> list:
+        keys = [self._versionKey(scope) for scope in scopes]
+        found = cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                # seeded from the clock, so an evicted counter never comes back
+                # with a version an older entry was stored under
+                cache.add(key, time.time_ns(), None)
+                found[key] = cache.get(key)
+        return [found[key] for key in keys]
+
+    async def agetOrSet(self, namespace: str, params, scopes: list, producer):
+        """
+        `getOrSet` for async views with a coroutine `producer`. Hits never
+        leave the event loop; wrap ORM-bound sync producers in sync_to_async.
+        """
+        if not self.enabled():
+            return await producer()
+        key = self._key(namespace, params, await self.aversions(scopes))
+        data = await cache.aget(key)
+        if data is None:
+            with usePrimary():
+                data = await producer()
+            await cache.aset(key, data, settings.RESPONSE_CACHE_TTL)
+        return data
+
+    async def aversions(self, scopes: list) -> list:
+        keys = [self._versionKey(scope) for scope in scopes]
+        found = await cache.aget_many(keys)
+        for key in keys:
+            if key not in found:
+                await cache.aadd(key, time.time_ns(), None)
+                found[key] = await cache.aget(key)
+        return [found[key] for key in keys]
+
+    async def aetag(self, namespace: str, params, scopes: list) -> str:
+        if self.enabled():
+            return f'"{self._digest(namespace, params, await self.aversions(scopes))}"'
+        return f'"{self._digest(namespace, params, await self.afingerprints(scopes))}"'
+
+    def bump(self, *scopes):
+        keys = [self._versionKey(scope) for scope in scopes]
+        transaction.on_commit(lambda: self._increment(keys))
+
+    def _increment(self, keys: list):
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), None)
+
+    def etag(self, namespace: str, params, scopes: list) -> str:
+        if self.enabled():
+            # same inputs as the cache key, so it changes exactly when the body can
+            return f'"{self._digest(namespace, params, self.versions(scopes))}"'
+        # a version another worker cannot bump would answer 304 forever
+        return f'"{self._digest(namespace, params, self.fingerprints(scopes))}"'
+
+    def fingerprints(self, scopes: list) -> list:
+        result = []
+        for scope in scopes:
+            for queryset in self._fingerprintQuerysets(scope):
+                fingerprint = queryset.aggregate(count=Count("pk"), updatedAt=Max("updated_at"))
+                result.append([fingerprint["count"], fingerprint["updatedAt"]])
+        return result
+
+    async def afingerprints(self, scopes: list) -> list:
+        result = []
+        for scope in scopes:
+            for queryset in self._fingerprintQuerysets(scope):
+                fingerprint = await queryset.aaggregate(count=Count("pk"), updatedAt=Max("updated_at"))
+                result.append([fingerprint["count"], fingerprint["updatedAt"]])
+        return result
+
+    def _fingerprintQuerysets(self, scope: str) -> list:
+        # the rows a scope's responses are built from, soft-deleted ones too:
+        # a soft delete is an update
+        name, _, key = scope.partition(":")
+        if name == "realty" and not key:
+            return [Realty.objects.all(), Feedback.objects.all(), ItemImage.objects.filter(realty__isnull=False)]
+        if name == "realty":
+            return [
+                Realty.objects.filter(id=key),
+                Feedback.objects.filter(realty_id=key),
+                ItemImage.objects.filter(realty_id=key)
+            ]
+        if name == "occupancy":
+            return [BookingItem.objects.all()]
+        raise ValueError(f"No fingerprint for scope '{scope}'")
+
+    def _key(self, namespace: str, params, versions: list) -> str:
+        return f"response:{namespace}:{self._digest(namespace, params, versions)}"
+
+    def _digest(self, namespace: str, params, versions: list) -> str:
+        if hasattr(params, "lists"):
+            params = dict(params.lists())
+        raw = json.dumps([namespace, params, versions], sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _versionKey(self, scope: str) -> str:
+        return f"response-version:{scope}"
+
+
+class WriteQueue:
+    """
+    SQLite allows one writer per database. With SQLITE_WRITE_QUEUE on, write
+    transactions are queued and run in order on one writer thread, so they
+    never wait on the database lock or retry after SQLITE_BUSY; readers keep
+    running in parallel under WAL. Calls from inside a transaction, from the
+    writer itself or on other databases run inline.
+    """
+    _queue = None
+    _thread = None
+    _lock = threading.Lock()
+
+    def enabled(self) -> bool:
+        return settings.SQLITE_WRITE_QUEUE and connection.vendor == "sqlite"
+
+    def run(self, fn, *args, **kwargs):
+        if not self.enabled() or connection.in_atomic_block or threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)
+        future = Future()
+        # the caller's context travels along, e.g. the request's write marker
+        context = contextvars.copy_context()
+        self._getQueue().put((future, context.run, (fn, *args), kwargs))
+        return future.result()
+
+    @classmethod
+    def _getQueue(cls) -> queue.SimpleQueue:
+        with cls._lock:
+            if cls._thread is None:
+                cls._queue = queue.SimpleQueue()
+                cls._thread = threading.Thread(target=cls._work, name="sqlite-writer", daemon=True)
+                cls._thread.start()
+            return cls._queue
+
+    @classmethod
+    def _work(cls):
+        while True:
+            future, fn, args, kwargs = cls._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                # the writer keeps its connection between jobs unless it broke
+                connection.close_if_unusable_or_obsolete()
+                future.set_exception(e)
+
+
+writeQueue = WriteQueue()
+
+
+def serializedWrite(method):
+    """Routes every call of a write method through the WriteQueue."""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        return writeQueue.run(method, *args, **kwargs)
+    return wrapper
+
+
+class BookingConflictError(Exception):
+    pass
+
+class BookingService:
+    """
+    Runs the overlap check and the booking write as one critical section per
+    realty: a row lock on the realty where the database supports
+    SELECT ... FOR UPDATE, an in-process lock where it does not (SQLite).
+
+    SQLite has a single writer per database, so a lock per realty would only
+    turn lock waits into "database is locked" errors when two transactions
+    upgrade from read to write at once; one lock serializes them instead.
+    With the WriteQueue on, writes already arrive one at a time and the lock
+    only matters for calls that run inline.
+    """
+    _writeLock = threading.Lock()
+
+    def __init__(
+        self,
+        occupancyService: OccupancyService = None,
+        calendarService: AvailabilityCalendarService = None,
+        responseCache: ResponseCacheService = None
+    ):
+        self.occupancyService = occupancyService or OccupancyService()
+        self.calendarService = calendarService or AvailabilityCalendarService()
+        self.responseCache = responseCache or ResponseCacheService()
+
+    @serializedWrite
+    def create(self, userAccess: UserAccess, realtyId, startDate, endDate) -> BookingItem:
+        with self._realtyLock(realtyId):
+            if self.hasOverlap(realtyId, startDate, endDate):
+                raise BookingConflictError("Realty already booked for selected dates")
+            booking = BookingItem.objects.create(
+                realty_id=realtyId,
+                start_date=startDate,
+                end_date=endDate,
+                user_access=userAccess
+            )
+            self.occupancyService.markBooking(booking)
+            self.calendarService.invalidate(realtyId, startDate, endDate)
+            self.responseCache.bump("occupancy", f"profile:{userAccess.login}")
+        return booking
+
+    @serializedWrite
+    def reschedule(self, bookingId, startDate, endDate) -> BookingItem:
+        realtyId = BookingItem.objects.values_list("realty_id", flat=True).get(id=bookingId)
+        with self._realtyLock(realtyId):
+            booking = BookingItem.objects.select_related("user_access").get(id=bookingId)
+            if self.hasOverlap(realtyId, startDate, endDate, excludeId=booking.id):
+                raise BookingConflictError("Realty already booked for selected dates")
+            self.calendarService.invalidate(realtyId, booking.start_date, booking.end_date)
+            booking.start_date = startDate
+            booking.end_date = endDate
+            booking.save(update_fields=["start_date", "end_date", "updated_at"])
+            self.occupancyService.rebuildRealty(realtyId)
+            self.calendarService.invalidate(realtyId, startDate, endDate)
+            self.responseCache.bump("occupancy", f"profile:{booking.user_access.login}")
+        return booking
+
+    @serializedWrite
+    def cancel(self, bookingId) -> BookingItem:
+        realtyId = BookingItem.objects.values_list("realty_id", flat=True).get(id=bookingId)
+        with self._realtyLock(realtyId):
+            booking = BookingItem.objects.select_related("user_access").get(id=bookingId)
+            booking.deleted_at = timezone.now()
+            booking.save(update_fields=["deleted_at", "updated_at"])
+            self.occupancyService.rebuildRealty(realtyId)
+            self.calendarService.invalidate(realtyId, booking.start_date, booking.end_date)
+            self.responseCache.bump("occupancy", f"profile:{booking.user_access.login}")
+        return booking
+
+    def hasOverlap(self, realtyId, startDate, endDate, excludeId=None) -> bool:
+        query = BookingItem.objects.filter(
+            realty_id=realtyId,
+            deleted_at__isnull=True,
+            start_date__lt=endDate,
+            end_date__gt=startDate
+        )
+        if excludeId:
+            query = query.exclude(id=excludeId)
+        return query.exists()
+
+    @contextmanager
+    def _realtyLock(self, realtyId):
+        if connection.features.has_select_for_update:
+            with transaction.atomic():
+                if not Realty.objects.select_for_update().filter(id=realtyId).values_list("id", flat=True):
+                    raise Realty.DoesNotExist()
+                yield
+            return
+
+        # the transaction commits before the lock is released
+        with self._writeLock, transaction.atomic():
+            if not Realty.objects.filter(id=realtyId).exists():
+                raise Realty.DoesNotExist()
+            yield
+
+
 #   ACCESSORS
 
 class UserAccessAccessor:
@@ -177,6 +1042,186 @@ class UserAccessAccessor:
         except UserAccess.DoesNotExist:
             return None
         
+class LikedRealtyAccessor:
+    def getLikedMap(self, userAccess: UserAccess, realtyIds: list = None) -> dict:
+        if userAccess is None:
+            return {}
+        query = LikedRealty.objects.filter(user_access=userAccess).only("id", "realty_id")
+        if realtyIds is not None:
+            query = query.filter(realty_id__in=realtyIds)
+        return {liked.realty_id: liked for liked in query}
+
+class FeedbackAccessor:
+    """
+    Feedback writes go through here so the denormalized rating columns on
+    Realty change in the same transaction as the feedback row.
+    """
+    def __init__(self, responseCache: ResponseCacheService = None):
+        self.responseCache = responseCache or ResponseCacheService()
+
+    @serializedWrite
+    def create(self, realty: Realty, userAccess: UserAccess, text: str, rate: int) -> Feedback:
+        with transaction.atomic():
+            feedback = Feedback.objects.create(
+                text=text,
+                rate=rate,
+                realty=realty,
+                user_access=userAccess
+            )
+            self._applyRating(realty.id, rate, 1)
+            self.responseCache.bump("realty", f"realty:{realty.id}")
+        return feedback
+
+    @serializedWrite
+    def update(self, feedbackId, text: str = None, rate: int = None, userAccessId=None) -> Feedback:
+        with transaction.atomic():
+            feedback = self._getForUpdate(feedbackId, userAccessId)
+            if text is not None:
+                feedback.text = text
+            if rate is not None and rate != feedback.rate:
+                self._applyRating(feedback.realty_id, rate - feedback.rate, 0)
+                feedback.rate = rate
+            feedback.save()
+            self.responseCache.bump("realty", f"realty:{feedback.realty_id}")
+        return feedback
+
+    @serializedWrite
+    def softDelete(self, feedbackId, userAccessId=None) -> Feedback:
+        with transaction.atomic():
+            feedback = self._getForUpdate(feedbackId, userAccessId)
+            feedback.deleted_at = timezone.now()
+            feedback.save(update_fields=["deleted_at", "updated_at"])
+            self._applyRating(feedback.realty_id, -feedback.rate, -1)
+            self.responseCache.bump("realty", f"realty:{feedback.realty_id}")
+        return feedback
+
+    def _getForUpdate(self, feedbackId, userAccessId=None) -> Feedback:
+        # with `userAccessId` someone else's feedback is not found at all
+        feedbacks = Feedback.objects.select_for_update().filter(deleted_at__isnull=True)
+        if userAccessId is not None:
+            feedbacks = feedbacks.filter(user_access_id=userAccessId)
+        return feedbacks.get(id=feedbackId)
+
+    def _applyRating(self, realtyId, sumDelta: int, countDelta: int):
+        # one UPDATE, so concurrent writers never lose each other's deltas
+        ratingSum = F("rating_sum") + sumDelta
+        ratingCount = F("rating_count") + countDelta
+        Realty.objects.filter(id=realtyId).update(
+            rating_sum=ratingSum,
+            rating_count=ratingCount,
+            avg_rating=Case(
+                When(rating_count__gt=-countDelta, then=Cast(ratingSum, FloatField()) / ratingCount),
+                default=Value(0.0),
+                output_field=FloatField()
+            )
+        )
+
+class BloomFilter:
+    """
+    Set membership without false negatives and with a bounded false-positive
+    rate, in a bit array sized for `capacity` items.
+    """
+    def __init__(self, capacity: int, errorRate: float):
+        self.capacity = max(capacity, 1)
+        self.size = max(int(-self.capacity * math.log(errorRate) / math.log(2) ** 2), 8)
+        self.hashCount = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, item: str):
+        for index in self._indexes(item):
+            self.bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(item))
+
+    def _indexes(self, item: str) -> list:
+        # double hashing: k indexes from the two halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashCount)]
+
+
+class TokenRevocationService:
+    """
+    Revoked access tokens. `AccessToken.revoked_at` is the record; every
+    process keeps the jtis of unexpired revoked tokens in a Bloom filter that
+    is built from the table on first use, topped up with newer revocations
+    every JWT_REVOCATION_SYNC_SECONDS and rebuilt every
+    JWT_REVOCATION_REBUILD_SECONDS to drop expired ones.
+
+    A jti missing from the filter is certainly not revoked, so a normal
+    request costs no query; only a filter hit is confirmed against the table.
+    """
+    # revocations committed late still carry an earlier revoked_at
+    SYNC_OVERLAP = datetime.timedelta(seconds=60)
+
+    _filter = None
+    _syncedAt = None
+    _nextSync = 0.0
+    _nextRebuild = 0.0
+    _lock = threading.Lock()
+
+    def revoke(self, jti: str):
+        AccessToken.objects.filter(jti=jti, revoked_at__isnull=True).update(revoked_at=timezone.now())
+        with self._lock:
+            if TokenRevocationService._filter is not None:
+                TokenRevocationService._filter.add(jti)
+
+    def isRevoked(self, jti: str) -> bool:
+        self._refresh()
+        if jti not in TokenRevocationService._filter:
+            return False
+        with usePrimary():
+            return AccessToken.objects.filter(jti=jti, revoked_at__isnull=False).exists()
+
+    def _refresh(self):
+        cls = TokenRevocationService
+        now = time.monotonic()
+        if cls._filter is not None and now < cls._nextSync:
+            return
+        # revocations must be seen as soon as they commit
+        with cls._lock, usePrimary():
+            if cls._filter is None or now >= cls._nextRebuild or cls._filter.count >= cls._filter.capacity:
+                self._rebuild(now)
+            elif now >= cls._nextSync:
+                self._sync(now)
+
+    def _rebuild(self, now: float):
+        cls = TokenRevocationService
+        startedAt = timezone.now()
+        revoked = AccessToken.objects.filter(revoked_at__isnull=False).filter(
+            Q(expires_at__gt=startedAt) | Q(expires_at__isnull=True)
+        )
+        jtis = list(revoked.values_list("jti", flat=True))
+
+        bloom = BloomFilter(
+            max(settings.JWT_REVOCATION_BLOOM_CAPACITY, 2 * len(jtis)),
+            settings.JWT_REVOCATION_BLOOM_ERROR_RATE
+        )
+        for jti in jtis:
+            bloom.add(jti)
+
+        cls._filter = bloom
+        cls._syncedAt = startedAt
+        cls._nextSync = now + settings.JWT_REVOCATION_SYNC_SECONDS
+        cls._nextRebuild = now + settings.JWT_REVOCATION_REBUILD_SECONDS
+
+    def _sync(self, now: float):
+        cls = TokenRevocationService
+        startedAt = timezone.now()
+        jtis = AccessToken.objects.filter(
+            revoked_at__gte=cls._syncedAt - self.SYNC_OVERLAP
+        ).values_list("jti", flat=True)
+        for jti in jtis:
+            if jti not in cls._filter:
+                cls._filter.add(jti)
+
+        cls._syncedAt = startedAt
+        cls._nextSync = now + settings.JWT_REVOCATION_SYNC_SECONDS
+
 class AccessTokenAccessor:
     def create(self, accessToken: AccessToken) -> AccessToken:
         accessToken.save()
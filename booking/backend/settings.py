@@ -11,7 +11,8 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 from pathlib import Path
-import os
+from django.core.exceptions import ImproperlyConfigured
+import os, secrets
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -33,16 +34,122 @@ STORAGE_PATH = os.getenv("STORAGE_PATH")
 if not STORAGE_PATH:
     raise RuntimeError("STORAGE_PATH is not set in .env")
 
+# REALTY LISTING PAGINATION
+REALTY_PAGE_SIZE = int(os.getenv("REALTY_PAGE_SIZE", 20))
+REALTY_MAX_PAGE_SIZE = int(os.getenv("REALTY_MAX_PAGE_SIZE", 100))
+
+# RESPONSE CACHE
+# version counters live in this cache, so every worker process must share it
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        'LOCATION': os.getenv("CACHE_LOCATION", ""),
+    }
+}
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 300))
+# with the per-process LocMemCache a write in one worker never retires the
+# entries of the others, so cached responses are off unless the backend is
+# shared; RESPONSE_CACHE=1 forces them on for a single-process server. ETags
+# then come from the tables behind each response
+RESPONSE_CACHE_SHARED = CACHES['default']['BACKEND'] != "django.core.cache.backends.locmem.LocMemCache"
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "1" if RESPONSE_CACHE_SHARED else "0").lower() in ("1", "true", "yes")
+
+# AVAILABILITY CALENDAR
+# months are cached like responses: only when every worker shares the cache,
+# otherwise a booking in one worker would leave the others stale for the TTL
+CALENDAR_CACHE = os.getenv("CALENDAR_CACHE", "1" if RESPONSE_CACHE_SHARED else "0").lower() in ("1", "true", "yes")
+CALENDAR_CACHE_TTL = int(os.getenv("CALENDAR_CACHE_TTL", 3600))
+CALENDAR_MAX_DAYS = int(os.getenv("CALENDAR_MAX_DAYS", 366))
+
+# STORAGE LAYOUT
+# "content" stores uploads as ab/cd/<sha256>.<ext> and dedupes them, "flat" keeps random names at the root
+STORAGE_LAYOUT = os.getenv("STORAGE_LAYOUT", "content")
+
+# STORAGE ITEM CACHE (in-process, per worker)
+STORAGE_CACHE_BYTES = int(os.getenv("STORAGE_CACHE_BYTES", 64 * 1024 * 1024))
+STORAGE_CACHE_MAX_ITEM_BYTES = int(os.getenv("STORAGE_CACHE_MAX_ITEM_BYTES", 1024 * 1024))
+
+# threads writing the files of one multi-image upload concurrently
+STORAGE_UPLOAD_WORKERS = int(os.getenv("STORAGE_UPLOAD_WORKERS", 4))
+
+# STORAGE FILE SERVING
+# "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache, lighttpd) hands the file to the front proxy
+STORAGE_SENDFILE_HEADER = os.getenv("STORAGE_SENDFILE_HEADER", "")
+# internal nginx location that aliases STORAGE_PATH
+STORAGE_ACCEL_PREFIX = os.getenv("STORAGE_ACCEL_PREFIX", "/protected-storage/")
+
+# IMAGE DERIVATIVES (size name -> longest side in px), served as Storage/Item/<id>?size=<name>
+IMAGE_DERIVATIVES = {
+    "thumb": 160,
+    "card": 480,
+    "full": 1600,
+}
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv("IMAGE_DERIVATIVE_WORKERS", 2))
+# `generate_derivatives --force` re-renders under the same name, so a derivative
+# is revalidated after this many seconds instead of being cached as immutable
+IMAGE_DERIVATIVE_MAX_AGE = int(os.getenv("IMAGE_DERIVATIVE_MAX_AGE", 86400))
+
+
+# PASSWORD HASHING
+# "scrypt" or "pbkdf2-sha256"; stored hashes at another algorithm or cost are rehashed on login
+KDF_ALGORITHM = os.getenv("KDF_ALGORITHM", "scrypt")
+KDF_SCRYPT_N = int(os.getenv("KDF_SCRYPT_N", 2 ** 14))
+KDF_SCRYPT_R = int(os.getenv("KDF_SCRYPT_R", 8))
+KDF_SCRYPT_P = int(os.getenv("KDF_SCRYPT_P", 1))
+KDF_PBKDF2_ITERATIONS = int(os.getenv("KDF_PBKDF2_ITERATIONS", 600000))
+KDF_WORKERS = int(os.getenv("KDF_WORKERS", os.cpu_count() or 4))
+KDF_MAX_PENDING = int(os.getenv("KDF_MAX_PENDING", 2 * KDF_WORKERS))
+KDF_QUEUE_TIMEOUT = float(os.getenv("KDF_QUEUE_TIMEOUT", 2))
+
+# ASYNC READ PATH
+# serve the hot read endpoints from native async views; backend/asgi.py turns it on
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "0").lower() in ("1", "true", "yes")
+
+# USER PROFILE
+# bookings embedded in the profile, older ones are paged with the returned cursor
+PROFILE_RECENT_BOOKINGS = int(os.getenv("PROFILE_RECENT_BOOKINGS", 10))
+
+# ADMIN TABLES
+ADMIN_TABLE_PAGE_SIZE = int(os.getenv("ADMIN_TABLE_PAGE_SIZE", 50))
+ADMIN_TABLE_MAX_PAGE_SIZE = int(os.getenv("ADMIN_TABLE_MAX_PAGE_SIZE", 500))
+ADMIN_EXPORT_CHUNK_SIZE = int(os.getenv("ADMIN_EXPORT_CHUNK_SIZE", 2000))
+
+# JWT AUTHENTICATION
+# tokens are trusted without a database lookup, role included, so the signing
+# key must be set explicitly and kept private; see the check below SECRET_KEY
+JWT_SECRET = os.getenv("JWT_SECRET", "")
+JWT_LIFETIME = int(os.getenv("JWT_LIFETIME", 1000000))
+JWT_LEEWAY = int(os.getenv("JWT_LEEWAY", 30))
+JWT_VERIFIED_CACHE_TTL = int(os.getenv("JWT_VERIFIED_CACHE_TTL", 60))
+JWT_VERIFIED_CACHE_SIZE = int(os.getenv("JWT_VERIFIED_CACHE_SIZE", 10000))
+JWT_REVOCATION_SYNC_SECONDS = int(os.getenv("JWT_REVOCATION_SYNC_SECONDS", 5))
+JWT_REVOCATION_REBUILD_SECONDS = int(os.getenv("JWT_REVOCATION_REBUILD_SECONDS", 3600))
+JWT_REVOCATION_BLOOM_CAPACITY = int(os.getenv("JWT_REVOCATION_BLOOM_CAPACITY", 100000))
+JWT_REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("JWT_REVOCATION_BLOOM_ERROR_RATE", 0.001))
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'main.authentication.JwtAuthentication',
+    ],
+}
 
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/6.0/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-k$bmb=(+1itfubl@p2wvumo)c+#9fve)j0!ospqjdk1%w%w^!('
+INSECURE_SECRET_KEY = 'django-insecure-k$bmb=(+1itfubl@p2wvumo)c+#9fve)j0!ospqjdk1%w%w^!('
+SECRET_KEY = os.getenv("SECRET_KEY", INSECURE_SECRET_KEY)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv("DEBUG", "1").lower() in ("1", "true", "yes")
+
+# the key above is public, a token signed with it would be trusted with any role
+if not JWT_SECRET or JWT_SECRET == INSECURE_SECRET_KEY:
+    if not DEBUG:
+        raise ImproperlyConfigured("Set JWT_SECRET to a private key of its own")
+    # development only: tokens stay valid until the server restarts
+    JWT_SECRET = secrets.token_urlsafe(32)
 
 ALLOWED_HOSTS = []
 
@@ -67,6 +174,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
+    'main.middleware.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -101,12 +209,114 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite production profile: WAL lets readers run alongside the writer, IMMEDIATE
+# takes the write lock at BEGIN so transactions never fail upgrading to it
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+# negative values are KiB, positive values pages
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", 5))
+SQLITE_TRANSACTION_MODE = os.getenv("SQLITE_TRANSACTION_MODE", "IMMEDIATE")
+# run booking and feedback writes one at a time on a dedicated thread
+SQLITE_WRITE_QUEUE = os.getenv("SQLITE_WRITE_QUEUE", "1").lower() in ("1", "true", "yes")
+
+# DATABASE ENGINE
+# "sqlite" (default) or "postgresql", the latter configured with the DB_* variables
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite").lower()
+DB_NAME = os.getenv("DB_NAME", "booking")
+DB_USER = os.getenv("DB_USER", "")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "")
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "5432")
+
+# CONNECTION REUSE
+# seconds a worker thread keeps its connection across requests, 0 closes it
+# after each request and "none" keeps it for the life of the thread; asgi.py
+# sets 0, its per-request threads would leave their connections behind
+DB_CONN_MAX_AGE = os.getenv("DB_CONN_MAX_AGE", "60")
+DB_CONN_MAX_AGE = None if DB_CONN_MAX_AGE.lower() == "none" else int(DB_CONN_MAX_AGE)
+# ping a kept connection before the first query of a request, and a pooled one
+# on every checkout
+DB_CONN_HEALTH_CHECKS = os.getenv("DB_CONN_HEALTH_CHECKS", "1").lower() in ("1", "true", "yes")
+
+# CONNECTION POOL (PostgreSQL, one per worker process and database alias)
+DB_POOL = os.getenv("DB_POOL", "1").lower() in ("1", "true", "yes")
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+# seconds a checkout waits for a free connection before the request fails
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+# idle connections above the minimum are closed after this many seconds
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", 300))
+
+if DB_ENGINE == "postgresql":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'backend.db.postgresql',
+            'NAME': DB_NAME,
+            'USER': DB_USER,
+            'PASSWORD': DB_PASSWORD,
+            'HOST': DB_HOST,
+            'PORT': DB_PORT,
+            # the pool keeps the connections, a request hands its own back when done
+            'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': DB_POOL_MIN_SIZE,
+                    'max_size': DB_POOL_MAX_SIZE,
+                    'timeout': DB_POOL_TIMEOUT,
+                    'max_idle': DB_POOL_MAX_IDLE,
+                },
+            } if DB_POOL else {},
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'backend.db.sqlite3',
+            'NAME': os.getenv("SQLITE_PATH", BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'OPTIONS': {
+                'init_command': ";".join([
+                    f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}",
+                    f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+                    f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+                    f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+                ]),
+                'timeout': SQLITE_BUSY_TIMEOUT,
+                'transaction_mode': SQLITE_TRANSACTION_MODE,
+            },
+        }
+    }
+
+# READ REPLICAS
+# comma-separated SQLite files standing in for replicas, refreshed from the
+# primary with `manage.py sync_replicas`, or "host[:port]" of PostgreSQL standbys;
+# reads go there unless the client wrote within the last REPLICA_STICKY_SECONDS
+DATABASE_REPLICAS = [replica.strip() for replica in os.getenv("DATABASE_REPLICAS", "").split(",") if replica.strip()]
+for replicaIndex, replica in enumerate(DATABASE_REPLICAS):
+    if DB_ENGINE == "postgresql":
+        replicaHost, _, replicaPort = replica.partition(":")
+        replicaLocation = {'HOST': replicaHost, 'PORT': replicaPort or DB_PORT}
+    else:
+        replicaLocation = {'NAME': replica}
+    DATABASES[f"replica{replicaIndex}"] = {
+        **DATABASES['default'],
+        **replicaLocation,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['backend.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 5))
+
+# METRICS
+# api/metrics/db and api/metrics/storage answer bearer tokens of these roles;
+# METRICS_PUBLIC=1 opens them to anyone, only for a server that is not
+# reachable from outside
+METRICS_ROLES = [role.strip() for role in os.getenv("METRICS_ROLES", "admin").split(",") if role.strip()]
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "0").lower() in ("1", "true", "yes")
 
 
 # Password validation
@@ -0,0 +1,65 @@
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import APIException
+from main.rest import RestResponse, RestStatus
+
+
+def read_or_write(readView, writeView):
+    """
+    One URL, two implementations: GET/HEAD go to the native async `readView`,
+    every other method to the synchronous (DRF) `writeView`, which Django
+    would run in a worker thread anyway.
+    """
+    writeView = sync_to_async(writeView)
+
+    async def view(request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            return await readView(request, *args, **kwargs)
+        return await writeView(request, *args, **kwargs)
+
+    return csrf_exempt(view)
+
+
+def viewset_for(viewsetClass, action: str, request, **kwargs):
+    """
+    A DRF viewset prepared for `action` the way `as_view()` would before
+    dispatching, so its builders can run outside the DRF request cycle.
+    """
+    viewset = viewsetClass(action_map={request.method.lower(): action}, args=(), kwargs=kwargs, format_kwarg=None)
+    viewset.request = viewset.initialize_request(request, **kwargs)
+    viewset.headers = {}
+    viewset.initial(viewset.request, **kwargs)
+    return viewset
+
+
+def not_modified(request, etag: str):
+    """The 304/412 answer to the request's preconditions, None to go on."""
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response["ETag"] = etag
+    return response
+
+
+def json_response(data, etag: str = None, status: int = 200):
+    response = JsonResponse(data, status=status, safe=False)
+    if etag:
+        response["ETag"] = etag
+    return response
+
+
+def api_error(error) -> JsonResponse:
+    """What DRF's exception handler would have answered for `error`."""
+    if isinstance(error, Http404):
+        return JsonResponse({"detail": str(error) or "Not found."}, status=404)
+    return JsonResponse({"detail": error.detail}, status=error.status_code)
+
+
+API_ERRORS = (APIException, Http404)
+
+
+def ok_data(data) -> dict:
+    return RestResponse(RestStatus(True, 200, "OK"), data).to_dict()
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from django.conf import settings
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+from backend.services import JwtService, TokenRevocationService
+import threading, time, uuid
+
+
+jwtService = JwtService()
+revocationService = TokenRevocationService()
+
+
+class TokenPrincipal:
+    """
+    The user behind a verified access token, built from the token claims only.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, claims: dict):
+        self.claims = claims
+        self.id = uuid.UUID(claims["Id"])
+        self.jti = claims["jti"]
+        self.login = claims.get("Login")
+        self.role_id = claims.get("RoleId")
+        self.first_name = claims.get("FirstName")
+        self.last_name = claims.get("LastName")
+        self.email = claims.get("Email")
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.login or str(self.id)
+
+
+class VerifiedTokenCache:
+    """
+    Principals of recently verified tokens, so a client repeating its token
+    skips the signature check and JSON decoding. An entry never outlives the
+    token's own expiry.
+    """
+    def __init__(self, ttl: int, maxEntries: int):
+        self.ttl = ttl
+        self.maxEntries = maxEntries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[1]
+
+    def put(self, token: str, principal: TokenPrincipal, expiresAt: float):
+        with self._lock:
+            self._entries[token] = (min(expiresAt, time.time() + self.ttl), principal)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxEntries:
+                self._entries.popitem(last=False)
+
+
+class JwtAuthentication(BaseAuthentication):
+    """
+    `Authorization: Bearer <jwt>` as issued by `login` and signed with
+    JWT_SECRET. Verification needs no database access: claims come from the
+    token and revocation is checked against the in-memory filter kept by
+    TokenRevocationService.
+    """
+    keyword = "Bearer"
+    verifiedTokens = VerifiedTokenCache(settings.JWT_VERIFIED_CACHE_TTL, settings.JWT_VERIFIED_CACHE_SIZE)
+
+    def authenticate(self, request):
+        parts = get_authorization_header(request).split()
+        if not parts or parts[0].lower() != self.keyword.lower().encode():
+            return None
+
+        # a malformed, expired or revoked token leaves the request anonymous:
+        # AllowAny endpoints keep answering, the ones needing a user reply 401
+        try:
+            return self.authenticateToken(parts)
+        except AuthenticationFailed:
+            return None
+
+    def authenticateToken(self, parts: list) -> tuple:
+        if len(parts) != 2:
+            raise AuthenticationFailed("Invalid token header")
+
+        try:
+            token = parts[1].decode("ascii")
+        except UnicodeError:
+            raise AuthenticationFailed("Invalid token header")
+
+        principal = self.verifiedTokens.get(token)
+        if principal is None:
+            principal, expiresAt = self.verify(token)
+            self.verifiedTokens.put(token, principal, expiresAt)
+
+        if revocationService.isRevoked(principal.jti):
+            raise AuthenticationFailed("Token has been revoked")
+        return (principal, token)
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+    def verify(self, token: str) -> tuple:
+        try:
+            header, claims = jwtService.decodeJwt(token, settings.JWT_SECRET)
+        except ValueError:
+            raise AuthenticationFailed("Invalid token")
+        if header.get("alg") != "HS256":
+            raise AuthenticationFailed("Unsupported token algorithm")
+
+        now = time.time()
+        leeway = settings.JWT_LEEWAY
+        expiresAt = self._timestamp(claims, "Exp", "exp")
+        notBefore = self._timestamp(claims, "Nbf", "nbf")
+        if expiresAt is None or expiresAt + leeway <= now:
+            raise AuthenticationFailed("Token has expired")
+        if notBefore is not None and notBefore - leeway > now:
+            raise AuthenticationFailed("Token is not valid yet")
+
+        try:
+            principal = TokenPrincipal(claims)
+        except (KeyError, TypeError, ValueError):
+            raise AuthenticationFailed("Invalid token claims")
+        return principal, expiresAt
+
+    def _timestamp(self, claims: dict, *names) -> float:
+        for name in names:
+            if claims.get(name) is not None:
+                try:
+                    return float(claims[name])
+                except (TypeError, ValueError):
+                    raise AuthenticationFailed(f"Invalid '{name}' claim")
+        return None
@@ -0,0 +1,195 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import asyncio, json, os, subprocess, sys, threading, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.services import DiskStorageService
+from main.models import ItemImage, Realty
+
+
+# a slow client takes --client-delay seconds to read this many bytes
+READ_SIZE = 64 * 1024
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_wsgi(paths: list, requests: int, concurrency: int, threads: int, clientDelay: float) -> dict:
+    """
+    `concurrency` clients against a WSGI server with `threads` workers: a
+    worker is held from the first byte of the request until the client has
+    read the last byte of the response.
+    """
+    from django.core.handlers.wsgi import WSGIHandler
+    from wsgiref.util import setup_testing_defaults
+    import io
+
+    handler = WSGIHandler()
+    inFlight = threading.BoundedSemaphore(concurrency)
+    latencies, errors = [], []
+
+    def serve(path, issued):
+        url = urlsplit(path)
+        environ = {"PATH_INFO": url.path, "QUERY_STRING": url.query, "REQUEST_METHOD": "GET", "wsgi.input": io.BytesIO()}
+        setup_testing_defaults(environ)
+        statuses = []
+        try:
+            body = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            for chunk in body:
+                if clientDelay:
+                    time.sleep(clientDelay * len(chunk) / READ_SIZE)
+            body.close()
+            if not statuses[0].startswith(("2", "3")):
+                errors.append(statuses[0])
+        finally:
+            latencies.append(time.perf_counter() - issued)
+            inFlight.release()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(threads, concurrency)) as pool:
+        for n in range(requests):
+            inFlight.acquire()
+            pool.submit(serve, paths[n % len(paths)], time.perf_counter())
+    return {"elapsed": time.perf_counter() - started, "latencies": latencies, "errors": len(errors)}
+
+
+def run_asgi(paths: list, requests: int, concurrency: int, clientDelay: float) -> dict:
+    """`concurrency` clients against one ASGI event loop."""
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+    latencies, errors = [], []
+
+    async def serve(path):
+        url = urlsplit(path)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": url.path,
+            "raw_path": url.path.encode(),
+            "query_string": url.query.encode(),
+            "headers": [(b"host", b"127.0.0.1")],
+            "client": ("127.0.0.1", 40000),
+            "server": ("127.0.0.1", 80),
+        }
+        received = asyncio.Event()
+        statuses = []
+
+        async def receive():
+            if not received.is_set():
+                received.set()
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # the client never disconnects, Django cancels this wait when done
+            await asyncio.Future()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif message["type"] == "http.response.body" and clientDelay:
+                await asyncio.sleep(clientDelay * len(message.get("body", b"")) / READ_SIZE)
+
+        await handler(scope, receive, send)
+        if statuses[0] >= 400:
+            errors.append(statuses[0])
+
+    async def client(queue):
+        while True:
+            try:
+                n = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            issued = time.perf_counter()
+            try:
+                await serve(paths[n % len(paths)])
+            finally:
+                latencies.append(time.perf_counter() - issued)
+
+    async def main():
+        queue = asyncio.Queue()
+        for n in range(requests):
+            queue.put_nowait(n)
+        await asyncio.gather(*(client(queue) for _ in range(concurrency)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return {"elapsed": time.perf_counter() - started, "latencies": latencies, "errors": len(errors)}
+
+
+class Command(BaseCommand):
+    help = "Compare WSGI and ASGI throughput of the hot read endpoints at several concurrency levels"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 50, 500])
+        parser.add_argument("--requests", type=int, default=2000, help="requests per server and concurrency level")
+        parser.add_argument("--threads", type=int, default=16, help="WSGI worker threads, as a threaded WSGI server would run")
+        parser.add_argument("--client-delay", type=float, default=0.0, help="seconds a slow client takes per 64 KiB of response")
+        parser.add_argument("--paths", nargs="+", help="defaults to the realty list/detail, cities, feedback, booking and one storage item")
+        # internal: run one measurement in this process and print it as JSON
+        parser.add_argument("--run", choices=["wsgi", "asgi"], help="measure one server in-process")
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or self.defaultPaths()
+
+        if options["run"]:
+            for concurrency in options["concurrency"]:
+                if options["run"] == "wsgi":
+                    result = run_wsgi(paths, options["requests"], concurrency, options["threads"], options["client_delay"])
+                else:
+                    result = run_asgi(paths, options["requests"], concurrency, options["client_delay"])
+                self.stdout.write(json.dumps({"concurrency": concurrency, **result}))
+            return
+
+        self.stdout.write(
+            f"{options['requests']} requests per run over {len(paths)} paths, "
+            f"{options['threads']} WSGI threads, client delay {options['client_delay']}s"
+        )
+        self.stdout.write(f"{'server':<8}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for server in ("wsgi", "asgi"):
+            for row in self.measure(server, paths, options):
+                latencies = row["latencies"]
+                self.stdout.write(
+                    f"{server:<8}{row['concurrency']:>8}{len(latencies) / row['elapsed']:>10.1f}"
+                    f"{percentile(latencies, 0.5) * 1000:>10.1f}{percentile(latencies, 0.99) * 1000:>10.1f}"
+                    f"{row['errors']:>8}"
+                )
+
+    def measure(self, server: str, paths: list, options: dict) -> list:
+        # the URL set is fixed at import time, so each server gets a fresh
+        # process with ASYNC_READ_VIEWS matching what its entry point sets
+        command = [
+            sys.executable, str(settings.BASE_DIR / "manage.py"), "bench_asgi", "--run", server,
+            "--requests", str(options["requests"]),
+            "--threads", str(options["threads"]),
+            "--client-delay", str(options["client_delay"]),
+            "--concurrency", *map(str, options["concurrency"]),
+            "--paths", *paths,
+        ]
+        env = {**os.environ, "ASYNC_READ_VIEWS": "1" if server == "asgi" else "0"}
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(f"{server} run failed:\n{result.stderr}")
+        return [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+
+    def defaultPaths(self) -> list:
+        paths = ["/api/realty/", "/api/cities/", "/api/feedback", "/api/booking-item"]
+        realtyId = Realty.objects.filter(deleted_at__isnull=True).values_list("id", flat=True).first()
+        if realtyId:
+            paths.append(f"/api/realty/{realtyId}/")
+        storageService = DiskStorageService()
+        for imageUrl in ItemImage.objects.values_list("image_url", flat=True)[:100]:
+            try:
+                storageService.getItemPath(imageUrl)
+            except (FileNotFoundError, ValueError):
+                continue
+            paths.append(f"/Storage/Item/{imageUrl}")
+            break
+        return paths
@@ -0,0 +1,117 @@
+import random, threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.utils import OperationalError
+from django.utils import timezone
+
+from backend.services import BookingConflictError, BookingService
+from main.models import BookingItem, City, Country, Realty, RealtyGroup, UserAccess, UserData, UserRole
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress BookingService with concurrent overlapping bookings on throwaway "
+        "realties, verify that no two live bookings overlap and report bookings/sec"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--attempts", type=int, default=50, help="booking attempts per thread")
+        parser.add_argument("--realties", type=int, default=1)
+        parser.add_argument("--days", type=int, default=90, help="calendar window the stays are drawn from")
+        parser.add_argument("--keep", action="store_true", help="keep the generated rows")
+
+    def handle(self, *args, **options):
+        realties, user_access = self.create_fixtures(options["realties"])
+        service = BookingService()
+        origin = timezone.now().replace(hour=14, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        counters = {"created": 0, "conflicts": 0, "errors": 0}
+        counters_lock = threading.Lock()
+
+        def worker(seed):
+            rnd = random.Random(seed)
+            try:
+                for _ in range(options["attempts"]):
+                    start = origin + timedelta(days=rnd.randrange(options["days"]))
+                    end = start + timedelta(days=rnd.randint(1, 7))
+                    try:
+                        service.create(user_access, rnd.choice(realties).id, start, end)
+                        outcome = "created"
+                    except BookingConflictError:
+                        outcome = "conflicts"
+                    except OperationalError:
+                        outcome = "errors"
+                    with counters_lock:
+                        counters[outcome] += 1
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            list(pool.map(worker, range(options["threads"])))
+        elapsed = time.perf_counter() - started
+
+        overlaps = self.count_overlaps(realties)
+        attempts = options["threads"] * options["attempts"]
+
+        self.stdout.write(f"Threads:        {options['threads']}")
+        self.stdout.write(f"Attempts:       {attempts}")
+        self.stdout.write(f"Created:        {counters['created']}")
+        self.stdout.write(f"Conflicts:      {counters['conflicts']}")
+        self.stdout.write(f"Lock errors:    {counters['errors']}")
+        self.stdout.write(f"Elapsed:        {elapsed:.2f}s")
+        self.stdout.write(f"Attempts/sec:   {attempts / elapsed:.1f}")
+        self.stdout.write(f"Bookings/sec:   {counters['created'] / elapsed:.1f}")
+        self.stdout.write(f"Overlaps:       {overlaps}")
+
+        if not options["keep"]:
+            self.drop_fixtures(realties, user_access)
+
+        if overlaps:
+            raise CommandError(f"{overlaps} overlapping bookings detected")
+        self.stdout.write(self.style.SUCCESS("No overlapping bookings"))
+
+    def count_overlaps(self, realties):
+        overlaps = 0
+        for realty in realties:
+            stays = BookingItem.objects.filter(realty=realty, deleted_at__isnull=True) \
+                .order_by("start_date").values_list("start_date", "end_date")
+            last_end = None
+            for start, end in stays:
+                if last_end is not None and start < last_end:
+                    overlaps += 1
+                last_end = end if last_end is None else max(last_end, end)
+        return overlaps
+
+    def create_fixtures(self, count):
+        tag = uuid.uuid4().hex[:8]
+        country = Country.objects.create(name=f"bench-{tag}")
+        city = City.objects.create(name=f"bench-{tag}", country=country)
+        group = RealtyGroup.objects.create(name=f"bench-{tag}", slug=f"bench-{tag}", description="benchmark")
+        role, _ = UserRole.objects.get_or_create(id="SelfRegistered", defaults={"description": "Self registered"})
+        user_data = UserData.objects.create(first_name="Bench", last_name=tag, email=f"bench-{tag}@example.com")
+        user_access = UserAccess.objects.create(
+            user_id=user_data.id,
+            login=f"bench-{tag}",
+            salt="",
+            dk="",
+            user_data=user_data,
+            user_role=role
+        )
+        realties = [
+            Realty.objects.create(name=f"bench-{tag}-{i}", slug=f"bench-{tag}-{i}", price=100, city=city, realty_group=group)
+            for i in range(count)
+        ]
+        return realties, user_access
+
+    def drop_fixtures(self, realties, user_access):
+        group = realties[0].realty_group
+        country = realties[0].city.country
+        user_data = user_access.user_data
+        Realty.objects.filter(id__in=[realty.id for realty in realties]).delete()
+        group.delete()
+        country.delete()
+        user_data.delete()
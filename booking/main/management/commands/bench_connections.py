@@ -0,0 +1,79 @@
+from urllib.parse import urlsplit
+import io, json, os, subprocess, sys, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.db import ConnectionStats
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_requests(paths: list, requests: int) -> dict:
+    """Sequential requests through the WSGI handler, as one worker thread serves them."""
+    from django.core.handlers.wsgi import WSGIHandler
+    from wsgiref.util import setup_testing_defaults
+
+    handler = WSGIHandler()
+    latencies, errors = [], 0
+    for n in range(requests):
+        url = urlsplit(paths[n % len(paths)])
+        environ = {"PATH_INFO": url.path, "QUERY_STRING": url.query, "REQUEST_METHOD": "GET", "wsgi.input": io.BytesIO()}
+        setup_testing_defaults(environ)
+        statuses = []
+        started = time.perf_counter()
+        body = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        for _ in body:
+            pass
+        # request_finished: this is where CONN_MAX_AGE decides to close
+        body.close()
+        latencies.append(time.perf_counter() - started)
+        if not statuses[0].startswith(("2", "3")):
+            errors += 1
+    return {"latencies": latencies, "errors": errors, "connections": ConnectionStats.snapshot()["default"]}
+
+
+class Command(BaseCommand):
+    help = "Latency of small endpoints with a connection per request against persistent connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--paths", nargs="+", default=["/api/cities/", "/Administrator/GetUsersTable"])
+        parser.add_argument("--max-age", default="60", help="DB_CONN_MAX_AGE of the persistent run")
+        # internal: run one profile in this process and print it as JSON
+        parser.add_argument("--run", action="store_true", help="measure the current settings in-process")
+
+    def handle(self, *args, **options):
+        if options["run"]:
+            result = run_requests(options["paths"], options["requests"])
+            self.stdout.write(json.dumps(result))
+            return
+
+        self.stdout.write(f"{options['requests']} requests over {', '.join(options['paths'])}")
+        self.stdout.write(f"{'CONN_MAX_AGE':<14}{'p50 ms':>10}{'p99 ms':>10}{'checkouts':>11}{'avg wait ms':>13}{'errors':>8}")
+        for maxAge in ("0", options["max_age"]):
+            result = self.measure(maxAge, options)
+            connections = result["connections"]
+            self.stdout.write(
+                f"{maxAge:<14}{percentile(result['latencies'], 0.5) * 1000:>10.2f}"
+                f"{percentile(result['latencies'], 0.99) * 1000:>10.2f}"
+                f"{connections['checkouts']:>11}{connections['avgWaitMs']:>13.3f}{result['errors']:>8}"
+            )
+
+    def measure(self, maxAge: str, options: dict) -> dict:
+        # DATABASES is read at startup, so each profile runs in a fresh process
+        command = [
+            sys.executable, str(settings.BASE_DIR / "manage.py"), "bench_connections", "--run",
+            "--requests", str(options["requests"]),
+            "--paths", *options["paths"],
+        ]
+        env = {**os.environ, "DB_CONN_MAX_AGE": maxAge}
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(f"Benchmark run failed:\n{result.stderr}")
+        return json.loads(result.stdout.splitlines()[-1])
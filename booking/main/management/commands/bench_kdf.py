@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.services import KdfBusyError, KdfService, PasswordVerifier
+
+
+DEFAULT_COSTS = [
+    "pbkdf2-sha256:i=100000",
+    "pbkdf2-sha256:i=600000",
+    "scrypt:n=8192,r=8,p=1",
+    "scrypt:n=16384,r=8,p=1",
+    "scrypt:n=32768,r=8,p=1",
+]
+
+
+def parse_cost(text: str) -> tuple:
+    algorithm, _, paramText = text.partition(":")
+    try:
+        params = {name: int(value) for name, value in (item.split("=") for item in paramText.split(","))}
+    except ValueError:
+        raise CommandError(f"Invalid cost '{text}', expected e.g. 'scrypt:n=16384,r=8,p=1'")
+    return algorithm, params
+
+
+class Command(BaseCommand):
+    help = "Measure password verifications per second at each KDF cost setting"
+
+    def add_arguments(self, parser):
+        parser.add_argument("costs", nargs="*", help="'algorithm:name=value,...', defaults to a sweep around the configured cost")
+        parser.add_argument("--logins", type=int, default=100, help="verifications per cost setting")
+        parser.add_argument("--clients", type=int, default=settings.KDF_MAX_PENDING, help="concurrent login requests")
+
+    def handle(self, *args, **options):
+        costs = options["costs"] or DEFAULT_COSTS
+        self.stdout.write(
+            f"{options['logins']} logins, {options['clients']} clients, "
+            f"{settings.KDF_WORKERS} KDF workers, {settings.KDF_MAX_PENDING} pending slots"
+        )
+        self.stdout.write(f"{'cost':<32}{'ms/hash':>10}{'logins/s':>12}{'rejected':>10}")
+
+        for text in costs:
+            algorithm, params = parse_cost(text)
+            try:
+                kdfService = KdfService(algorithm, params)
+                encoded = kdfService.dk("Bench1!password", "benchsalt")
+            except ValueError as e:
+                raise CommandError(str(e))
+            verifier = PasswordVerifier(kdfService)
+
+            started = time.perf_counter()
+            kdfService.verify("Bench1!password", "benchsalt", encoded)
+            single = time.perf_counter() - started
+
+            def attempt(_):
+                try:
+                    return verifier.verify("Bench1!password", "benchsalt", encoded)
+                except KdfBusyError:
+                    return None
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["clients"]) as clients:
+                results = list(clients.map(attempt, range(options["logins"])))
+            elapsed = time.perf_counter() - started
+
+            accepted = sum(1 for result in results if result)
+            rejected = sum(1 for result in results if result is None)
+            self.stdout.write(f"{text:<32}{single * 1000:>10.1f}{accepted / elapsed:>12.1f}{rejected:>10}")
@@ -0,0 +1,169 @@
+from concurrent.futures import ThreadPoolExecutor
+import datetime, json, os, random, subprocess, sys, tempfile, threading, time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from backend.services import BookingConflictError, BookingService, FeedbackAccessor
+from main.models import City, Country, Realty, RealtyGroup, UserAccess, UserData, UserRole
+
+
+# what the database ran with before the production profile
+DEFAULT_PROFILE = {
+    "SQLITE_JOURNAL_MODE": "DELETE",
+    "SQLITE_SYNCHRONOUS": "FULL",
+    "SQLITE_MMAP_SIZE": "0",
+    "SQLITE_CACHE_SIZE": "-2000",
+    "SQLITE_TRANSACTION_MODE": "DEFERRED",
+    "SQLITE_WRITE_QUEUE": "0",
+}
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def seed(realties: int, users: int) -> tuple:
+    country = Country.objects.create(name="Benchland")
+    city = City.objects.create(name="Bench City", country=country)
+    group = RealtyGroup.objects.create(name="Bench", slug="bench", description="bench")
+    role, _ = UserRole.objects.get_or_create(id="SelfRegistered", defaults={"description": "bench"})
+
+    realtyIds = [
+        Realty.objects.create(
+            name=f"Bench {n}",
+            description="bench",
+            slug=f"bench-{n}",
+            price=100 + n,
+            city=city,
+            realty_group=group
+        ).id
+        for n in range(realties)
+    ]
+    userAccesses = []
+    for n in range(users):
+        userData = UserData.objects.create(first_name="Bench", last_name=str(n), email=f"bench{n}@example.com")
+        userAccesses.append(UserAccess.objects.create(
+            user_id=userData.id,
+            login=f"bench{n}",
+            salt="bench",
+            dk="bench",
+            user_data=userData,
+            user_role=role
+        ))
+    return realtyIds, userAccesses
+
+
+def run_load(seconds: float, clients: int, writeRatio: float, realtyIds: list, userAccesses: list) -> dict:
+    bookingService = BookingService()
+    feedbackAccessor = FeedbackAccessor()
+    deadline = time.perf_counter() + seconds
+    lock = threading.Lock()
+    stats = {"reads": [], "writes": [], "conflicts": 0, "locked": 0}
+    start = timezone.now() + datetime.timedelta(days=1)
+
+    def read():
+        list(Realty.objects.filter(deleted_at__isnull=True).order_by("-avg_rating", "-pk")[:20])
+
+    def write(rng):
+        realtyId = rng.choice(realtyIds)
+        userAccess = rng.choice(userAccesses)
+        if rng.random() < 0.5:
+            day = start + datetime.timedelta(days=rng.randrange(3650))
+            bookingService.create(userAccess, realtyId, day, day + datetime.timedelta(hours=20))
+        else:
+            feedbackAccessor.create(Realty(id=realtyId), userAccess, "bench", rng.randint(1, 5))
+
+    def client(seed):
+        rng = random.Random(seed)
+        try:
+            while time.perf_counter() < deadline:
+                isWrite = rng.random() < writeRatio
+                started = time.perf_counter()
+                try:
+                    write(rng) if isWrite else read()
+                except BookingConflictError:
+                    with lock:
+                        stats["conflicts"] += 1
+                except OperationalError:
+                    # "database is locked": the transaction was given up
+                    with lock:
+                        stats["locked"] += 1
+                    continue
+                with lock:
+                    stats["writes" if isWrite else "reads"].append(time.perf_counter() - started)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    return stats
+
+
+class Command(BaseCommand):
+    help = "Mixed read/write load on a scratch SQLite database, default settings against the production profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--clients", type=int, default=16)
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+        parser.add_argument("--realties", type=int, default=200)
+        parser.add_argument("--users", type=int, default=50)
+        # internal: run one profile in this process and print it as JSON
+        parser.add_argument("--run", action="store_true", help="measure the current settings in-process")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("bench_sqlite needs the SQLite backend")
+
+        if options["run"]:
+            call_command("migrate", verbosity=0)
+            realtyIds, userAccesses = seed(options["realties"], options["users"])
+            stats = run_load(options["seconds"], options["clients"], options["write_ratio"], realtyIds, userAccesses)
+            self.stdout.write(json.dumps(stats))
+            return
+
+        self.stdout.write(
+            f"{options['clients']} clients for {options['seconds']}s, "
+            f"{options['write_ratio']:.0%} writes (bookings and feedback)"
+        )
+        self.stdout.write(
+            f"{'profile':<12}{'reads/s':>10}{'writes/s':>10}{'read p99':>10}{'write p99':>11}{'locked':>8}{'conflicts':>11}"
+        )
+        for profile, overrides in (("default", DEFAULT_PROFILE), ("production", {})):
+            stats = self.measure(overrides, options)
+            self.stdout.write(
+                f"{profile:<12}{len(stats['reads']) / options['seconds']:>10.1f}"
+                f"{len(stats['writes']) / options['seconds']:>10.1f}"
+                f"{percentile(stats['reads'], 0.99) * 1000:>8.1f}ms"
+                f"{percentile(stats['writes'], 0.99) * 1000:>9.1f}ms"
+                f"{stats['locked']:>8}{stats['conflicts']:>11}"
+            )
+
+    def measure(self, overrides: dict, options: dict) -> dict:
+        # connection options are read at startup, so every profile runs in a
+        # fresh process against its own scratch database
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                **overrides,
+                "SQLITE_PATH": os.path.join(directory, "bench.sqlite3"),
+            }
+            command = [
+                sys.executable, str(settings.BASE_DIR / "manage.py"), "bench_sqlite", "--run",
+                "--seconds", str(options["seconds"]),
+                "--clients", str(options["clients"]),
+                "--write-ratio", str(options["write_ratio"]),
+                "--realties", str(options["realties"]),
+                "--users", str(options["users"]),
+            ]
+            result = subprocess.run(command, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(f"Benchmark run failed:\n{result.stderr}")
+        return json.loads(result.stdout.splitlines()[-1])
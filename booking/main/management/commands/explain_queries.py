@@ -0,0 +1,97 @@
+import datetime, re, uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from main.models import (
+    AccessToken,
+    BookingItem,
+    Feedback,
+    ItemImage,
+    LikedRealty,
+    Realty,
+    RealtyOccupancy,
+    UserAccess,
+)
+
+
+# SQLite reports "SCAN <table>" for a full table scan and "SCAN <table> USING
+# [COVERING] INDEX" for an ordered index walk; PostgreSQL says "Seq Scan".
+FULL_SCAN = re.compile(r"\bSCAN (?!.*\bUSING\b)|\bSeq Scan\b")
+
+
+class Command(BaseCommand):
+    help = "Print the query plan of each view's main query and flag full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fail-on-scan", action="store_true", help="exit with an error when a scan is found")
+
+    def handle(self, *args, **options):
+        flagged = []
+
+        for name, queryset in self.get_queries():
+            plan = queryset.explain()
+            scans = [line for line in plan.splitlines() if FULL_SCAN.search(line)]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for line in plan.splitlines():
+                self.stdout.write(f"    {line}")
+            if scans:
+                flagged.append(name)
+                self.stdout.write(self.style.WARNING("    ^ full table scan"))
+
+        self.stdout.write("")
+        if flagged:
+            message = f"{len(flagged)} queries do a full table scan: {', '.join(flagged)}"
+            if options["fail_on_scan"]:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"No full table scans ({connection.vendor})"))
+
+    def get_queries(self):
+        # the values only shape the plan, they do not have to exist
+        some_id = uuid.uuid4()
+        now = timezone.now()
+        today = timezone.localdate()
+        live_realties = Realty.objects.filter(deleted_at__isnull=True)
+
+        return [
+            ("RealtyViewSet.list (ordering=price)",
+                live_realties.filter(price__gte=0, pk__gt=some_id).order_by("price", "pk")[:21]),
+            ("RealtyViewSet.list (city, price filter)",
+                live_realties.filter(city_id=some_id, price__gte=100, price__lte=500)),
+            ("RealtySearchViewSet (Rating, ordering=-rating)",
+                live_realties.filter(avg_rating__gte=4).order_by("-avg_rating", "-pk")[:21]),
+            ("RealtySearchViewSet (StartDate/EndDate)",
+                RealtyOccupancy.objects.filter(first_day__lt=today + datetime.timedelta(days=3), last_day__gte=today)),
+            ("RealtySerializer.images prefetch",
+                ItemImage.objects.filter(realty_id__in=[some_id])),
+            ("FeedbackView.get (realty)",
+                Feedback.objects.filter(deleted_at__isnull=True, realty_id=some_id)),
+            ("BookingService.hasOverlap",
+                BookingItem.objects.filter(
+                    realty_id=some_id,
+                    deleted_at__isnull=True,
+                    start_date__lt=now + datetime.timedelta(days=3),
+                    end_date__gt=now
+                )),
+            ("realtyCalendar",
+                BookingItem.objects.filter(
+                    realty_id=some_id,
+                    deleted_at__isnull=True,
+                    start_date__lt=now + datetime.timedelta(days=31),
+                    end_date__gt=now
+                ).order_by("start_date")),
+            ("BookingView.get (user_access)",
+                BookingItem.objects.filter(user_access_id=some_id)),
+            ("LikedRealtyAccessor.getLikedMap",
+                LikedRealty.objects.filter(user_access_id=some_id, realty_id__in=[some_id])),
+            ("LikedRealtyViewSet.list (login)",
+                LikedRealty.objects.filter(user_access__login__iexact="login")),
+            ("userDetail",
+                UserAccess.objects.filter(login="login", deleted_at__isnull=True)),
+            ("AccessToken by user",
+                AccessToken.objects.filter(user_access_id=some_id)),
+        ]
@@ -0,0 +1,37 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.imaging import renderDerivatives
+from main.models import ItemImage
+
+
+class Command(BaseCommand):
+    help = "Render the IMAGE_DERIVATIVES sizes of every stored realty image that is missing them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=settings.IMAGE_DERIVATIVE_WORKERS)
+        parser.add_argument("--force", action="store_true", help="re-render derivatives that already exist")
+
+    def handle(self, *args, **options):
+        names = ItemImage.objects.order_by().values_list("image_url", flat=True).distinct()
+        rendered = 0
+        images = 0
+
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futures = [
+                pool.submit(renderDerivatives, settings.STORAGE_PATH, name, settings.IMAGE_DERIVATIVES, options["force"])
+                for name in names.iterator()
+            ]
+            for future in as_completed(futures):
+                written = future.result()
+                if written:
+                    images += 1
+                    rendered += len(written)
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} derivatives for {images} images"))
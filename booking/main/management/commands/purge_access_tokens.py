@@ -0,0 +1,34 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main.models import AccessToken
+
+
+class Command(BaseCommand):
+    help = "Delete expired access tokens in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--grace", type=int, default=3600, help="seconds a token is kept past its expiry")
+        parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options["grace"])
+        expired = AccessToken.objects.filter(expires_at__lt=cutoff).order_by("expires_at")
+        deleted = 0
+
+        while True:
+            # short transactions: each batch is one indexed range read and one delete
+            jtis = list(expired.values_list("jti", flat=True)[:options["batch_size"]])
+            if not jtis:
+                break
+            count, _ = AccessToken.objects.filter(jti__in=jtis).delete()
+            deleted += count
+            self.stdout.write(f"Deleted {deleted} tokens...")
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} access tokens expired before {cutoff:%Y-%m-%d %H:%M:%S}"))
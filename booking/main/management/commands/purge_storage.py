@@ -0,0 +1,45 @@
+import os, re, time
+
+from django.core.management.base import BaseCommand
+
+from backend.services import DiskStorageService
+from main.models import ItemImage, RealtyGroup
+
+
+# an original is "<name>.<ext>"; derivatives "<name>.<size>.<ext>" go with it
+ORIGINAL_NAME = re.compile(r"^[^.]+\.[A-Za-z0-9]+$")
+
+
+class Command(BaseCommand):
+    help = "Delete stored images no row references, with their derivatives"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace", type=int, default=3600, help="seconds a new file is kept, its rows may not be committed yet")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        storageService = DiskStorageService()
+        referenced = set(ItemImage.objects.exclude(image_url=None).values_list("image_url", flat=True))
+        referenced.update(RealtyGroup.objects.exclude(image_url=None).values_list("image_url", flat=True))
+        cutoff = time.time() - options["grace"]
+
+        purged = 0
+        for directory, _, files in os.walk(storageService.basePath):
+            for name in files:
+                if not ORIGINAL_NAME.match(name) or name in referenced:
+                    continue
+                try:
+                    storageService.tryGetMimeType(name)
+                except ValueError:
+                    continue
+                if os.stat(os.path.join(directory, name)).st_mtime > cutoff:
+                    continue
+                purged += 1
+                if options["dry_run"]:
+                    self.stdout.write(f"Would delete {name}")
+                else:
+                    # unlinks the derivatives too
+                    storageService.deleteItem(name)
+
+        verb = "Would purge" if options["dry_run"] else "Purged"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {purged} unreferenced items"))
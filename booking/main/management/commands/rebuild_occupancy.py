@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from backend.services import OccupancyBitmap, OccupancyService
+from main.models import BookingItem, RealtyOccupancy
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-realty occupancy bitmaps from live booking items"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        service = OccupancyService()
+        bitmaps = {}
+
+        bookings = (
+            BookingItem.objects
+            .filter(deleted_at__isnull=True)
+            .values_list("realty_id", "start_date", "end_date")
+            .iterator(chunk_size=options["chunk_size"])
+        )
+        for realty_id, start_date, end_date in bookings:
+            bitmap = bitmaps.setdefault(realty_id, OccupancyBitmap())
+            bitmap.mark(*service.stayNights(start_date, end_date))
+
+        with transaction.atomic():
+            RealtyOccupancy.objects.all().delete()
+            RealtyOccupancy.objects.bulk_create(
+                [
+                    RealtyOccupancy(
+                        realty_id=realty_id,
+                        first_day=bitmap.firstDay,
+                        last_day=bitmap.lastDay,
+                        bitmap=bitmap.toBytes()
+                    )
+                    for realty_id, bitmap in bitmaps.items()
+                    if not bitmap.isEmpty
+                ],
+                batch_size=options["chunk_size"]
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Occupancy rebuilt for {len(bitmaps)} realties"))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from main.models import Feedback, Realty
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized rating columns of realties from live feedbacks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        last_id = None
+        updated = 0
+
+        while True:
+            with transaction.atomic():
+                query = Realty.objects.order_by("id")
+                if last_id is not None:
+                    query = query.filter(id__gt=last_id)
+                ids = list(query.select_for_update().values_list("id", flat=True)[:chunk_size])
+                if not ids:
+                    break
+
+                stats = {
+                    row["realty_id"]: row
+                    for row in Feedback.objects
+                        .filter(realty_id__in=ids, deleted_at__isnull=True)
+                        .values("realty_id")
+                        .annotate(total=Sum("rate"), count=Count("id"))
+                        .order_by()
+                }
+
+                realties = []
+                now = timezone.now()
+                for realty_id in ids:
+                    row = stats.get(realty_id, {"total": 0, "count": 0})
+                    realties.append(Realty(
+                        id=realty_id,
+                        rating_sum=row["total"],
+                        rating_count=row["count"],
+                        avg_rating=row["total"] / row["count"] if row["count"] else 0.0,
+                        updated_at=now
+                    ))
+                Realty.objects.bulk_update(realties, ["rating_sum", "rating_count", "avg_rating", "updated_at"])
+
+            updated += len(ids)
+            last_id = ids[-1]
+            self.stdout.write(f"Recomputed {updated} realties...")
+
+        self.stdout.write(self.style.SUCCESS(f"Rating aggregates recomputed for {updated} realties"))
@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from backend.routers import replicaAliases
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database over every replica configured in DATABASE_REPLICAS"
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES["default"]
+        if connections["default"].vendor != "sqlite":
+            raise CommandError("sync_replicas only stands in for replication between SQLite files")
+
+        replicas = replicaAliases()
+        if not replicas:
+            raise CommandError("No replicas configured, set DATABASE_REPLICAS")
+
+        source = sqlite3.connect(primary["NAME"])
+        try:
+            for alias in replicas:
+                # the backup API copies a consistent snapshot even while the primary is written
+                target = sqlite3.connect(settings.DATABASES[alias]["NAME"])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f"{alias} <- {primary['NAME']}")
+        finally:
+            source.close()
+        self.stdout.write(self.style.SUCCESS(f"Synced {len(replicas)} replicas"))
@@ -0,0 +1,48 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from backend.routers import trackWrites
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes on top of ReplicaRouter: a request that writes sets a
+    short-lived cookie, and while it is present the client's reads go to the
+    primary instead of a replica that may not have caught up yet. Unsafe
+    methods always use the primary.
+    """
+    cookie_name = "db_primary"
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with trackWrites(self.pinned(request)) as writes:
+            response = self.get_response(request)
+        return self.stick(response, writes)
+
+    async def __acall__(self, request):
+        with trackWrites(self.pinned(request)) as writes:
+            response = await self.get_response(request)
+        return self.stick(response, writes)
+
+    def pinned(self, request) -> bool:
+        return request.method not in self.safe_methods or self.cookie_name in request.COOKIES
+
+    def stick(self, response, writes):
+        if writes["wrote"]:
+            response.set_cookie(
+                self.cookie_name,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax"
+            )
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.9 on 2026-10-18 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_likedrealty'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='realty',
+            index=models.Index(fields=['price', 'id'], name='realties_price_83c881_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0.9 on 2026-10-18 12:19
+
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def backfill_ratings(apps, schema_editor):
+    Realty = apps.get_model('main', 'Realty')
+    Feedback = apps.get_model('main', 'Feedback')
+
+    live = (
+        Feedback.objects
+        .filter(realty=OuterRef('pk'), deleted_at__isnull=True)
+        .order_by()
+        .values('realty')
+    )
+    Realty.objects.update(
+        rating_sum=Coalesce(Subquery(live.annotate(total=Sum('rate')).values('total')), 0),
+        rating_count=Coalesce(Subquery(live.annotate(total=Count('id')).values('total')), 0),
+    )
+    Realty.objects.update(
+        avg_rating=Coalesce(
+            Cast(F('rating_sum'), FloatField()) / NullIf(F('rating_count'), Value(0)),
+            Value(0.0),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_realty_realties_price_83c881_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='realty',
+            name='avg_rating',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='realty',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='realty',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='realty',
+            index=models.Index(fields=['avg_rating', 'id'], name='realties_avg_rat_aab3d1_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 6.0.9 on 2026-10-18 12:20
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def stay_nights(start_date, end_date):
+    # nights [check-in, check-out) in local time, at least one night per stay
+    start, end = (
+        (timezone.localtime(value) if timezone.is_aware(value) else value).date()
+        for value in (start_date, end_date)
+    )
+    return start, max(end, start + datetime.timedelta(days=1))
+
+
+def backfill_occupancy(apps, schema_editor):
+    # the bitmap layout is spelled out here rather than taken from
+    # backend.services, so later changes there cannot change this migration:
+    # bit n (little-endian) is the night of first_day + n
+    BookingItem = apps.get_model('main', 'BookingItem')
+    RealtyOccupancy = apps.get_model('main', 'RealtyOccupancy')
+
+    occupancy = {}
+    bookings = (
+        BookingItem.objects
+        .filter(deleted_at__isnull=True)
+        .values_list('realty_id', 'start_date', 'end_date')
+        .iterator(chunk_size=5000)
+    )
+    for realty_id, start_date, end_date in bookings:
+        start, end = stay_nights(start_date, end_date)
+        first_day, bits = occupancy.get(realty_id, (start, 0))
+        if start < first_day:
+            bits <<= (first_day - start).days
+            first_day = start
+        bits |= ((1 << (end - start).days) - 1) << (start - first_day).days
+        occupancy[realty_id] = (first_day, bits)
+
+    RealtyOccupancy.objects.bulk_create(
+        [
+            RealtyOccupancy(
+                realty_id=realty_id,
+                first_day=first_day,
+                last_day=first_day + datetime.timedelta(days=bits.bit_length() - 1),
+                bitmap=bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+            )
+            for realty_id, (first_day, bits) in occupancy.items()
+        ],
+        batch_size=5000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_realty_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RealtyOccupancy',
+            fields=[
+                ('realty', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='occupancy', serialize=False, to='main.realty')),
+                ('first_day', models.DateField()),
+                ('last_day', models.DateField()),
+                ('bitmap', models.BinaryField()),
+            ],
+            options={
+                'db_table': 'realty_occupancy',
+                'indexes': [models.Index(fields=['first_day', 'last_day'], name='realty_occu_first_d_73061a_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.9 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_realty_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookingitem',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['realty', 'start_date', 'end_date'], name='booking_items_live_range_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['realty', 'created_at'], name='feedbacks_live_realty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='likedrealty',
+            index=models.Index(fields=['user_access', 'realty'], name='liked_realt_user_ac_e58ad9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='realty',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['city', 'price'], name='realties_live_city_price_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.9 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accesstoken',
+            name='revoked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
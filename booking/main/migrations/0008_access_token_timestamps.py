@@ -0,0 +1,73 @@
+# Generated by Django 6.0.9 on 2026-10-18 12:35
+
+import datetime
+
+from django.db import migrations, models
+
+
+def to_datetime(value):
+    try:
+        return datetime.datetime.fromtimestamp(int(float(value)), tz=datetime.timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def backfill_timestamps(apps, schema_editor):
+    AccessToken = apps.get_model('main', 'AccessToken')
+
+    tokens = []
+    for token in AccessToken.objects.only('jti', 'iat', 'exp', 'nbf').iterator(chunk_size=1000):
+        token.issued_at = to_datetime(token.iat)
+        token.expires_at = to_datetime(token.exp)
+        token.not_before = to_datetime(token.nbf)
+        tokens.append(token)
+        if len(tokens) >= 1000:
+            AccessToken.objects.bulk_update(tokens, ['issued_at', 'expires_at', 'not_before'])
+            tokens = []
+    AccessToken.objects.bulk_update(tokens, ['issued_at', 'expires_at', 'not_before'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_access_token_revoked_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accesstoken',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='accesstoken',
+            name='issued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='accesstoken',
+            name='not_before',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_timestamps, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='accesstoken',
+            name='exp',
+        ),
+        migrations.RemoveField(
+            model_name='accesstoken',
+            name='iat',
+        ),
+        migrations.RemoveField(
+            model_name='accesstoken',
+            name='nbf',
+        ),
+        migrations.AddIndex(
+            model_name='accesstoken',
+            index=models.Index(fields=['expires_at'], name='access_tokens_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesstoken',
+            index=models.Index(condition=models.Q(('revoked_at__isnull', False)), fields=['revoked_at', 'expires_at'], name='access_tokens_revoked_idx'),
+        ),
+    ]
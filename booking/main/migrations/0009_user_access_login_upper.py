@@ -0,0 +1,18 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:11
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_access_token_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='useraccess',
+            index=models.Index(django.db.models.functions.text.Upper('login'), name='user_access_login_upper_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 import uuid, time
 
 class UserRole(models.Model):
@@ -81,6 +82,8 @@ class UserAccess(models.Model):
         indexes = [
             models.Index(fields=["login"]),
             models.Index(fields=["user_id"]),
+            # PostgreSQL compiles login__iexact to UPPER("login") = UPPER(%s)
+            models.Index(Upper("login"), name="user_access_login_upper_idx"),
         ]
 
     def __str__(self):
@@ -92,6 +95,7 @@ class ItemImage(models.Model):
 
     image_url = models.URLField(null=True, blank=True)
     order = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     realty = models.ForeignKey(
         "Realty",
@@ -118,11 +122,12 @@ class AccessToken(models.Model):
     jti = models.CharField(primary_key=True, max_length=255)
 
     sub = models.UUIDField(null=True, blank=True)
-    iat = models.CharField(max_length=50, null=True, blank=True)
-    exp = models.CharField(max_length=50, null=True, blank=True)
-    nbf = models.CharField(max_length=50, null=True, blank=True)
+    issued_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    not_before = models.DateTimeField(null=True, blank=True)
     aud = models.CharField(max_length=255, null=True, blank=True)
     iss = models.CharField(max_length=255, null=True, blank=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
 
     user_access = models.ForeignKey(
         "UserAccess",
@@ -132,6 +137,14 @@ class AccessToken(models.Model):
     
     class Meta:
         db_table = "access_tokens"
+        indexes = [
+            models.Index(fields=["expires_at"], name="access_tokens_expires_idx"),
+            models.Index(
+                fields=["revoked_at", "expires_at"],
+                name="access_tokens_revoked_idx",
+                condition=models.Q(revoked_at__isnull=False)
+            ),
+        ]
 
 
 class BookingItem(models.Model):
@@ -140,6 +153,7 @@ class BookingItem(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
 
     realty = models.ForeignKey(
@@ -156,6 +170,36 @@ class BookingItem(models.Model):
 
     class Meta:
         db_table = "booking_items"
+        indexes = [
+            models.Index(
+                fields=["realty", "start_date", "end_date"],
+                condition=models.Q(deleted_at__isnull=True),
+                name="booking_items_live_range_idx"
+            ),
+        ]
+
+
+class RealtyOccupancy(models.Model):
+    """
+    Per-day occupancy bitmap of a realty built from its live booking items.
+    Bit `n` of `bitmap` (little-endian) is the night of `first_day + n`.
+    """
+    realty = models.OneToOneField(
+        "Realty",
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="occupancy"
+    )
+
+    first_day = models.DateField()
+    last_day = models.DateField()
+    bitmap = models.BinaryField()
+
+    class Meta:
+        db_table = "realty_occupancy"
+        indexes = [
+            models.Index(fields=["first_day", "last_day"]),
+        ]
 
 
 class Card(models.Model):
@@ -235,8 +279,14 @@ class Realty(models.Model):
     slug = models.SlugField(unique=True, null=True, blank=True)
 
     price = models.DecimalField(max_digits=12, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
 
+    # maintained by FeedbackAccessor on every feedback write
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    avg_rating = models.FloatField(default=0)
+
     city = models.ForeignKey(
         City,
         on_delete=models.CASCADE,
@@ -251,6 +301,15 @@ class Realty(models.Model):
 
     class Meta:
         db_table = "realties"
+        indexes = [
+            models.Index(fields=["price", "id"]),
+            models.Index(fields=["avg_rating", "id"]),
+            models.Index(
+                fields=["city", "price"],
+                condition=models.Q(deleted_at__isnull=True),
+                name="realties_live_city_price_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -279,6 +338,13 @@ class Feedback(models.Model):
 
     class Meta:
         db_table = "feedbacks"
+        indexes = [
+            models.Index(
+                fields=["realty", "created_at"],
+                condition=models.Q(deleted_at__isnull=True),
+                name="feedbacks_live_realty_idx"
+            ),
+        ]
 
 
 class LikedRealty(models.Model): 
@@ -300,4 +366,7 @@ class LikedRealty(models.Model):
 
     class Meta:
         db_table = "liked_realties"
-        unique_together = ("realty", "user_access")
\ No newline at end of file
+        unique_together = ("realty", "user_access")
+        indexes = [
+            models.Index(fields=["user_access", "realty"]),
+        ]
\ No newline at end of file
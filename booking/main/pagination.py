@@ -0,0 +1,164 @@
+import base64, binascii, json
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework import status
+from main.rest import RestResponse, RestStatus
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque-cursor pagination over a stable `(field, pk)` ordering.
+
+    A page is selected with `field >= last AND (field > last OR pk > last_pk)`
+    instead of an OFFSET, so the database seeks straight to the cursor position
+    and page 1000 costs the same as page 1.
+    """
+    page_size = 20
+    max_page_size = 100
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    ordering_query_param = "ordering"
+
+    # public ordering name -> model field / annotation
+    ordering_fields = {"id": "pk"}
+    default_ordering = "id"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        self.limit = self._get_limit(params)
+
+        cursor = self._decode_cursor(params.get(self.cursor_query_param))
+        ordering = cursor["o"] if cursor else params.get(self.ordering_query_param) or self.default_ordering
+        name = ordering.lstrip("-")
+        if name not in self.ordering_fields:
+            raise ValidationError({self.ordering_query_param: f"Unsupported ordering '{ordering}'"})
+
+        self.ordering = ordering
+        self.field = self.ordering_fields[name]
+        if cursor:
+            cursor = self._coerce_cursor(cursor, queryset.model)
+        descending = ordering.startswith("-")
+        backwards = cursor is not None and cursor["d"] == "p"
+        # walking to the previous page is the same seek with the direction flipped
+        walk_desc = descending != backwards
+
+        keys = [self.field] if self.field == "pk" else [self.field, "pk"]
+        immediate, deferred = queryset.query.deferred_loading
+        if (not deferred and immediate and self.field != "pk"
+                and self.field not in immediate and self.field not in queryset.query.annotations):
+            # sparse querysets still have to load the key the cursor is built from
+            queryset = queryset.only(*immediate, self.field)
+        queryset = queryset.order_by(*[f"-{key}" if walk_desc else key for key in keys])
+        if cursor:
+            queryset = queryset.filter(self._seek(cursor, walk_desc))
+
+        rows = list(queryset[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+
+        if backwards:
+            rows.reverse()
+            self.has_next, self.has_prev = True, has_more
+        else:
+            self.has_next, self.has_prev = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        response = RestResponse(
+            status=RestStatus(True, 200, "OK"),
+            data=data,
+            meta=self.get_meta()
+        )
+        return Response(response.to_dict(), status=status.HTTP_200_OK)
+
+    def get_meta(self):
+        return {
+            "next": self._encode_cursor(self.page[-1], "n") if self.has_next and self.page else None,
+            "prev": self._encode_cursor(self.page[0], "p") if self.has_prev and self.page else None,
+            "ordering": self.ordering,
+            "limit": self.limit,
+        }
+
+    def _get_limit(self, params):
+        try:
+            limit = int(params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            raise ValidationError({self.page_size_query_param: "Must be an integer"})
+        return max(1, min(limit, self.max_page_size))
+
+    def _seek(self, cursor, descending):
+        op = "lt" if descending else "gt"
+        if self.field == "pk":
+            return Q(**{f"pk__{op}": cursor["id"]})
+        value = cursor["v"]
+        return Q(**{f"{self.field}__{op}e": value}) & (
+            Q(**{f"{self.field}__{op}": value}) | Q(**{f"pk__{op}": cursor["id"]})
+        )
+
+    def _coerce_cursor(self, cursor, model):
+        # the cursor comes from the client: values that do not fit the key
+        # columns are a bad request, not a database error
+        try:
+            cursor["id"] = model._meta.pk.to_python(cursor["id"])
+            if self.field != "pk":
+                cursor["v"] = model._meta.get_field(self.field).to_python(cursor["v"])
+                if cursor["v"] is None:
+                    raise DjangoValidationError("Missing cursor value")
+        except FieldDoesNotExist:
+            # an annotation, compared as given
+            pass
+        except (DjangoValidationError, TypeError, ValueError):
+            raise ValidationError({self.cursor_query_param: "Invalid cursor"})
+        return cursor
+
+    def _encode_cursor(self, row, direction):
+        value = None if self.field == "pk" else getattr(row, self.field)
+        payload = {
+            "o": self.ordering,
+            "v": value if isinstance(value, (int, float)) or value is None else str(value),
+            "id": str(row.pk),
+            "d": direction,
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('utf-8').rstrip('=')
+
+    def _decode_cursor(self, token):
+        if not token:
+            return None
+        try:
+            token += "=" * (-len(token) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(token.encode('utf-8')))
+            if cursor["d"] not in ("n", "p") or not cursor["id"] or not isinstance(cursor["o"], str):
+                raise ValueError
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise ValidationError({self.cursor_query_param: "Invalid cursor"})
+        return cursor
+
+
+class ProfileBookingPagination(KeysetPagination):
+    page_size = settings.PROFILE_RECENT_BOOKINGS
+    max_page_size = settings.REALTY_MAX_PAGE_SIZE
+
+    ordering_fields = {
+        "created": "created_at",
+        "start": "start_date",
+    }
+    default_ordering = "-created"
+
+
+class RealtyKeysetPagination(KeysetPagination):
+    page_size = settings.REALTY_PAGE_SIZE
+    max_page_size = settings.REALTY_MAX_PAGE_SIZE
+
+    ordering_fields = {
+        "id": "pk",
+        "price": "price",
+        "rating": "avg_rating",
+    }
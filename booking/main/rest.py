@@ -15,12 +15,16 @@ class RestStatus:
 
 
 class RestResponse:
-    def __init__(self, status: RestStatus, data):
+    def __init__(self, status: RestStatus, data, meta: dict = None):
         self.status = status
         self.data = data
+        self.meta = meta
 
     def to_dict(self):
-        return {
+        result = {
             "status": self.status.to_dict(),
             "data": self.data
         }
+        if self.meta is not None:
+            result["meta"] = self.meta
+        return result
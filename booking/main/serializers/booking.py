@@ -5,7 +5,7 @@ from main.serializers.location import CitySerializer
 from main.serializers.common import *
 from django.urls import reverse
 
-class BookingRealtyNameSerializer(serializers.ModelSerializer):
+class BookingRealtyNameSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     city = CitySerializer(read_only=True)
     class Meta:
         model = Realty
@@ -16,7 +16,7 @@ class BookingRealtyNameSerializer(serializers.ModelSerializer):
         )
 
 
-class BookingItemShortSerializer(serializers.ModelSerializer):
+class BookingItemShortSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     realtyId = serializers.ReadOnlyField(source="realty.id")
     startDate = serializers.DateTimeField(source="start_date")
     endDate = serializers.DateTimeField(source="end_date")
@@ -27,6 +27,10 @@ class BookingItemShortSerializer(serializers.ModelSerializer):
 
     deletedAt = serializers.DateTimeField(source="deleted_at")
 
+    prefetch_related_fields = {
+        "images": ("realty__images",),
+    }
+
     class Meta:
         model = BookingItem
         fields = (
@@ -56,7 +60,7 @@ class BookingItemShortSerializer(serializers.ModelSerializer):
 
         return result
 
-class BookingItemSerializer(serializers.ModelSerializer):
+class BookingItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = BookingItem
         fields = (
@@ -1,6 +1,147 @@
 from rest_framework import serializers
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from main.models import *
 
+
+class EagerLoadingMixin:
+    """
+    Lets a serializer declare the joins its fields walk, so a view can load
+    everything up front instead of one query per row.
+
+    `select_related_fields` / `prefetch_related_fields` map a serializer field
+    to the lookups it needs, `only_fields` to the extra root columns a method
+    field reads when the query is narrowed with `only()`. Nested serializer fields are discovered from the
+    declared fields: single relations are joined, collections are prefetched,
+    and a nested serializer's own plan is folded in under its source.
+    """
+    select_related_fields = {}
+    prefetch_related_fields = {}
+    only_fields = {}
+
+    @classmethod
+    def get_selected_fields(cls, context: dict = None):
+        """Field names the serializer will render for `context`, None for all of them."""
+        return None
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, context: dict = None):
+        select_related, prefetch_related = cls.get_eager_loading(context=context)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+
+        selected = cls.get_selected_fields(context)
+        if selected is not None:
+            queryset = queryset.only(*cls.get_only_fields(selected))
+        return queryset
+
+    @classmethod
+    def get_eager_loading(cls, prefix: str = "", context: dict = None) -> tuple:
+        select_related, prefetch_related = [], []
+        selected = cls.get_selected_fields(context)
+
+        names = [*cls._declared_fields, *cls.select_related_fields, *cls.prefetch_related_fields]
+        for name in dict.fromkeys(names):
+            if selected is not None and name not in selected:
+                continue
+
+            select_related += [prefix + lookup for lookup in cls.select_related_fields.get(name, ())]
+            prefetch_related += [prefix + lookup for lookup in cls.prefetch_related_fields.get(name, ())]
+
+            field = cls._declared_fields.get(name)
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+
+            path = prefix + (field.source or name).replace(".", "__")
+            if many:
+                model = nested.Meta.model
+                queryset = model.objects.all()
+                if isinstance(nested, EagerLoadingMixin):
+                    queryset = nested.setup_eager_loading(queryset, context)
+                prefetch_related.append(Prefetch(path, queryset=queryset))
+            else:
+                select_related.append(path)
+                if isinstance(nested, EagerLoadingMixin):
+                    nested_select, nested_prefetch = nested.get_eager_loading(path + "__", context)
+                    select_related += nested_select
+                    prefetch_related += nested_prefetch
+
+        return select_related, prefetch_related
+
+    @classmethod
+    def get_only_fields(cls, selected) -> list:
+        """Root model columns the `selected` fields read, for `QuerySet.only()`."""
+        opts = cls.Meta.model._meta
+        columns = {opts.pk.name}
+
+        for name in selected:
+            field = cls._declared_fields.get(name)
+            source = (field.source if field is not None else None) or name
+            lookups = [
+                source.split(".")[0],
+                *cls.select_related_fields.get(name, ()),
+                *cls.only_fields.get(name, ()),
+            ]
+            for lookup in lookups:
+                column = lookup.split("__")[0]
+                try:
+                    model_field = opts.get_field(column)
+                except FieldDoesNotExist:
+                    continue
+                if model_field.concrete:
+                    columns.add(column)
+
+        return sorted(columns)
+
+
+class SparseFieldsMixin:
+    """
+    `?fields=` picks the top-level fields to render and `?expand=` opts into
+    the nested collections listed in `expandable_fields`.
+
+    The selection only applies when the view puts `parse_field_params()` into
+    the serializer context; without it every field is rendered as before.
+    Combined with `EagerLoadingMixin` the same selection also trims the query.
+    """
+    expandable_fields = ()
+
+    @staticmethod
+    def parse_field_params(params) -> dict:
+        def split(name):
+            value = params.get(name)
+            if value is None:
+                return None
+            return {part.strip() for part in value.split(",") if part.strip()}
+
+        return {
+            "fields": split("fields"),
+            "expand": split("expand") or set(),
+        }
+
+    @classmethod
+    def get_selected_fields(cls, context: dict = None):
+        if not context or "expand" not in context:
+            return None
+
+        names = set(cls.Meta.fields)
+        expand = set(context["expand"]) & set(cls.expandable_fields)
+        fields = context.get("fields")
+        if fields:
+            return names & (set(fields) | expand)
+        return names - set(cls.expandable_fields) | expand
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.get_selected_fields(self.context)
+        if selected is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
+
+
 class CardSerializer(serializers.ModelSerializer):
     class Meta:
         model = Card
@@ -11,7 +152,7 @@ class CardSerializer(serializers.ModelSerializer):
             'expiration_date',
         )
 
-class UserDataSerializer(serializers.ModelSerializer):
+class UserDataSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     cards = CardSerializer(many=True, read_only=True)
 
     class Meta:
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from main.models import *
-from main.serializers.common import UserDataSerializer
+from main.serializers.common import UserDataSerializer, EagerLoadingMixin
 
 class FeedbackShortSerializer(serializers.ModelSerializer):
     realty_name = serializers.CharField(source='realty.name')
@@ -15,7 +15,7 @@ class FeedbackShortSerializer(serializers.ModelSerializer):
             'realty_name',
         )
 
-class FeedbackSerializer(serializers.ModelSerializer):
+class FeedbackSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     user_data = UserDataSerializer(source='user_access.user_data', read_only=True)
     class Meta:
         model = Feedback
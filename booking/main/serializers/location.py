@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from main.models import *
+from main.serializers.common import EagerLoadingMixin
 
 class CountrySerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,7 +9,7 @@ class CountrySerializer(serializers.ModelSerializer):
             'name',
         )
 
-class CitySerializer(serializers.ModelSerializer):
+class CitySerializer(EagerLoadingMixin, serializers.ModelSerializer):
     country = CountrySerializer(read_only=True)
     class Meta:
         model = City
@@ -2,7 +2,7 @@ from rest_framework import serializers
 from main.models import *
 from main.serializers.feeedback import FeedbackSerializer, AccRatesSerializer
 from main.serializers.location import CitySerializer
-from main.serializers.booking import BookingItemSerializer
+from main.serializers.common import EagerLoadingMixin, SparseFieldsMixin
 from django.urls import reverse
 from django.conf import settings
 from main.models import RealtyGroup
@@ -17,6 +17,17 @@ class RealtySearchSerializer(serializers.Serializer):
     )
     City = serializers.CharField(write_only=True, required=False, allow_null=True, allow_blank=True)
     login = serializers.CharField(write_only=True, required=False, allow_null=True)
+    StartDate = serializers.DateField(required=False, allow_null=True)
+    EndDate = serializers.DateField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        start_date = attrs.get("StartDate")
+        end_date = attrs.get("EndDate")
+        if bool(start_date) != bool(end_date):
+            raise serializers.ValidationError("StartDate and EndDate must be given together")
+        if start_date and start_date >= end_date:
+            raise serializers.ValidationError("EndDate must be after StartDate")
+        return attrs
 
 # ----------------------------------------------------------------------------------------
 
@@ -100,18 +111,22 @@ class LikedRealtySearchSerializer(serializers.ModelSerializer):
 
 # ----------------------------------------------------------------------------------------
 
-class RealtySerializer(serializers.ModelSerializer):
+class RealtySerializer(SparseFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     city = CitySerializer(read_only=True)
     group = serializers.CharField(source='realty_group.name', read_only=True)
 
     feedbacks = FeedbackSerializer(many=True, read_only=True)
-    booking_items = BookingItemSerializer(many=True, read_only=True)
 
     images = serializers.SerializerMethodField()
     accRates = serializers.SerializerMethodField()
 
     liked = serializers.SerializerMethodField()
 
+    select_related_fields = {"group": ("realty_group",)}
+    prefetch_related_fields = {"images": ("images",)}
+    only_fields = {"accRates": ("avg_rating", "rating_count")}
+    expandable_fields = ("feedbacks",)
+
     class Meta:
         model = Realty
         fields = (
@@ -124,7 +139,6 @@ class RealtySerializer(serializers.ModelSerializer):
             'group',
             'accRates',
             'feedbacks',
-            'booking_items',
             'images',
             'liked'
         )
@@ -133,9 +147,14 @@ class RealtySerializer(serializers.ModelSerializer):
         user_access = self.context.get("user_access")
         if not user_access:
             return "error"
-        like_instance = obj.liked_by.filter(
-            user_access=user_access
-        ).first()
+
+        liked_map = self.context.get("liked_map")
+        if liked_map is not None:
+            like_instance = liked_map.get(obj.id)
+        else:
+            like_instance = obj.liked_by.filter(
+                user_access=user_access
+            ).first()
 
         if like_instance:
             return LikedRealtySearchSerializer(like_instance).data
@@ -154,7 +173,11 @@ class RealtySerializer(serializers.ModelSerializer):
                 url = request.build_absolute_uri(url)
 
             result.append({
-                "imageUrl": url
+                "imageUrl": url,
+                "sizes": {
+                    size: f"{url}?size={size}"
+                    for size in settings.IMAGE_DERIVATIVES
+                }
             })
 
         return result
@@ -164,11 +187,11 @@ class RealtySerializer(serializers.ModelSerializer):
         avg = 0.0
         count = 0
 
-        if hasattr(obj, "avg_rating") and obj.avg_rating is not None:
+        if obj.avg_rating is not None:
             avg = round(float(obj.avg_rating), 2)
 
-        if hasattr(obj, "rates_count") and obj.rates_count is not None:
-            count = int(obj.rates_count)
+        if obj.rating_count is not None:
+            count = int(obj.rating_count)
 
         return AccRatesSerializer({
             "avgRate": avg,
@@ -260,14 +283,16 @@ class RealtyUpdateSerializer(serializers.ModelSerializer):
 
 # ----------------------------------------------------------------------------------------
 
-class LikedRealtySerializer(serializers.ModelSerializer):
-    realty = serializers.SerializerMethodField()
+class LikedRealtySerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    realty = RealtySerializer(read_only=True)
 
     user_login = serializers.CharField(
         source='user_access.login',
         read_only=True
     )
 
+    select_related_fields = {"user_login": ("user_access",)}
+
     class Meta:
         model = LikedRealty
         fields = (
@@ -277,16 +302,10 @@ class LikedRealtySerializer(serializers.ModelSerializer):
             'realty',
         )
 
-    def get_realty(self, obj):
-        return RealtySerializer(
-            obj.realty,
-            context=self.context
-        ).data
-
 
 # ----------------------------------------------------------------------------------------
 
-class LikedRealtyListSerializer(serializers.ModelSerializer):
+class LikedRealtyListSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     realty = RealtySerializer(read_only=True) 
 
     class Meta:
@@ -5,12 +5,14 @@ from main.serializers.feeedback import FeedbackShortSerializer
 from main.serializers.common import UserDataSerializer, CardSerializer
 from main.rest import *
 import datetime
+from django.conf import settings
 from backend.services import *
 from django.core.exceptions import *
 
 
 randomService = DefaultRandomService()
-kdfService = PbKdfService()
+kdfService = KdfService()
+passwordVerifier = PasswordVerifier(kdfService)
 
 class UserRoleSerializer(serializers.ModelSerializer):
     class Meta:
@@ -57,6 +59,9 @@ class UserAccessCreateSerializer(serializers.ModelSerializer):
         login = validated_data.pop('login')
         if UserAccess.objects.filter(login=login):
             raise ValidationError
+        # hashed first: a busy KDF pool fails the request before anything is saved
+        salt = randomService.otp(12)
+        dk = passwordVerifier.dk(password, salt)
        
         userData = UserData(
             first_name = validated_data.pop('first_name'), 
@@ -66,8 +71,6 @@ class UserAccessCreateSerializer(serializers.ModelSerializer):
             registered_at = datetime.datetime.now()
             )
         userData.save()
-        salt = randomService.otp(12)
-        dk = kdfService.dk(password, salt)
 
         userAccess = UserAccess(
             user_id = userData.id,
@@ -97,11 +100,9 @@ class UserAccessSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
-    bookingItems = BookingItemShortSerializer(
-        source="booking_items",
-        many=True,
-        read_only=True
-    )
+    # bounded: the view passes the page it paginated in the context, anything
+    # else gets the most recent PROFILE_RECENT_BOOKINGS
+    bookingItems = serializers.SerializerMethodField()
 
     class Meta:
         model = UserAccess
@@ -118,4 +119,13 @@ class UserAccessSerializer(serializers.ModelSerializer):
             "bookingItems",
         )
 
+    def get_bookingItems(self, obj):
+        bookingItems = self.context.get("bookingItems")
+        if bookingItems is None:
+            queryset = BookingItemShortSerializer.setup_eager_loading(
+                BookingItem.objects.filter(user_access=obj)
+            )
+            bookingItems = queryset.order_by("-created_at", "-pk")[:settings.PROFILE_RECENT_BOOKINGS]
+        return BookingItemShortSerializer(bookingItems, many=True, context=self.context).data
+
    
\ No newline at end of file
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from backend.services import ResponseCacheService
+from main.models import BookingItem, Card, UserAccess, UserData
+
+
+responseCache = ResponseCacheService()
+
+
+def bump_profiles(userDataId):
+    logins = UserAccess.objects.filter(user_data_id=userDataId).values_list("login", flat=True)
+    scopes = [f"profile:{login}" for login in logins]
+    if scopes:
+        responseCache.bump(*scopes)
+
+
+# cards and user data have no service of their own, so every write path
+# (admin, shell, other apps) is covered here rather than at the call sites
+@receiver([post_save, post_delete], sender=Card)
+def card_changed(sender, instance, **kwargs):
+    bump_profiles(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserData)
+def user_data_changed(sender, instance, **kwargs):
+    bump_profiles(instance.id)
+
+
+# BookingService bumps these itself; admin edits of a booking bypass it, and
+# the booking list and profiles are built from the booking rows
+@receiver([post_save, post_delete], sender=BookingItem)
+def booking_changed(sender, instance, **kwargs):
+    logins = UserAccess.objects.filter(id=instance.user_access_id).values_list("login", flat=True)
+    responseCache.bump("occupancy", *(f"profile:{login}" for login in logins))
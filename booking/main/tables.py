@@ -0,0 +1,148 @@
+from abc import ABC, abstractmethod
+from itertools import islice
+from asgiref.sync import sync_to_async
+import csv
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.html import format_html, format_html_join
+from main.rest import RestResponse, RestStatus
+
+
+class Echo:
+    """
+    File-like sink for csv.writer that hands each formatted line back
+    instead of buffering it.
+    """
+    def write(self, value):
+        return value
+
+
+class AdminTable(ABC):
+    """
+    Server-side admin table: `page`, `pageSize`, `sort` (`name` or `-name`)
+    and `search` select one page, which is fetched as a single joined
+    `values_list` query and rendered to escaped `<tr>` rows. `format=csv`
+    streams every matching row instead, so an export never holds the whole
+    table in memory. Under ASGI the rows come from an async iterator: Django
+    would read a sync one into a list before sending anything.
+    """
+    page_size = settings.ADMIN_TABLE_PAGE_SIZE
+    max_page_size = settings.ADMIN_TABLE_MAX_PAGE_SIZE
+    export_chunk_size = settings.ADMIN_EXPORT_CHUNK_SIZE
+
+    # (header, field lookup or annotation name)
+    columns = []
+    # annotation name -> expression, for computed columns
+    annotations = {}
+    # field lookup -> callable applied to the value before rendering
+    formatters = {}
+    # public sort name -> field lookup
+    ordering_fields = {}
+    default_ordering = None
+    search_fields = []
+    export_name = "export"
+
+    @abstractmethod
+    def get_queryset(self):
+        pass
+
+    def response(self, request):
+        params = request.GET
+        try:
+            ordering = self._get_ordering(params.get("sort"))
+            search = params.get("search", "").strip()
+            if params.get("format") == "csv":
+                return self.export(request, self._filter(search), ordering)
+            page, pageSize = self._get_page(params)
+        except ValueError as e:
+            responseObj = RestResponse(status=RestStatus(False, 400, "Bad Request"), data={"error": e.__str__()})
+            return JsonResponse(responseObj.to_dict(), status=400)
+
+        queryset = self._filter(search)
+        total = queryset.count()
+        start = (page - 1) * pageSize
+        rows = queryset.order_by(*ordering).values_list(*self._lookups())[start:start + pageSize]
+
+        responseObj = RestResponse(
+            status=RestStatus(True, 200, "Ok"),
+            data="".join(self.render_row(values) for values in rows),
+            meta={
+                "page": page,
+                "pageSize": pageSize,
+                "total": total,
+                "pages": (total + pageSize - 1) // pageSize,
+                "sort": params.get("sort") or self.default_ordering,
+                "search": search,
+                "columns": [header for header, _ in self.columns],
+            }
+        )
+        return JsonResponse(responseObj.to_dict(), status=200)
+
+    def export(self, request, queryset, ordering):
+        writer = csv.writer(Echo())
+        header = writer.writerow([header for header, _ in self.columns])
+        rows = queryset.order_by(*ordering).values_list(*self._lookups())
+
+        def lines():
+            yield header
+            for values in rows.iterator(chunk_size=self.export_chunk_size):
+                yield writer.writerow(self._format(values))
+
+        async def alines():
+            yield header
+            # QuerySet.aiterator() runs a values_list query in the event loop, so
+            # the chunks are read from the sync iterator on the connection's thread
+            iterator = rows.iterator(chunk_size=self.export_chunk_size)
+            fetch = sync_to_async(lambda: list(islice(iterator, self.export_chunk_size)))
+            while chunk := await fetch():
+                yield "".join(writer.writerow(self._format(values)) for values in chunk)
+
+        content = alines() if isinstance(request, ASGIRequest) else lines()
+        response = StreamingHttpResponse(content, content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{self.export_name}.csv"'
+        return response
+
+    def render_row(self, values) -> str:
+        return format_html(
+            "<tr>{}</tr>",
+            format_html_join("", "<td>{}</td>", ((value,) for value in self._format(values)))
+        )
+
+    def _format(self, values) -> list:
+        return [
+            self.formatters[lookup](value) if lookup in self.formatters and value is not None else value
+            for (_, lookup), value in zip(self.columns, values)
+        ]
+
+    def _lookups(self) -> list:
+        return [lookup for _, lookup in self.columns]
+
+    def _filter(self, search: str):
+        queryset = self.get_queryset()
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        if search:
+            condition = Q()
+            for field in self.search_fields:
+                condition |= Q(**{f"{field}__icontains": search})
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def _get_ordering(self, sort: str) -> list:
+        sort = sort or self.default_ordering
+        name = sort.lstrip("-")
+        if name not in self.ordering_fields:
+            raise ValueError(f"Unsupported sort '{sort}'")
+        prefix = "-" if sort.startswith("-") else ""
+        # pk breaks ties so rows do not move between pages
+        return [f"{prefix}{self.ordering_fields[name]}", f"{prefix}pk"]
+
+    def _get_page(self, params) -> tuple:
+        try:
+            page = int(params.get("page", 1))
+            pageSize = int(params.get("pageSize", self.page_size))
+        except (TypeError, ValueError):
+            raise ValueError("'page' and 'pageSize' must be integers")
+        return max(1, page), max(1, min(pageSize, self.max_page_size))
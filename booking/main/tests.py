@@ -1,3 +1,1060 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from importlib import import_module
+from unittest import mock, skipUnless
+import base64, csv, datetime, hashlib, importlib.util, inspect, io, json, os, re, subprocess, sys, tempfile, threading, time, uuid
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections, router, transaction
+from django.http import HttpResponse
+from django.test import AsyncClient, AsyncRequestFactory, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.routers import ReplicaRouter, replicaAliases
+from backend.services import (
+    BloomFilter, BookingConflictError, BookingService, ByteLruCache, DiskStorageService, InvalidItemError, JwtService,
+    KdfBusyError, KdfService, OccupancyBitmap, OccupancyService, PasswordVerifier, PbKdfService, ResponseCacheService,
+    TokenRevocationService, writeQueue
+)
+from main.asyncviews import read_or_write
+from main.models import *
+from main.tables import AdminTable
+from main.views.realty import realtyAdminTable
+
+
+def makeUser(login: str = "alice", password: str = "pw") -> UserAccess:
+    role, _ = UserRole.objects.get_or_create(id="SelfRegistered", defaults={"description": "Self registered"})
+    userData = UserData.objects.create(first_name="Alice", last_name="Smith", email=f"{login}@example.com")
+    return UserAccess.objects.create(
+        user_id=userData.id,
+        login=login,
+        salt="salt",
+        dk=PbKdfService().dk(password, "salt"),
+        user_data=userData,
+        user_role=role
+    )
+
+
+def makeRealty(name: str = "Villa") -> Realty:
+    country, _ = Country.objects.get_or_create(name="Ukraine")
+    city, _ = City.objects.get_or_create(name="Kyiv", country=country)
+    group, _ = RealtyGroup.objects.get_or_create(slug="villas", defaults={"name": "Villas", "description": "Villas"})
+    return Realty.objects.create(
+        name=name,
+        description="A villa",
+        slug=name.lower(),
+        price=100,
+        city=city,
+        realty_group=group
+    )
+
+
+def bearerClient(userAccess: UserAccess) -> APIClient:
+    client = APIClient()
+    response = client.post("/api/auth/", HTTP_AUTHORIZATION=basicAuth(userAccess.login, "pw"))
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['data']}")
+    return client
+
+
+def basicAuth(login: str, password: str) -> str:
+    return "Basic " + base64.b64encode(f"{login}:{password}".encode()).decode()
+
+
+class JwtAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.userAccess = makeUser()
+        self.client = APIClient()
+
+    def login(self) -> str:
+        response = self.client.post("/api/auth/", HTTP_AUTHORIZATION=basicAuth("alice", "pw"))
+        self.assertEqual(response.status_code, 200)
+        return response.json()["data"]
+
+    def bearer(self, token: str) -> APIClient:
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+    @override_settings(JWT_SECRET="test-secret")
+    def test_token_is_signed_with_jwt_secret(self):
+        token = self.login()
+        JwtService().decodeJwt(token, "test-secret")
+        with self.assertRaises(ValueError):
+            JwtService().decodeJwt(token, "JwtService")
+
+    def test_forged_token_is_not_trusted(self):
+        forged = JwtService().encodeJwt(
+            {"jti": "forged", "Id": str(self.userAccess.id), "Exp": str(int(time.time()) + 600)},
+            secret="JwtService"
+        )
+        self.assertEqual(self.bearer(forged).post("/api/auth/logout").status_code, 401)
+
+    def test_token_signed_with_default_key_is_rejected(self):
+        forged = JwtService().encodeJwt(
+            {"jti": "forged", "Id": str(self.userAccess.id), "RoleId": "admin", "Exp": str(int(time.time()) + 600)},
+            secret=settings.INSECURE_SECRET_KEY
+        )
+        self.assertEqual(self.bearer(forged).post("/api/auth/logout").status_code, 401)
+
+    def test_production_settings_require_jwt_secret(self):
+        for jwtSecret in ("", settings.INSECURE_SECRET_KEY):
+            with self.subTest(jwtSecret=jwtSecret):
+                result = subprocess.run(
+                    [sys.executable, "-c", "import backend.settings"],
+                    env={**os.environ, "DEBUG": "0", "JWT_SECRET": jwtSecret},
+                    cwd=settings.BASE_DIR,
+                    capture_output=True,
+                    text=True
+                )
+                self.assertNotEqual(result.returncode, 0)
+                self.assertIn("ImproperlyConfigured", result.stderr)
+
+    def test_bad_token_leaves_allow_any_endpoints_anonymous(self):
+        expired = JwtService().encodeJwt({"jti": "expired", "Id": str(self.userAccess.id), "Exp": str(int(time.time()) - 600)})
+        self.assertEqual(self.bearer(expired).get("/api/cities/").status_code, 200)
+        self.assertEqual(self.bearer("not-a-token").get("/api/realty/").status_code, 200)
+
+    def test_logout_revokes_token(self):
+        token = self.login()
+        client = self.bearer(token)
+        self.assertEqual(client.post("/api/auth/logout").status_code, 200)
+        self.assertIsNotNone(AccessToken.objects.get(user_access=self.userAccess).revoked_at)
+        self.assertEqual(client.post("/api/auth/logout").status_code, 401)
+
+
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        self.userAccess = makeUser()
+        self.enterContext(mock.patch.multiple(TokenRevocationService, _filter=None, _nextSync=0.0, _nextRebuild=0.0))
+
+    def token(self, jti: str, expiresIn: int = 600, revoked: bool = False) -> AccessToken:
+        now = timezone.now()
+        return AccessToken.objects.create(
+            jti=jti,
+            user_access=self.userAccess,
+            expires_at=now + datetime.timedelta(seconds=expiresIn),
+            revoked_at=now if revoked else None
+        )
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        members = [str(uuid.uuid4()) for _ in range(1000)]
+        for member in members:
+            bloom.add(member)
+        self.assertTrue(all(member in bloom for member in members))
+        falsePositives = sum(str(uuid.uuid4()) in bloom for _ in range(10000))
+        self.assertLess(falsePositives, 200)
+
+    def test_unrevoked_token_costs_no_query(self):
+        self.token("revoked", revoked=True)
+        revocations = TokenRevocationService()
+        self.assertTrue(revocations.isRevoked("revoked"))
+        with self.assertNumQueries(0):
+            self.assertFalse(revocations.isRevoked("live"))
+
+    def test_filter_hit_is_confirmed_against_the_table(self):
+        self.token("live")
+        revocations = TokenRevocationService()
+        revocations.isRevoked("warm-up")
+        # a false positive: the filter says yes, the table says no
+        TokenRevocationService._filter.add("live")
+        with self.assertNumQueries(1):
+            self.assertFalse(revocations.isRevoked("live"))
+
+    @override_settings(JWT_REVOCATION_SYNC_SECONDS=0)
+    def test_revocation_by_another_process_is_synced(self):
+        token = self.token("elsewhere")
+        revocations = TokenRevocationService()
+        self.assertFalse(revocations.isRevoked("elsewhere"))
+        AccessToken.objects.filter(jti=token.jti).update(revoked_at=timezone.now())
+        self.assertTrue(revocations.isRevoked("elsewhere"))
+
+    def test_purge_deletes_only_tokens_expired_past_the_grace(self):
+        for jti, expiresIn in (("old", -7200), ("older", -9000), ("grace", -60), ("live", 600)):
+            self.token(jti, expiresIn)
+        AccessToken.objects.create(jti="no-expiry", user_access=self.userAccess)
+        out = io.StringIO()
+        call_command("purge_access_tokens", "--batch-size", "1", "--grace", "3600", stdout=out)
+        self.assertEqual(sorted(AccessToken.objects.values_list("jti", flat=True)), ["grace", "live", "no-expiry"])
+        self.assertIn("Purged 2 access tokens", out.getvalue())
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def produce(self):
+        self.calls += 1
+        return self.calls
+
+    @override_settings(RESPONSE_CACHE=False)
+    def test_disabled_cache_runs_producer_every_time(self):
+        responseCache = ResponseCacheService()
+        self.assertEqual(responseCache.getOrSet("test", {}, ["test"], self.produce), 1)
+        self.assertEqual(responseCache.getOrSet("test", {}, ["test"], self.produce), 2)
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_bump_retires_cached_response(self):
+        responseCache = ResponseCacheService()
+        self.assertEqual(responseCache.getOrSet("test", {}, ["test"], self.produce), 1)
+        self.assertEqual(responseCache.getOrSet("test", {}, ["test"], self.produce), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            responseCache.bump("test")
+        self.assertEqual(responseCache.getOrSet("test", {}, ["test"], self.produce), 2)
+
+
+class EtagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.realty = makeRealty()
+
+    def etag(self, path: str) -> str:
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(path, headers={"if-none-match": response["ETag"]}).status_code, 304)
+        return response["ETag"]
+
+    @override_settings(RESPONSE_CACHE=False)
+    def test_fingerprint_etag_without_shared_cache(self):
+        listEtag, detailEtag = self.etag("/api/realty/"), self.etag(f"/api/realty/{self.realty.id}/")
+        # a write that bumps no version still changes both
+        Realty.objects.filter(id=self.realty.id).update(price=150, updated_at=timezone.now())
+        self.assertNotEqual(self.etag("/api/realty/"), listEtag)
+        self.assertNotEqual(self.etag(f"/api/realty/{self.realty.id}/"), detailEtag)
+
+    @override_settings(RESPONSE_CACHE=False)
+    def test_other_realty_keeps_detail_etag(self):
+        detailEtag = self.etag(f"/api/realty/{self.realty.id}/")
+        makeRealty("Other")
+        self.assertEqual(self.etag(f"/api/realty/{self.realty.id}/"), detailEtag)
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_version_bump_changes_etag_with_shared_cache(self):
+        etag = self.etag("/api/realty/")
+        with self.captureOnCommitCallbacks(execute=True):
+            ResponseCacheService().bump("realty")
+        self.assertNotEqual(self.etag("/api/realty/"), etag)
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_booking_saved_outside_service_changes_etag(self):
+        etag = self.etag("/api/booking-item")
+        start = timezone.now() + datetime.timedelta(days=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingItem.objects.create(
+                realty=self.realty, user_access=makeUser(), start_date=start, end_date=start + datetime.timedelta(days=1)
+            )
+        self.assertNotEqual(self.etag("/api/booking-item"), etag)
+
+    @override_settings(RESPONSE_CACHE=False)
+    def test_booking_list_etag_follows_booking_rows(self):
+        etag = self.etag("/api/booking-item")
+        start = timezone.now() + datetime.timedelta(days=3)
+        booking = BookingItem.objects.create(
+            realty=self.realty, user_access=makeUser(), start_date=start, end_date=start + datetime.timedelta(days=1)
+        )
+        created = self.etag("/api/booking-item")
+        self.assertNotEqual(created, etag)
+        BookingService().cancel(booking.id)
+        self.assertNotEqual(self.etag("/api/booking-item"), created)
+
+
+class FeedbackRatingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = makeUser("alice")
+        self.realty = makeRealty()
+        self.client = bearerClient(self.author)
+
+    def post(self, client: APIClient, data: dict):
+        return client.post("/api/feedback", data, format="json")
+
+    def assertRating(self, ratingSum: int, ratingCount: int, avgRating: float):
+        self.realty.refresh_from_db()
+        self.assertEqual((self.realty.rating_sum, self.realty.rating_count), (ratingSum, ratingCount))
+        self.assertAlmostEqual(self.realty.avg_rating, avgRating)
+
+    def test_create_update_delete_apply_deltas(self):
+        first = self.post(self.client, {"realtyId": str(self.realty.id), "userAccessId": str(self.author.id), "text": "ok", "rate": 5})
+        second = self.post(self.client, {"realtyId": str(self.realty.id), "userAccessId": str(self.author.id), "text": "meh", "rate": 2})
+        self.assertEqual(first.status_code, 201)
+        self.assertRating(7, 2, 3.5)
+
+        self.assertEqual(self.post(self.client, {"id": second.json()["data"]["id"], "rate": 4}).status_code, 200)
+        self.assertRating(9, 2, 4.5)
+
+        self.assertEqual(self.post(self.client, {"id": first.json()["data"]["id"], "deleted": True}).status_code, 200)
+        self.assertRating(4, 1, 4.0)
+        self.assertEqual(self.post(self.client, {"id": first.json()["data"]["id"], "deleted": True}).status_code, 404)
+
+    def test_only_author_changes_feedback(self):
+        created = self.post(self.client, {"realtyId": str(self.realty.id), "userAccessId": str(self.author.id), "text": "ok", "rate": 5})
+        feedbackId = created.json()["data"]["id"]
+
+        self.assertEqual(self.post(APIClient(), {"id": feedbackId, "deleted": True}).status_code, 401)
+        other = bearerClient(makeUser("bob"))
+        self.assertEqual(self.post(other, {"id": feedbackId, "rate": 1}).status_code, 404)
+        self.assertEqual(self.post(other, {"id": feedbackId, "deleted": True}).status_code, 404)
+        self.assertRating(5, 1, 5.0)
+
+
+class RealtyCalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.realty = makeRealty()
+
+    def test_impossible_date_is_bad_request(self):
+        response = self.client.get(f"/api/realty/{self.realty.id}/calendar", {"from": "2026-13-45"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["status"]["phrase"], "Invalid date range")
+
+    def test_default_window(self):
+        response = self.client.get(f"/api/realty/{self.realty.id}/calendar")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["occupied"], [])
+
+
+class StorageItemTests(TestCase):
+    def setUp(self):
+        self.name = f"{uuid.uuid4()}.png"
+        self.path = os.path.join(settings.STORAGE_PATH, self.name)
+        with open(self.path, "wb") as file:
+            file.write(b"\x89PNG\r\n\x1a\n" + b"x" * 100)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def body(self, response) -> bytes:
+        if not response.streaming:
+            return response.content
+        if response.is_async:
+            async def collect():
+                return b"".join([chunk async for chunk in response.streaming_content])
+            return async_to_sync(collect)()
+        return b"".join(response.streaming_content)
+
+    def test_success_is_cached_for_a_year(self):
+        response = self.client.get(f"/Storage/Item/{self.name}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_unsatisfiable_range_is_not_cached(self):
+        response = self.client.get(f"/Storage/Item/{self.name}", headers={"range": "bytes=500-600"})
+        self.assertEqual(response.status_code, 416)
+        self.assertFalse(response.has_header("Cache-Control"))
+
+    def test_single_range_is_partial(self):
+        for cache in (DiskStorageService.itemCache, ByteLruCache(maxBytes=0, maxItemBytes=0)):
+            with self.subTest(cached=cache.maxBytes > 0), mock.patch.object(DiskStorageService, "itemCache", cache):
+                response = self.client.get(f"/Storage/Item/{self.name}", headers={"range": "bytes=4-9"})
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response["Content-Range"], "bytes 4-9/108")
+                self.assertEqual(self.body(response), b"\r\n\x1a\nxx")
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        response = self.client.get(f"/Storage/Item/{self.name}", headers={"range": "bytes=-8", "if-range": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Length"], "108")
+
+    def test_head_has_headers_only(self):
+        response = self.client.head(f"/Storage/Item/{self.name}", headers={"range": "bytes=-8"})
+        self.assertEqual((response.status_code, response["Content-Length"], response.content), (206, "8", b""))
+
+    def test_rerendered_derivative_gets_new_etag(self):
+        derivative = os.path.join(settings.STORAGE_PATH, self.name.replace(".png", ".thumb.png"))
+        self.addCleanup(os.remove, derivative)
+        with open(derivative, "wb") as file:
+            file.write(b"\x89PNG\r\n\x1a\n" + b"y" * 10)
+        response = self.client.get(f"/Storage/Item/{self.name}", {"size": "thumb"})
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertIn(f"max-age={settings.IMAGE_DERIVATIVE_MAX_AGE}", response["Cache-Control"])
+
+        with open(derivative, "wb") as file:
+            file.write(b"\x89PNG\r\n\x1a\n" + b"z" * 20)
+        again = self.client.get(f"/Storage/Item/{self.name}", {"size": "thumb"}, headers={"if-none-match": response["ETag"]})
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again["ETag"], response["ETag"])
+
+    def test_failed_render_is_logged(self):
+        future = Future()
+        future.set_exception(RuntimeError("decompression bomb"))
+        with self.assertLogs("backend.services", level="ERROR") as logs:
+            DiskStorageService()._logDerivativeFailure("item.png", future)
+        self.assertIn("item.png", logs.output[0])
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    A replica0 alias on the test database, as DATABASE_REPLICAS would set up;
+    queries are told apart by the connection that runs them. It is added once
+    the test database exists and opens a second connection to it, so the rows
+    are committed rather than kept in a per-test transaction.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings["replica0"] = {**connections["default"].settings_dict, "TEST": {"MIRROR": "default"}}
+        cls.databases = {"default", "replica0"}
+        cls.router = next(r for r in router.routers if isinstance(r, ReplicaRouter))
+        cls.router.replicas = ["replica0"]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.router.replicas = replicaAliases()
+        connections["replica0"].close()
+        del connections["replica0"]
+        del connections.settings["replica0"]
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.userAccess = makeUser()
+        self.realty = makeRealty()
+
+    def read(self, client, path: str) -> tuple:
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica0"]) as replica:
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_safe_read_goes_to_replica(self):
+        primary, replica = self.read(self.client, "/api/booking-item")
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_write_pins_client_to_primary(self):
+        start = timezone.now() + datetime.timedelta(days=2)
+        response = self.client.post("/api/booking-item", {
+            "userAccessId": str(self.userAccess.id),
+            "realtyId": str(self.realty.id),
+            "startDate": start.isoformat(),
+            "endDate": (start + datetime.timedelta(days=1)).isoformat(),
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("db_primary", response.cookies)
+
+        primary, replica = self.read(self.client, "/api/booking-item")
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        # another client still reads the replica
+        self.assertEqual(self.read(Client(), "/api/booking-item")[0], 0)
+
+
+class ReadOrWriteTests(SimpleTestCase):
+    async def test_reads_stay_on_the_loop_and_writes_go_to_a_thread(self):
+        threads = {}
+
+        async def read(request, pk):
+            threads[request.method] = threading.get_ident()
+            return HttpResponse(f"read {pk}")
+
+        def write(request, pk):
+            threads[request.method] = threading.get_ident()
+            return HttpResponse(f"write {pk}")
+
+        view = read_or_write(read, write)
+        factory = AsyncRequestFactory()
+        for method, body in (("get", b"read 1"), ("head", b"read 1"), ("post", b"write 1"), ("delete", b"write 1")):
+            response = await view(getattr(factory, method)("/"), pk="1")
+            self.assertEqual(response.content, body)
+
+        loop = threading.get_ident()
+        self.assertEqual((threads["GET"], threads["HEAD"]), (loop, loop))
+        self.assertNotIn(loop, (threads["POST"], threads["DELETE"]))
+        self.assertTrue(view.csrf_exempt)
+
+    def test_async_read_views_take_over_read_urls(self):
+        spec = importlib.util.spec_from_file_location("async_urls", os.path.join(apps.get_app_config("main").path, "urls.py"))
+        urlconf = importlib.util.module_from_spec(spec)
+        with override_settings(ASYNC_READ_VIEWS=True):
+            spec.loader.exec_module(urlconf)
+        for path, isAsync in (("/api/realty/", True), ("/api/feedback", True), ("/api/realty/search", False)):
+            with self.subTest(path=path):
+                self.assertEqual(inspect.iscoroutinefunction(resolve(path, urlconf).func), isAsync)
+
+
+class RealtyKeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.realties = [makeRealty(f"Villa{index}") for index in range(5)]
+        for realty, price in zip(self.realties, [300, 100, 200, 100, 300]):
+            realty.price = price
+            realty.save(update_fields=["price"])
+
+    def page(self, **params) -> dict:
+        response = self.client.get("/api/realty/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_walks_price_ordering_with_ties(self):
+        expected = [str(realty.id) for realty in sorted(self.realties, key=lambda realty: (realty.price, realty.id))]
+        seen, pages = [], []
+        body = self.page(ordering="price", limit=2)
+        while True:
+            pages.append(body)
+            seen += [item["id"] for item in body["data"]]
+            if not body["meta"]["next"]:
+                break
+            body = self.page(cursor=body["meta"]["next"], limit=2)
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+
+        previous = self.page(cursor=pages[1]["meta"]["prev"], limit=2)
+        self.assertEqual(previous["data"], pages[0]["data"])
+        self.assertIsNone(previous["meta"]["prev"])
+
+    def test_invalid_cursor_is_bad_request(self):
+        self.assertEqual(self.client.get("/api/realty/", {"cursor": "garbage"}).status_code, 400)
+        for forged in (
+            {"o": "price", "v": "abc", "id": str(self.realties[0].id), "d": "n"},
+            {"o": "price", "v": 100, "id": "zzz", "d": "n"},
+            {"o": "rating", "v": None, "id": str(self.realties[0].id), "d": "n"},
+            {"o": "id", "v": None, "id": ["x"], "d": "p"},
+        ):
+            with self.subTest(cursor=forged):
+                cursor = base64.urlsafe_b64encode(json.dumps(forged).encode()).decode().rstrip("=")
+                response = self.client.get("/api/realty/", {"ordering": "price", "cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get("/api/realty/", {"ordering": "name"}).status_code, 400)
+
+
+class ProfileBookingPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.userAccess = makeUser()
+        realty = makeRealty()
+        start = timezone.now()
+        cls.bookingItems = [
+            BookingItem.objects.create(
+                realty=realty,
+                user_access=cls.userAccess,
+                start_date=start + datetime.timedelta(days=2 * index),
+                end_date=start + datetime.timedelta(days=2 * index + 1)
+            )
+            for index in range(5)
+        ]
+        BookingItem.objects.create(realty=realty, user_access=makeUser("bob"), start_date=start, end_date=start)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_profile_page_continues_on_bookings_endpoint(self):
+        profile = self.client.get("/api/user/alice", {"limit": 2}).json()
+        seen = [item["id"] for item in profile["data"]["bookingItems"]]
+        cursor = profile["meta"]["next"]
+        while cursor:
+            body = self.client.get("/api/user/alice/bookings", {"cursor": cursor, "limit": 2}).json()
+            seen += [item["id"] for item in body["data"]]
+            cursor = body["meta"]["next"]
+
+        newestFirst = sorted(self.bookingItems, key=lambda item: (item.created_at, item.pk), reverse=True)
+        self.assertEqual(seen, [str(item.id) for item in newestFirst])
+
+    def test_bookings_ordered_by_start(self):
+        body = self.client.get("/api/user/alice/bookings", {"ordering": "start", "limit": 3}).json()
+        self.assertEqual([item["id"] for item in body["data"]], [str(item.id) for item in self.bookingItems[:3]])
+
+    def test_unknown_user_is_not_found(self):
+        self.assertEqual(self.client.get("/api/user/nobody/bookings").status_code, 404)
+
+
+@override_settings(RESPONSE_CACHE=False)
+class RealtyQueryCountTests(TestCase):
+    """A realty page costs the same number of queries whatever its size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.userAccess = makeUser()
+        cls.addRealties(2)
+
+    @classmethod
+    def addRealties(cls, count: int):
+        for _ in range(count):
+            realty = makeRealty(f"villa-{uuid.uuid4().hex[:8]}")
+            ItemImage.objects.create(realty=realty, image_url=f"{realty.slug}.png", order=0)
+            Feedback.objects.create(realty=realty, user_access=cls.userAccess, text="Nice", rate=5)
+            LikedRealty.objects.create(realty=realty, user_access=cls.userAccess)
+
+    def assertQueriesStayFlat(self, request):
+        with CaptureQueriesContext(connection) as small:
+            response = request()
+        self.assertEqual(response.status_code, 200)
+        self.addRealties(3)
+        with self.assertNumQueries(len(small)):
+            response = request()
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list(self):
+        response = self.assertQueriesStayFlat(lambda: self.client.get("/api/realty/"))
+        self.assertEqual(len(response.json()["data"]), 5)
+
+    def test_liked_list(self):
+        response = self.assertQueriesStayFlat(lambda: self.client.get("/api/liked-realties/", {"login": "alice"}))
+        self.assertEqual(len(response.json()["data"]), 5)
+
+    def test_search_resolves_liked_flags_in_one_query(self):
+        unliked = makeRealty("unliked")
+        response = self.assertQueriesStayFlat(lambda: self.client.post("/api/realty/search", {"login": "alice"}, content_type="application/json"))
+        liked = {realty["id"]: realty["liked"] for realty in response.json()["data"]}
+        self.assertEqual(len(liked), 6)
+        self.assertIsNone(liked.pop(str(unliked.id)))
+        self.assertEqual(
+            {flag["id"] for flag in liked.values()},
+            {str(pk) for pk in LikedRealty.objects.values_list("id", flat=True)}
+        )
+
+    def test_expanded_feedbacks_are_prefetched(self):
+        response = self.assertQueriesStayFlat(lambda: self.client.get("/api/realty/", {"expand": "feedbacks"}))
+        feedbacks = [feedback for realty in response.json()["data"] for feedback in realty["feedbacks"]]
+        self.assertEqual(len(feedbacks), 5)
+        self.assertEqual(feedbacks[0]["user_data"]["first_name"], "Alice")
+
+    def test_selected_fields_trim_the_query(self):
+        with CaptureQueriesContext(connection) as full:
+            self.client.get("/api/realty/")
+        with CaptureQueriesContext(connection) as sparse:
+            response = self.client.get("/api/realty/", {"fields": "id,name"})
+        self.assertEqual({key for realty in response.json()["data"] for key in realty}, {"id", "name"})
+        # no images prefetch, and the page query reads only the selected columns
+        self.assertEqual(len(sparse), len(full) - 1)
+        pageQuery = next(query["sql"] for query in sparse.captured_queries if 'FROM "realties"' in query["sql"] and "LIMIT" in query["sql"])
+        self.assertNotIn('"description"', pageQuery)
+
+
+class BookingConflictTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.userAccess = makeUser()
+        self.realty = makeRealty()
+        self.start = timezone.now() + datetime.timedelta(days=2)
+
+    def book(self, startDays: int, endDays: int):
+        return self.client.post("/api/booking-item", {
+            "userAccessId": str(self.userAccess.id),
+            "realtyId": str(self.realty.id),
+            "startDate": (self.start + datetime.timedelta(days=startDays)).isoformat(),
+            "endDate": (self.start + datetime.timedelta(days=endDays)).isoformat(),
+        }, content_type="application/json")
+
+    def test_overlap_is_conflict(self):
+        self.assertEqual(self.book(0, 3).status_code, 201)
+        self.assertEqual(self.book(2, 5).status_code, 409)
+        self.assertEqual(self.book(-1, 1).status_code, 409)
+        self.assertEqual(self.book(3, 5).status_code, 201)
+
+    def test_cancelled_booking_frees_dates(self):
+        booking = self.book(0, 3).json()["data"]
+        self.assertEqual(self.client.delete(f"/api/booking-item/{booking['id']}").status_code, 200)
+        self.assertEqual(self.book(1, 2).status_code, 201)
+
+    def test_reschedule_onto_other_booking_is_conflict(self):
+        self.book(0, 3)
+        booking = self.book(5, 7).json()["data"]
+        response = self.client.patch(f"/api/booking-item/{booking['id']}", {
+            "realtyId": str(self.realty.id),
+            "startDate": (self.start + datetime.timedelta(days=2)).isoformat(),
+            "endDate": (self.start + datetime.timedelta(days=6)).isoformat(),
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Requests racing for the same dates from separate threads, through the
+    SQLite write queue and through the in-process lock it replaces.
+    """
+    def setUp(self):
+        cache.clear()
+        self.userAccess = makeUser()
+        self.realty = makeRealty()
+
+    def create(self, startDate, endDate):
+        try:
+            return BookingService().create(self.userAccess, self.realty.id, startDate, endDate)
+        except BookingConflictError as e:
+            return e
+        finally:
+            connection.close()
+
+    def race(self):
+        start = timezone.now() + datetime.timedelta(days=2)
+        end = start + datetime.timedelta(days=2)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: self.create(start, end), range(4)))
+        return [result for result in results if isinstance(result, BookingItem)]
+
+    def test_one_of_racing_bookings_wins(self):
+        for writeQueue in (True, False):
+            with self.subTest(writeQueue=writeQueue), override_settings(SQLITE_WRITE_QUEUE=writeQueue):
+                BookingItem.objects.all().delete()
+                self.assertEqual(len(self.race()), 1)
+                self.assertEqual(BookingItem.objects.filter(realty=self.realty).count(), 1)
+
+
+class KdfTests(TestCase):
+    def test_verify_each_stored_format(self):
+        scrypt = KdfService("scrypt", {"n": 16, "r": 8, "p": 1})
+        pbkdf2 = KdfService("pbkdf2-sha256", {"i": 1000})
+        for encoded in (scrypt.dk("pw", "salt"), pbkdf2.dk("pw", "salt"), PbKdfService().dk("pw", "salt")):
+            with self.subTest(encoded=encoded):
+                self.assertTrue(scrypt.verify("pw", "salt", encoded))
+                self.assertFalse(scrypt.verify("wrong", "salt", encoded))
+
+    def test_needs_rehash_when_behind_current_settings(self):
+        current = KdfService("scrypt", {"n": 32, "r": 8, "p": 1})
+        self.assertFalse(current.needsRehash(current.dk("pw", "salt")))
+        self.assertTrue(current.needsRehash(KdfService("scrypt", {"n": 16, "r": 8, "p": 1}).dk("pw", "salt")))
+        self.assertTrue(current.needsRehash(KdfService("pbkdf2-sha256", {"i": 1000}).dk("pw", "salt")))
+        self.assertTrue(current.needsRehash(PbKdfService().dk("pw", "salt")))
+
+    def test_login_upgrades_legacy_hash(self):
+        userAccess = makeUser()
+        self.assertEqual(APIClient().post("/api/auth/", HTTP_AUTHORIZATION=basicAuth("alice", "pw")).status_code, 200)
+        userAccess.refresh_from_db()
+        self.assertTrue(userAccess.dk.startswith(f"${settings.KDF_ALGORITHM}$"))
+        self.assertNotEqual(userAccess.salt, "salt")
+        self.assertEqual(APIClient().post("/api/auth/", HTTP_AUTHORIZATION=basicAuth("alice", "pw")).status_code, 200)
+
+    @contextmanager
+    def busyPool(self):
+        _, slots = PasswordVerifier._getPool()
+        held = 0
+        while slots.acquire(blocking=False):
+            held += 1
+        try:
+            with override_settings(KDF_QUEUE_TIMEOUT=0):
+                yield
+        finally:
+            for _ in range(held):
+                slots.release()
+
+    def test_hashing_waits_for_a_pool_slot(self):
+        with self.busyPool(), self.assertRaises(KdfBusyError):
+            PasswordVerifier().dk("pw", "salt")
+
+    def test_new_passwords_answer_busy_when_pool_is_full(self):
+        UserRole.objects.create(id="SelfRegistered", description="Self registered")
+        signUp = {
+            "userFirstName": "Bob", "userLastName": "Smith", "userEmail": "bob@example.com", "userLogin": "bob",
+            "userPassword": "Str0ng!Passw0rd", "userRepeat": "Str0ng!Passw0rd", "agree": True, "birthdate": None,
+        }
+        create = {
+            "user-login": "carol", "user-password": "pw", "user-role": "SelfRegistered",
+            "user-first-name": "Carol", "user-last-name": "Smith", "user-email": "carol@example.com",
+        }
+        userAccess = makeUser()
+        with self.busyPool():
+            responses = [
+                self.client.post("/api/auth/register", signUp, content_type="application/json"),
+                self.client.post("/api/user/", create, content_type="application/json"),
+                self.client.patch("/api/user/", {"user-former-login": "alice", "user-password": "new"}, content_type="application/json"),
+            ]
+        for response in responses:
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "1")
+        self.assertFalse(UserAccess.objects.filter(login__in=["bob", "carol"]).exists())
+        self.assertFalse(UserData.objects.filter(email__in=["bob@example.com", "carol@example.com"]).exists())
+        self.assertEqual(UserAccess.objects.get(id=userAccess.id).dk, userAccess.dk)
+
+        self.assertEqual(self.client.post("/api/auth/register", signUp, content_type="application/json").status_code, 201)
+        self.assertTrue(UserAccess.objects.get(login="bob").dk.startswith(f"${settings.KDF_ALGORITHM}$"))
+
+
+class DatabaseMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_is_unauthorized(self):
+        self.assertEqual(self.client.get("/api/metrics/db").status_code, 401)
+
+    def test_only_admins_read_metrics(self):
+        userAccess = makeUser()
+        self.assertEqual(bearerClient(userAccess).get("/api/metrics/db").status_code, 403)
+
+        userAccess.user_role, _ = UserRole.objects.get_or_create(id="admin", defaults={"description": "Administrator"})
+        userAccess.save(update_fields=["user_role"])
+        response = bearerClient(userAccess).get("/api/metrics/db")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("default", response.json()["data"])
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_public_setting_opens_metrics(self):
+        self.assertEqual(self.client.get("/api/metrics/db").status_code, 200)
+
+
+class AdminTableTests(TestCase):
+    url = "/Administrator/GetRealtiesTable"
+
+    @classmethod
+    def setUpTestData(cls):
+        for name, price in [("Alpha", 300), ("Bravo", 100), ("Charlie", 500), ("Delta", 200), ("Echo", 400)]:
+            realty = makeRealty(name)
+            realty.price = price
+            realty.save(update_fields=["price"])
+
+    def names(self, response) -> list:
+        return re.findall(r"<tr><td>(\w+)</td>", response.json()["data"])
+
+    def test_sort_and_page(self):
+        response = self.client.get(self.url, {"sort": "-price", "page": 2, "pageSize": 2})
+        self.assertEqual(self.names(response), ["Alpha", "Delta"])
+        meta = response.json()["meta"]
+        self.assertEqual((meta["total"], meta["pages"]), (5, 3))
+
+    def test_search(self):
+        self.assertEqual(self.names(self.client.get(self.url, {"search": "ha"})), ["Alpha", "Charlie"])
+
+    def test_unknown_sort_is_bad_request(self):
+        self.assertEqual(self.client.get(self.url, {"sort": "description"}).status_code, 400)
+
+    def test_table_needs_a_queryset(self):
+        with self.assertRaises(TypeError):
+            AdminTable()
+
+    def exportedNames(self, content: str) -> list:
+        return [row[0] for row in csv.reader(io.StringIO(content))]
+
+    def test_csv_export_streams_sorted_rows(self):
+        response = self.client.get(self.url, {"format": "csv", "sort": "price"})
+        self.assertFalse(response.is_async)
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(self.exportedNames(content), ["Name", "Bravo", "Delta", "Alpha", "Echo", "Charlie"])
+
+    async def test_csv_export_is_async_under_asgi(self):
+        realtyAdminTable.export_chunk_size = 2
+        self.addCleanup(delattr, realtyAdminTable, "export_chunk_size")
+        response = await AsyncClient().get(self.url, {"format": "csv", "sort": "price"})
+        self.assertTrue(response.is_async)
+        chunks = [chunk.decode() async for chunk in response.streaming_content]
+        self.assertEqual(self.exportedNames("".join(chunks)), ["Name", "Bravo", "Delta", "Alpha", "Echo", "Charlie"])
+        # header, then rows two at a time
+        self.assertEqual(len(chunks), 4)
+
+
+class OccupancyBitmapTests(SimpleTestCase):
+    def test_mark_and_query_nights(self):
+        day = datetime.date(2026, 5, 10)
+        bitmap = OccupancyBitmap()
+        bitmap.mark(day, day + datetime.timedelta(days=3))
+        # an earlier stay moves the origin back
+        bitmap.mark(day - datetime.timedelta(days=5), day - datetime.timedelta(days=4))
+        self.assertEqual((bitmap.firstDay, bitmap.lastDay), (day - datetime.timedelta(days=5), day + datetime.timedelta(days=2)))
+
+        self.assertFalse(bitmap.isFree(day + datetime.timedelta(days=2), day + datetime.timedelta(days=4)))
+        self.assertTrue(bitmap.isFree(day + datetime.timedelta(days=3), day + datetime.timedelta(days=9)))
+        self.assertTrue(bitmap.isFree(day - datetime.timedelta(days=4), day))
+        self.assertFalse(bitmap.isFree(day - datetime.timedelta(days=30), day + datetime.timedelta(days=30)))
+
+        restored = OccupancyBitmap.fromBytes(bitmap.firstDay, bitmap.toBytes())
+        self.assertEqual(restored.bits, bitmap.bits)
+
+
+class AvailabilitySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.userAccess = makeUser()
+        cls.free, cls.booked, cls.later = makeRealty("Free"), makeRealty("Booked"), makeRealty("Later")
+        cls.day = timezone.localdate() + datetime.timedelta(days=10)
+        cls.stay(cls.booked, 0, 3)
+        cls.stay(cls.later, 5, 7)
+        OccupancyService().rebuildRealty(cls.booked.id)
+        OccupancyService().rebuildRealty(cls.later.id)
+
+    @classmethod
+    def stay(cls, realty, startDays: int, endDays: int):
+        at = lambda days: timezone.make_aware(datetime.datetime.combine(cls.day + datetime.timedelta(days=days), datetime.time(14)))
+        BookingItem.objects.create(realty=realty, user_access=cls.userAccess, start_date=at(startDays), end_date=at(endDays))
+
+    def search(self, startDays: int, endDays: int) -> set:
+        cache.clear()
+        response = self.client.post("/api/realty/search", {
+            "StartDate": (self.day + datetime.timedelta(days=startDays)).isoformat(),
+            "EndDate": (self.day + datetime.timedelta(days=endDays)).isoformat(),
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return {item["name"] for item in response.json()["data"]}
+
+    def test_busy_realties_are_left_out(self):
+        self.assertEqual(self.search(1, 2), {"Free", "Later"})
+        self.assertEqual(self.search(3, 5), {"Free", "Booked", "Later"})
+        self.assertEqual(self.search(2, 6), {"Free"})
+
+    def test_migration_backfill_matches_service(self):
+        expected = {row.realty_id: (row.first_day, row.last_day, bytes(row.bitmap)) for row in RealtyOccupancy.objects.all()}
+        RealtyOccupancy.objects.all().delete()
+        import_module("main.migrations.0005_realty_occupancy").backfill_occupancy(apps, None)
+        actual = {row.realty_id: (row.first_day, row.last_day, bytes(row.bitmap)) for row in RealtyOccupancy.objects.all()}
+        self.assertEqual(actual, expected)
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"pixels" * 10
+
+
+class StorageUploadTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(STORAGE_PATH=directory.name))
+        self.storage = DiskStorageService()
+
+    def files(self) -> list:
+        return sorted(str(path.relative_to(self.storage.basePath)) for path in self.storage.basePath.rglob("*") if path.is_file())
+
+    @override_settings(STORAGE_LAYOUT="content")
+    def test_identical_uploads_share_one_sharded_blob(self):
+        first = self.storage._storeUpload(SimpleUploadedFile("a.PNG", PNG))
+        second = self.storage._storeUpload(SimpleUploadedFile("b.png", PNG))
+        digest = hashlib.sha256(PNG).hexdigest()
+        self.assertEqual(first, (f"{digest}.png", True))
+        self.assertEqual(second, (f"{digest}.png", False))
+        self.assertEqual(self.files(), [f"{digest[:2]}/{digest[2:4]}/{digest}.png"])
+        self.assertEqual(self.storage.getItemBytes(first.name), PNG)
+
+    def test_content_must_match_extension(self):
+        for name, content in (("fake.png", b"\xff\xd8\xff" + b"jpeg"), ("empty.png", b""), ("page.svg", b"<html></html>")):
+            with self.subTest(name=name), self.assertRaises(InvalidItemError):
+                self.storage._storeUpload(SimpleUploadedFile(name, content))
+        # nothing is left behind, not even the temporary file
+        self.assertEqual(self.files(), [])
+
+    @override_settings(STORAGE_LAYOUT="flat")
+    def test_failed_batch_removes_its_files(self):
+        uploads = [SimpleUploadedFile("a.png", PNG), SimpleUploadedFile("b.png", b"not a png"), SimpleUploadedFile("c.png", PNG)]
+        with self.assertRaises(InvalidItemError):
+            self.storage.saveItems(uploads)
+        self.assertEqual(self.files(), [])
+
+    @override_settings(STORAGE_LAYOUT="content")
+    def test_failed_batch_keeps_content_addressed_blobs(self):
+        uploads = [SimpleUploadedFile("a.png", PNG), SimpleUploadedFile("b.png", b"not a png")]
+        with self.assertRaises(InvalidItemError):
+            self.storage.saveItems(uploads)
+        # another upload may already reference the blob; purge_storage collects it
+        digest = hashlib.sha256(PNG).hexdigest()
+        self.assertEqual(self.files(), [f"{digest[:2]}/{digest[2:4]}/{digest}.png"])
+
+    @override_settings(STORAGE_LAYOUT="flat")
+    def test_discard_leaves_files_it_did_not_create(self):
+        kept = self.storage.saveItems([SimpleUploadedFile("a.png", PNG)])[0]
+        created = self.storage.saveItems([SimpleUploadedFile("b.png", PNG)])[0]
+        self.storage.discardItems([kept._replace(created=False), created])
+        self.assertEqual(self.files(), [kept.name])
+
+
+class ByteLruCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used_past_byte_bound(self):
+        itemCache = ByteLruCache(maxBytes=10, maxItemBytes=6)
+        itemCache.put("a", b"aaaa")
+        itemCache.put("b", b"bbbb")
+        self.assertEqual(itemCache.get("a"), b"aaaa")
+        itemCache.put("c", b"cccc")
+        self.assertIsNone(itemCache.get("b"))
+        self.assertEqual(itemCache.get("c"), b"cccc")
+        itemCache.put("big", b"x" * 7)
+        self.assertIsNone(itemCache.get("big"))
+        self.assertEqual(
+            itemCache.stats(),
+            {"hits": 2, "misses": 2, "evictions": 1, "entries": 2, "bytes": 8, "maxBytes": 10}
+        )
+
+    def test_other_version_is_a_miss(self):
+        itemCache = ByteLruCache(maxBytes=10, maxItemBytes=10)
+        itemCache.put("a", b"old", version=1)
+        self.assertIsNone(itemCache.get("a", version=2))
+        itemCache.put("a", b"new", version=2)
+        self.assertEqual((itemCache.get("a", version=2), itemCache.stats()["bytes"]), (b"new", 3))
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_counters_are_exposed(self):
+        DiskStorageService.itemCache.get(f"missing-{uuid.uuid4()}")
+        response = self.client.get("/api/metrics/storage")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(response.json()["data"]["itemCache"]["misses"], 1)
+
+    def test_counters_need_admin(self):
+        self.assertEqual(self.client.get("/api/metrics/storage").status_code, 401)
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite profile")
+class SqliteProfileTests(SimpleTestCase):
+    SYNCHRONOUS = {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3}
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "profile.sqlite3")
+
+    def openDatabase(self, alias: str):
+        settingsDict = {**connections.settings["default"], "NAME": self.path}
+        settingsDict["OPTIONS"] = {**settingsDict["OPTIONS"], "timeout": 0.1}
+        connections[alias] = type(connections["default"])(settingsDict, alias)
+        self.addCleanup(connections.__delitem__, alias)
+        self.addCleanup(connections[alias].close)
+        return connections[alias]
+
+    def test_connections_apply_the_pragmas(self):
+        with self.openDatabase("profile").cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("journal_mode", "synchronous", "cache_size", "busy_timeout")
+            }
+        self.assertEqual(pragmas, {
+            "journal_mode": settings.SQLITE_JOURNAL_MODE.lower(),
+            "synchronous": self.SYNCHRONOUS[settings.SQLITE_SYNCHRONOUS.upper()],
+            "cache_size": settings.SQLITE_CACHE_SIZE,
+            "busy_timeout": 100,
+        })
+
+    @skipUnless(settings.SQLITE_TRANSACTION_MODE.upper() == "IMMEDIATE", "IMMEDIATE transactions")
+    def test_transactions_take_the_write_lock_at_begin(self):
+        first, second = self.openDatabase("first"), self.openDatabase("second")
+        with transaction.atomic(using=first.alias):
+            first.cursor().execute("SELECT 1")
+            with self.assertRaisesMessage(OperationalError, "locked"), transaction.atomic(using=second.alias):
+                pass
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite write queue")
+@override_settings(SQLITE_WRITE_QUEUE=True)
+class WriteQueueTests(TestCase):
+    def test_writes_run_one_at_a_time_on_the_writer_thread(self):
+        lock = threading.Lock()
+        running, concurrency, threads = set(), [], set()
+
+        def write(index):
+            with lock:
+                running.add(index)
+                concurrency.append(len(running))
+            threads.add(threading.current_thread().name)
+            time.sleep(0.005)
+            with lock:
+                running.discard(index)
+            return index
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda index: writeQueue.run(write, index), range(16)))
+        self.assertEqual(results, list(range(16)))
+        self.assertEqual(max(concurrency), 1)
+        self.assertEqual(threads, {"sqlite-writer"})
+
+    def test_errors_reach_the_caller(self):
+        def fail():
+            raise BookingConflictError("taken")
+
+        with ThreadPoolExecutor(max_workers=1) as pool, self.assertRaisesMessage(BookingConflictError, "taken"):
+            pool.submit(writeQueue.run, fail).result()
+
+    def test_write_inside_a_transaction_runs_inline(self):
+        # the test case holds a transaction open, so queueing would deadlock
+        self.assertIs(writeQueue.run(threading.current_thread), threading.current_thread())
@@ -1,8 +1,13 @@
-from django.urls import path, include
-from main.views.user import UserViewSet, userDetail, login, register, getUsersTable
-from main.views.realty import RealtyViewSet, item, cities, RealtySearchViewSet, getRealtiesTable, LikedRealtyViewSet
-from main.views.feedback import FeedbackView
-from main.views.booking import BookingView, BookingDetailView
+from django.conf import settings
+from django.urls import path, re_path, include
+from main.views.user import UserViewSet, userDetail, userBookings, login, logout, register, getUsersTable
+from main.views.realty import RealtyViewSet, cities, RealtySearchViewSet, realtyCalendar, getRealtiesTable, LikedRealtyViewSet
+from main.views.realty import cities_async, realty_list_async, realty_detail_async
+from main.views.feedback import FeedbackView, feedback_list_async
+from main.views.booking import BookingView, BookingDetailView, booking_list_async
+from main.views.storage import item, item_async
+from main.views.metrics import databaseMetrics, storageMetrics
+from main.asyncviews import read_or_write
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
@@ -13,9 +18,12 @@ router.register(r'api/liked-realties', LikedRealtyViewSet, basename='liked-realt
 
 urlpatterns = [
     path('api/user/<str:login>', userDetail, name='userDetail'),
+    path('api/user/<str:login>/bookings', userBookings, name='userBookings'),
     path('api/auth/', login, name='login'), 
     path('api/auth/register', register, name='auth_register'), #POST
+    path('api/auth/logout', logout, name='auth_logout'), #POST
     path('api/realty/search', RealtySearchViewSet, name='realty_search'),
+    path('api/realty/<uuid:id>/calendar', realtyCalendar, name='realty_calendar'),
 
     path('', include(router.urls)),
     path("Storage/Item/<str:itemId>", item, name="storageItem"),
@@ -28,6 +36,27 @@ urlpatterns = [
     path("Administrator/GetUsersTable", getUsersTable, name='getUsersTable'),
 
     path("api/cities/", cities, name="cities"),
+    path("api/metrics/db", databaseMetrics, name="databaseMetrics"),
+    path("api/metrics/storage", storageMetrics, name="storageMetrics"),
     
 
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # same URLs, reads served by the async views; listed first so they win
+    # over the router and sync routes above
+    realtyList = RealtyViewSet.as_view({'get': 'list', 'post': 'create'})
+    realtyDetail = RealtyViewSet.as_view({
+        'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
+        'delete': 'destroy'
+    })
+    urlpatterns = [
+        path('api/realty/', read_or_write(realty_list_async, realtyList), name='realty-list'),
+        re_path(r'^api/realty/(?P<pk>[^/.]+)/$', read_or_write(realty_detail_async, realtyDetail), name='realty-detail'),
+        path("Storage/Item/<str:itemId>", item_async, name="storageItem"),
+        path("api/feedback", read_or_write(feedback_list_async, FeedbackView.as_view()), name="feedback"),
+        path('api/booking-item', read_or_write(booking_list_async, BookingView.as_view()), name='booking_item'),
+        path("api/cities/", cities_async, name="cities"),
+    ] + urlpatterns
@@ -9,32 +9,69 @@ from main.rest import RestResponse, RestStatus
 import datetime
 from django.utils import timezone
 from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from backend.services import BookingService, BookingConflictError, ResponseCacheService
+from main.asyncviews import json_response, not_modified, ok_data
 
-class BookingView(APIView):
-    filter_backends = [DjangoFilterBackend]
-    filterset_class = BookingItemFilter
 
-    @staticmethod
-    def has_overlap(realty_id, start_date, end_date, exclude_id=None):
-        qs = BookingItem.objects.filter(
-            realty_id=realty_id,
-            deleted_at__isnull=True,
-            start_date__lt=end_date,
-            end_date__gt=start_date
-        )
+responseCache = ResponseCacheService()
+bookingService = BookingService(responseCache=responseCache)
 
-        if exclude_id:
-            qs = qs.exclude(id=exclude_id)
 
-        return qs.exists()
+def parse_and_make_aware(date_string):
+    if not date_string:
+        return None
 
-    def get(self, request):
-        queryset = BookingItem.objects.all()
+    dt = parse_datetime(date_string)
+
+    if dt is None:
+        parsed_date = parse_date(date_string)
+        if parsed_date:
+            dt = datetime.datetime.combine(parsed_date, datetime.time.min)
+
+    if dt:
+        return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+
+    return None
+
+
+def booking_list_etag(request, *args, **kwargs):
+    # the list is built from booking rows only, which the "occupancy" fingerprint covers
+    return responseCache.etag("booking-list", request.GET, ["occupancy"])
+
+
+def conflict_response(error):
+    return Response(
+        RestResponse(
+            RestStatus(False, 409, "Conflict"),
+            str(error)
+        ).to_dict(),
+        status=status.HTTP_409_CONFLICT
+    )
 
-        booking_filter = BookingItemFilter(request.GET, queryset=queryset)
-        queryset = booking_filter.qs
 
-        serializer = BookingItemSerializer(queryset, many=True)
+def booking_queryset(params):
+    return BookingItemFilter(params, queryset=BookingItem.objects.all()).qs
+
+
+async def booking_list_async(request):
+    etag = await responseCache.aetag("booking-list", request.GET, ["occupancy"])
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    bookings = [booking async for booking in booking_queryset(request.GET)]
+    return json_response(ok_data(BookingItemSerializer(bookings, many=True).data), etag)
+
+
+class BookingView(APIView):
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = BookingItemFilter
+
+    @method_decorator(condition(etag_func=booking_list_etag))
+    def get(self, request):
+        serializer = BookingItemSerializer(booking_queryset(request.GET), many=True)
 
         return Response(
             RestResponse(
@@ -50,9 +87,8 @@ class BookingView(APIView):
         try:
             user_access = UserAccess.objects.get(id=data.get("userAccessId"))
             realty_id = data.get("realtyId")
-            start_date = data.get("startDate")
-            end_date = data.get("endDate")
-            booking_id = data.get("id")
+            start_date = parse_and_make_aware(data.get("startDate"))
+            end_date = parse_and_make_aware(data.get("endDate"))
 
             if not realty_id or not start_date or not end_date:
                 return Response(
@@ -72,25 +108,11 @@ class BookingView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            if self.has_overlap(
-                realty_id=realty_id,
-                start_date=start_date,
-                end_date=end_date,
-                exclude_id=booking_id
-            ):
-                return Response(
-                    RestResponse(
-                        RestStatus(False, 409, "Conflict"),
-                        "Realty already booked for selected dates"
-                    ).to_dict(),
-                    status=status.HTTP_409_CONFLICT
-                )
-
-            booking_item = BookingItem.objects.create(
-                realty_id=realty_id,
-                start_date=start_date,
-                end_date=end_date,
-                user_access=user_access
+            booking_item = bookingService.create(
+                userAccess=user_access,
+                realtyId=realty_id,
+                startDate=start_date,
+                endDate=end_date
             )
 
             serializer = BookingItemSerializer(booking_item)
@@ -103,6 +125,18 @@ class BookingView(APIView):
                 status=status.HTTP_201_CREATED
             )
 
+        except BookingConflictError as e:
+            return conflict_response(e)
+
+        except Realty.DoesNotExist:
+            return Response(
+                RestResponse(
+                    RestStatus(False, 404, "Realty not found"),
+                    None
+                ).to_dict(),
+                status=status.HTTP_404_NOT_FOUND
+            )
+
         except UserAccess.DoesNotExist:
             return Response(
                 RestResponse(
@@ -116,37 +150,6 @@ class BookingView(APIView):
 #----------------------------------------------------------------------------------------------
 
 class BookingDetailView(APIView):
-    @staticmethod
-    def has_overlap(realty_id, start_date, end_date, exclude_id=None):
-        qs = BookingItem.objects.filter(
-            realty_id=realty_id,
-            deleted_at__isnull=True,
-            start_date__lt=end_date,
-            end_date__gt=start_date
-        )
-
-        if exclude_id:
-            qs = qs.exclude(id=exclude_id)
-
-        return qs.exists()
-    
-    @staticmethod
-    def parse_and_make_aware(date_string):
-        if not date_string:
-            return None
-            
-        dt = parse_datetime(date_string)
-        
-        if dt is None:
-            parsed_date = parse_date(date_string)
-            if parsed_date:
-                dt = datetime.datetime.combine(parsed_date, datetime.time.min)
-                
-        if dt:
-            return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
-            
-        return None
-    
     def get_object(self, id):
         try:
             return BookingItem.objects.get(id=id)
@@ -182,8 +185,8 @@ class BookingDetailView(APIView):
             start_date_str = data.get("startDate")
             end_date_str = data.get("endDate")
 
-            start_date = self.parse_and_make_aware(start_date_str)
-            end_date = self.parse_and_make_aware(end_date_str)
+            start_date = parse_and_make_aware(start_date_str)
+            end_date = parse_and_make_aware(end_date_str)
 
             booking = self.get_object(id)
 
@@ -205,24 +208,11 @@ class BookingDetailView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            if self.has_overlap(
-                realty_id=realty_id,
-                start_date=start_date,
-                end_date=end_date,
-                exclude_id=id
-            ):
-                return Response(
-                    RestResponse(
-                        RestStatus(False, 409, "Conflict"),
-                        "Realty already booked for selected dates"
-                    ).to_dict(),
-                    status=status.HTTP_409_CONFLICT
-                )
-
-            booking.start_date = start_date
-            booking.end_date = end_date
-
-            booking.save()
+            booking = bookingService.reschedule(
+                bookingId=booking.id,
+                startDate=start_date,
+                endDate=end_date
+            )
 
             serializer = BookingItemShortSerializer(booking)
 
@@ -234,6 +224,9 @@ class BookingDetailView(APIView):
                 status=status.HTTP_200_OK
             )
 
+        except BookingConflictError as e:
+            return conflict_response(e)
+
         except UserAccess.DoesNotExist:
             return Response(
                 RestResponse(
@@ -255,8 +248,7 @@ class BookingDetailView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        booking_item.deleted_at = timezone.now()
-        booking_item.save()
+        bookingService.cancel(booking_item.id)
 
         return Response(
             RestResponse(
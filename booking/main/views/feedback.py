@@ -6,6 +6,24 @@ from main.models import *
 from main.serializers.feeedback import FeedbackSerializer
 from main.filters import FeedbackFilter
 from main.rest import RestResponse, RestStatus
+from backend.services import FeedbackAccessor
+from django.core.exceptions import ValidationError
+from main.asyncviews import json_response, ok_data
+from main.authentication import TokenPrincipal
+
+
+feedbackAccessor = FeedbackAccessor()
+
+
+def feedback_queryset(params):
+    queryset = FeedbackSerializer.setup_eager_loading(Feedback.objects.filter(deleted_at__isnull=True))
+    return FeedbackFilter(params, queryset=queryset).qs
+
+
+async def feedback_list_async(request):
+    feedbacks = [feedback async for feedback in feedback_queryset(request.GET)]
+    # everything the serializer reads is loaded, rendering makes no queries
+    return json_response(ok_data(FeedbackSerializer(feedbacks, many=True).data))
 
 
 class FeedbackView(APIView):
@@ -13,13 +31,7 @@ class FeedbackView(APIView):
     filterset_class = FeedbackFilter
 
     def get(self, request):
-        queryset = Feedback.objects.filter(deleted_at__isnull=True)
-
-
-        feedback_filter = FeedbackFilter(request.GET, queryset=queryset)
-        queryset = feedback_filter.qs
-
-        serializer = FeedbackSerializer(queryset, many=True)
+        serializer = FeedbackSerializer(feedback_queryset(request.GET), many=True)
 
         return Response(
             RestResponse(
@@ -32,15 +44,43 @@ class FeedbackView(APIView):
     def post(self, request):
         data = request.data
 
+        try:
+            rate = data.get("rate")
+            if rate is not None:
+                rate = int(rate)
+                if not 1 <= rate <= 5:
+                    raise ValueError
+        except (TypeError, ValueError):
+            return Response(
+                RestResponse(
+                    RestStatus(False, 400, "Bad Request"),
+                    "Rate must be an integer from 1 to 5"
+                ).to_dict(),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        feedback_id = data.get("id")
+        if feedback_id:
+            return self.change(request, feedback_id, data, rate)
+
+        if rate is None:
+            return Response(
+                RestResponse(
+                    RestStatus(False, 400, "Bad Request"),
+                    "Missing required fields"
+                ).to_dict(),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
             realty = Realty.objects.get(id=data.get("realtyId"))
             user_access = UserAccess.objects.get(id=data.get("userAccessId"))
 
-            feedback = Feedback.objects.create(
-                text=data.get("text"),
-                rate=data.get("rate"),
+            feedback = feedbackAccessor.create(
                 realty=realty,
-                user_access=user_access
+                userAccess=user_access,
+                text=data.get("text"),
+                rate=rate
             )
 
             serializer = FeedbackSerializer(feedback)
@@ -70,3 +110,51 @@ class FeedbackView(APIView):
                 ).to_dict(),
                 status=status.HTTP_404_NOT_FOUND
             )
+
+    # POST with an "id" edits an existing feedback, "deleted": true soft-deletes it;
+    # only the author may do either
+    def change(self, request, feedback_id, data, rate):
+        if not isinstance(request.user, TokenPrincipal):
+            return Response(
+                RestResponse(
+                    RestStatus(False, 401, "Unauthorized"),
+                    "Bearer token required"
+                ).to_dict(),
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        try:
+            if data.get("deleted") in (True, "true", "True", "1"):
+                feedbackAccessor.softDelete(feedback_id, userAccessId=request.user.id)
+                return Response(
+                    RestResponse(
+                        RestStatus(True, 200, "Deleted successfully"),
+                        None
+                    ).to_dict(),
+                    status=status.HTTP_200_OK
+                )
+
+            feedback = feedbackAccessor.update(
+                feedback_id,
+                text=data.get("text"),
+                rate=rate,
+                userAccessId=request.user.id
+            )
+            serializer = FeedbackSerializer(feedback)
+
+            return Response(
+                RestResponse(
+                    RestStatus(True, 200, "Ok"),
+                    serializer.data
+                ).to_dict(),
+                status=status.HTTP_200_OK
+            )
+
+        except (Feedback.DoesNotExist, ValidationError):
+            return Response(
+                RestResponse(
+                    RestStatus(False, 404, "Feedback not found"),
+                    None
+                ).to_dict(),
+                status=status.HTTP_404_NOT_FOUND
+            )
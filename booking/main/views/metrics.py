@@ -0,0 +1,59 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from main.authentication import TokenPrincipal
+from main.rest import *
+from backend.db import ConnectionStats
+from backend.services import DiskStorageService
+
+
+def metrics_denied(request):
+    """The 401/403 response for a caller that may not read metrics, else None."""
+    if settings.METRICS_PUBLIC:
+        return None
+    if not isinstance(request.user, TokenPrincipal):
+        return Response(
+            RestResponse(
+                RestStatus(False, 401, "Unauthorized"),
+                "Bearer token required"
+            ).to_dict(),
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    if request.user.role_id not in settings.METRICS_ROLES:
+        return Response(
+            RestResponse(
+                RestStatus(False, 403, "Forbidden"),
+                None
+            ).to_dict(),
+            status=status.HTTP_403_FORBIDDEN
+        )
+    return None
+
+
+def metrics_response(data):
+    # counters of the worker process that serves the request, every worker
+    # keeps its own connections, pool and item cache
+    return Response(
+        RestResponse(
+            RestStatus(True, 200, "Ok"),
+            data
+        ).to_dict(),
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['GET'])
+def databaseMetrics(request):
+    denied = metrics_denied(request)
+    if denied is not None:
+        return denied
+    return metrics_response(ConnectionStats.snapshot())
+
+
+@api_view(['GET'])
+def storageMetrics(request):
+    denied = metrics_denied(request)
+    if denied is not None:
+        return denied
+    return metrics_response({"itemCache": DiskStorageService.itemCache.stats()})
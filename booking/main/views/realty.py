@@ -7,79 +7,136 @@ from main.serializers.realty import *
 from main.serializers.feeedback import *
 from main.serializers.location import *
 from main.filters import *
+from main.pagination import RealtyKeysetPagination
+from main.tables import AdminTable
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.viewsets import ModelViewSet
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Avg, Count
-from django.db.models.functions import Coalesce
 from django.core.serializers import serialize
 from backend.services import *
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.db.models.functions import Substr
+from asgiref.sync import sync_to_async
+from main.asyncviews import API_ERRORS, api_error, json_response, not_modified, viewset_for
+import datetime, uuid
 
 
 storageService = DiskStorageService()
+likedRealtyAccessor = LikedRealtyAccessor()
+occupancyService = OccupancyService()
+calendarService = AvailabilityCalendarService()
+responseCache = ResponseCacheService()
 
 
-def item(request, itemId):
-    try:
-        content = storageService.getItemBytes(itemId)
-        mime_type = storageService.tryGetMimeType(itemId)
-        return HttpResponse(content, content_type=mime_type)
-    except (FileNotFoundError, ValueError):
-        raise Http404("Item not found")
-    
 def cities(request):
-    cities = City.objects.values_list('name', flat=True)
+    def build():
+        cities = City.objects.values_list('name', flat=True)
 
-    response = RestResponse(
-            status=RestStatus(True, 200, "Ok"),
-            data = list(cities)
-        )
-    return JsonResponse(response.to_dict(), status=200)
+        response = RestResponse(
+                status=RestStatus(True, 200, "Ok"),
+                data = list(cities)
+            )
+        return response.to_dict()
+
+    data = responseCache.getOrSet("cities", {}, ["cities"], build)
+    return JsonResponse(data, status=200)
+
+
+async def cities_async(request):
+    async def build():
+        names = [name async for name in City.objects.values_list('name', flat=True)]
+        return RestResponse(status=RestStatus(True, 200, "Ok"), data=names).to_dict()
+
+    data = await responseCache.agetOrSet("cities", {}, ["cities"], build)
+    return JsonResponse(data, status=200)
     
 # -----------------------------------------------------------------------------------------------
 
+def realty_list_etag(request, *args, **kwargs):
+    return responseCache.etag("realty-list", request.GET, ["realty"])
+
+def realty_detail_etag(request, *args, **kwargs):
+    try:
+        realty_id = uuid.UUID(kwargs["pk"])
+    except ValueError:
+        return None
+    return responseCache.etag(f"realty:{realty_id}", request.GET, [f"realty:{realty_id}"])
+
+
 class RealtyViewSet(ModelViewSet):
     queryset = Realty.objects.filter(deleted_at__isnull=True)
     filter_backends = [DjangoFilterBackend]
     filterset_class = RealtyFilter
-
-    queryset = queryset.annotate(
-        avg_rating=Avg("feedbacks__rate"),
-        rates_count=Count("feedbacks")
-    )
+    pagination_class = RealtyKeysetPagination
     
     def get_serializer_class(self):
         if self.action == 'create':
             return RealtyCreateSerializer
         return RealtySerializer
 
-    #GET /realty/
-    def list(self, request, *args, **kwargs):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, EagerLoadingMixin):
+            queryset = serializer_class.setup_eager_loading(queryset, self.get_serializer_context())
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        params = self.request.query_params
+        # listings are sparse by default, a single realty keeps the full document
+        if self.action == 'list' or 'fields' in params or 'expand' in params:
+            context.update(RealtySerializer.parse_field_params(params))
+        return context
+
+    def build_list(self) -> dict:
         queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data).data
+
+    def build_detail(self) -> dict:
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
 
         response = RestResponse(
             status=RestStatus(True, 200, "OK"),
             data=serializer.data
         )
+        return response.to_dict()
 
-        return Response(response.to_dict(), status=status.HTTP_200_OK)
+    #GET /realty/
+    @method_decorator(condition(etag_func=realty_list_etag))
+    def list(self, request, *args, **kwargs):
+        data = responseCache.getOrSet("realty-list", request.query_params, ["realty"], self.build_list)
+        return Response(data, status=status.HTTP_200_OK)
 
     #GET /realty/{id}/
+    @method_decorator(condition(etag_func=realty_detail_etag))
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-
-        response = RestResponse(
-            status=RestStatus(True, 200, "OK"),
-            data=serializer.data
+        try:
+            realty_id = uuid.UUID(kwargs[self.lookup_field])
+        except ValueError:
+            raise Http404("Realty not found")
+
+        data = responseCache.getOrSet(
+            f"realty:{realty_id}",
+            request.query_params,
+            [f"realty:{realty_id}"],
+            self.build_detail
         )
+        return Response(data, status=status.HTTP_200_OK)
 
-        return Response(response.to_dict(), status=status.HTTP_200_OK)
+    def invalidate(self, instance):
+        responseCache.bump("realty", f"realty:{instance.id}", "cities")
 
     #POST /realty/
     def create(self, request, *args, **kwargs):
@@ -101,7 +158,10 @@ class RealtyViewSet(ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        saved_name = storageService.saveItem(image_file)
+        try:
+            saved_name = storageService.saveItem(image_file)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         itemImage = ItemImage(
             image_url=saved_name,
@@ -109,6 +169,7 @@ class RealtyViewSet(ModelViewSet):
             realty=instance
         )
         itemImage.save()
+        self.invalidate(instance)
 
         response = RestResponse(
             status=RestStatus(True, 201, "Created"),
@@ -161,26 +222,27 @@ class RealtyViewSet(ModelViewSet):
                 city = new_city
             instance.city = city
 
-        instance.save()
+        uploads = [(request.FILES[key], 0) for key in ('realty-main-image',) if key in request.FILES]
+        uploads += [(image_file, 1) for image_file in request.FILES.getlist('realty-secondary-images')]
 
-        if 'realty-main-image' in request.FILES:
-            image_file = request.FILES['realty-main-image']
-            saved_name = storageService.saveItem(image_file)
-            ItemImage.objects.create(
-                image_url=saved_name,
-                order=0,
-                realty=instance
-            )
+        try:
+            stored = storageService.saveItems([image_file for image_file, _ in uploads])
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if 'realty-secondary-images' in request.FILES:
-            for image_file in request.FILES.getlist('realty-secondary-images'):
-                saved_name = storageService.saveItem(image_file)
-                ItemImage.objects.create(
-                    image_url=saved_name,
-                    order=1,
-                    realty=instance
-                )
-                
+        try:
+            with transaction.atomic():
+                instance.save()
+                ItemImage.objects.bulk_create([
+                    ItemImage(image_url=item.name, order=order, realty=instance)
+                    for item, (_, order) in zip(stored, uploads)
+                ])
+                transaction.on_commit(lambda: [storageService.scheduleDerivatives(item.name) for item in stored])
+        except Exception:
+            storageService.discardItems(stored)
+            raise
+
+        self.invalidate(instance)
 
         serializer = RealtySerializer(instance, context={'request': request})
         response = RestResponse(
@@ -195,6 +257,7 @@ class RealtyViewSet(ModelViewSet):
 
         instance.deleted_at = timezone.now()
         instance.save()
+        self.invalidate(instance)
 
         return Response({
             "status": {
@@ -207,7 +270,47 @@ class RealtyViewSet(ModelViewSet):
             }
         }, status=200)
 
-    
+
+# async read path (ASYNC_READ_VIEWS): validators and cache hits stay on the event
+# loop, only a cache miss runs the viewset builders in a worker thread
+
+async def realty_list_async(request):
+    etag = await responseCache.aetag("realty-list", request.GET, ["realty"])
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    def build():
+        return viewset_for(RealtyViewSet, "list", request).build_list()
+
+    try:
+        data = await responseCache.agetOrSet("realty-list", request.GET, ["realty"], sync_to_async(build))
+    except API_ERRORS as e:
+        return api_error(e)
+    return json_response(data, etag)
+
+
+async def realty_detail_async(request, pk):
+    try:
+        realty_id = uuid.UUID(pk)
+    except ValueError:
+        return api_error(Http404("Realty not found"))
+
+    scopes = [f"realty:{realty_id}"]
+    etag = await responseCache.aetag(f"realty:{realty_id}", request.GET, scopes)
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    def build():
+        return viewset_for(RealtyViewSet, "retrieve", request, pk=pk).build_detail()
+
+    try:
+        data = await responseCache.agetOrSet(f"realty:{realty_id}", request.GET, scopes, sync_to_async(build))
+    except API_ERRORS as e:
+        return api_error(e)
+    return json_response(data, etag)
+
 # -----------------------------------------------------------------------------------------------
 
 @api_view(["POST"])
@@ -230,52 +333,132 @@ def RealtySearchViewSet(request):
             realty_group__slug__in=data["Checkboxes"]
         )
 
-    queryset = queryset.annotate(
-        avg_rating=Coalesce(Avg("feedbacks__rate"), 0.0)
-    )
-
     if "Rating" in data:
         queryset = queryset.filter(avg_rating__gte=data["Rating"])
-    
-  
-
-    queryset = queryset.distinct()
 
-    user_access = None
     login = data.get("login")
+    scopes = ["realty", f"liked:{login}"]
 
-    if login:
-        user_access = UserAccess.objects.filter(login=login).first()
+    if data.get("StartDate"):
+        scopes.append("occupancy")
 
-    result = RealtySerializer(
-        queryset,
-        many=True,
-        context={
-            "request": request,
-            "user_access": user_access
-        }
-    ).data
+    def build():
+        nonlocal queryset
+        if data.get("StartDate"):
+            queryset = occupancyService.excludeBusy(queryset, data["StartDate"], data["EndDate"])
+
+        field_params = RealtySerializer.parse_field_params(request.query_params)
+        queryset = RealtySerializer.setup_eager_loading(queryset, field_params)
+
+        paginator = RealtyKeysetPagination()
+        page = paginator.paginate_queryset(queryset, request)
+
+        user_access = None
+
+        if login:
+            user_access = UserAccess.objects.filter(login=login).first()
+
+        result = RealtySerializer(
+            page,
+            many=True,
+            context={
+                "request": request,
+                "user_access": user_access,
+                "liked_map": likedRealtyAccessor.getLikedMap(user_access, [realty.id for realty in page]),
+                **field_params
+            }
+        ).data
+
+        return paginator.get_paginated_response(result).data
+
+    params = {"body": data, "query": dict(request.query_params.lists())}
+    return Response(responseCache.getOrSet("realty-search", params, scopes, build), status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def realtyCalendar(request, id):
+    if not Realty.objects.filter(id=id, deleted_at__isnull=True).exists():
+        return Response(
+            RestResponse(
+                RestStatus(False, 404, "Realty not found"),
+                None
+            ).to_dict(),
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    today = timezone.localdate()
+    try:
+        start = parse_date(request.query_params.get("from") or "") or today
+        end = parse_date(request.query_params.get("to") or "") or start + datetime.timedelta(days=90)
+    except ValueError:
+        # well formed but not a real date, e.g. 2026-13-45
+        return Response(
+            RestResponse(
+                RestStatus(False, 400, "Invalid date range"),
+                "'from' and 'to' must be dates as YYYY-MM-DD"
+            ).to_dict(),
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if end <= start or (end - start).days > settings.CALENDAR_MAX_DAYS:
+        return Response(
+            RestResponse(
+                RestStatus(False, 400, "Invalid date range"),
+                f"'to' must be after 'from' and at most {settings.CALENDAR_MAX_DAYS} days later"
+            ).to_dict(),
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    occupied = calendarService.getOccupied(id, start, end)
 
     response = RestResponse(
         status=RestStatus(True, 200, "OK"),
-        data=result
+        data={
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "occupied": [
+                {"start": interval_start.isoformat(), "end": interval_end.isoformat()}
+                for interval_start, interval_end in occupied
+            ]
+        }
     )
-
     return Response(response.to_dict(), status=status.HTTP_200_OK)
 
 
+class RealtyAdminTable(AdminTable):
+    columns = [
+        ("Name", "name"),
+        ("Description", "description_preview"),
+        ("Slug", "slug"),
+        ("Price", "price"),
+        ("Country", "city__country__name"),
+        ("City", "city__name"),
+        ("Group", "realty_group__name"),
+    ]
+    # only the shown prefix of the description leaves the database
+    annotations = {"description_preview": Substr("description", 1, 100)}
+    formatters = {"description_preview": lambda text: text + "..."}
+    ordering_fields = {
+        "name": "name",
+        "slug": "slug",
+        "price": "price",
+        "country": "city__country__name",
+        "city": "city__name",
+        "group": "realty_group__name",
+    }
+    default_ordering = "name"
+    search_fields = ["name", "slug", "city__name", "realty_group__name"]
+    export_name = "realties"
+
+    def get_queryset(self):
+        return Realty.objects.filter(deleted_at__isnull=True)
+
+
+realtyAdminTable = RealtyAdminTable()
+
+
 def getRealtiesTable(request):
-    realties = Realty.objects.all()
-    tableBodyContent = ""
-    for realty in realties:
-        if realty.deleted_at is not None:
-            continue
-        tableBodyContent +=  f"<tr><td>{realty.name}</td> <td>{realty.description[:100] + "..."}</td> <td>{realty.slug}</td> <td>{realty.price}</td> <td>{realty.city.country.name}</td> <td>{realty.city.name}</td> <td>{realty.realty_group.name}</td> </tr>"
-        response = RestResponse(
-            status=RestStatus(True, 200, "Ok"),
-            data = tableBodyContent
-        )
-    return JsonResponse(response.to_dict(), status=200)
+    return realtyAdminTable.response(request)
 
 
 # -----------------------------------------------------------------------------------------------
@@ -293,26 +476,27 @@ class LikedRealtyViewSet(ModelViewSet):
         return LikedRealtySerializer
     
     def get_queryset(self):
-        queryset = LikedRealty.objects.select_related(
-            'user_access',
-            'realty',
-            'realty__city',        
-            'realty__realty_group' 
-        ).prefetch_related(
-            'realty__images',      
-            'realty__feedbacks',   
-            'realty__booking_items'
-        )
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, EagerLoadingMixin):
+            queryset = serializer_class.setup_eager_loading(queryset, self.get_serializer_context())
 
         login = self.request.query_params.get('login')
         if login:
             queryset = queryset.filter(user_access__login__iexact=login)
         return queryset
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'list':
+            context.update(RealtySerializer.parse_field_params(self.request.query_params))
+        return context
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         instance = serializer.save()
+        responseCache.bump(f"liked:{instance.user_access.login}")
 
         read_serializer = LikedRealtyListSerializer(instance, context={'request': request}) 
 
@@ -332,12 +516,17 @@ class LikedRealtyViewSet(ModelViewSet):
         if login:
             user_access = UserAccess.objects.filter(login__iexact=login).first()
 
+        liked_realties = list(queryset)
         serializer = self.get_serializer(
-            queryset,
+            liked_realties,
             many=True,
             context={
-                "request": request,
-                "user_access": user_access
+                **self.get_serializer_context(),
+                "user_access": user_access,
+                "liked_map": likedRealtyAccessor.getLikedMap(
+                    user_access,
+                    [liked.realty_id for liked in liked_realties]
+                )
             }
         )
 
@@ -351,6 +540,7 @@ class LikedRealtyViewSet(ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         instance.delete()
+        responseCache.bump(f"liked:{instance.user_access.login}")
 
         return Response({
             "status": {
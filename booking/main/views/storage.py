@@ -0,0 +1,262 @@
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_http_methods
+from asgiref.sync import sync_to_async
+from backend.services import DiskStorageService
+import re
+
+
+storageService = DiskStorageService()
+
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class RangeFile:
+    """
+    Read-only view of `length` bytes of a file starting at `start`, streamed
+    by FileResponse for partial content.
+    """
+    def __init__(self, file, start: int, length: int):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header: str, size: int):
+    """
+    Returns the inclusive `(start, end)` of a single byte range, or None when
+    the header should be ignored (malformed or multiple ranges).
+    """
+    match = RANGE_HEADER.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def if_range_matches(request, etag: str, modified: float) -> bool:
+    value = request.META.get("HTTP_IF_RANGE")
+    if not value:
+        return True
+    if value.startswith('"'):
+        return value == etag
+    return parse_http_date_safe(value) == int(modified)
+
+def offloaded_response(path, mime_type):
+    # the front proxy reads the file itself and answers Range on its own
+    header = settings.STORAGE_SENDFILE_HEADER
+    response = HttpResponse(content_type=mime_type)
+    if header.lower() == "x-accel-redirect":
+        relative = path.relative_to(storageService.basePath).as_posix()
+        response[header] = f"{settings.STORAGE_ACCEL_PREFIX.rstrip('/')}/{relative}"
+    else:
+        response[header] = str(path)
+    return response
+
+
+def resolve_item(request, itemId):
+    size_name = request.GET.get("size")
+    if size_name and size_name not in settings.IMAGE_DERIVATIVES:
+        raise Http404("Unknown size")
+
+    accepts_webp = "image/webp" in request.META.get("HTTP_ACCEPT", "")
+    try:
+        name = storageService.resolveItem(itemId, size_name, accepts_webp)
+        path = storageService.getItemPath(name)
+        mime_type = storageService.tryGetMimeType(name)
+        stat = path.stat()
+    except (FileNotFoundError, ValueError):
+        raise Http404("Item not found")
+    return size_name, name, path, mime_type, stat
+
+
+def item_etag(name, stat) -> str:
+    # a derivative can be re-rendered under its name, so the file's mtime and
+    # size are part of the validator
+    return f'"{name}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def item_headers(response, itemId, size_name, name, stat, etag):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    # errors (412, 416) must not be pinned by a proxy or browser
+    if response.status_code in (200, 206, 304):
+        if not size_name:
+            # saved originals are never rewritten
+            patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+        elif name != itemId:
+            patch_cache_control(response, public=True, max_age=settings.IMAGE_DERIVATIVE_MAX_AGE)
+        else:
+            # the original stands in until the derivative is rendered
+            patch_cache_control(response, public=True, max_age=60)
+    if size_name:
+        patch_vary_headers(response, ("Accept",))
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+def item(request, itemId):
+    size_name, name, path, mime_type, stat = resolve_item(request, itemId)
+
+    etag = item_etag(name, stat)
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = file_response(request, name, path, stat, mime_type, etag)
+    return item_headers(response, itemId, size_name, name, stat, etag)
+
+
+@require_http_methods(["GET", "HEAD"])
+async def item_async(request, itemId):
+    # filesystem calls block, they run in the shared thread pool rather than
+    # the request's own sync thread
+    size_name, name, path, mime_type, stat = await sync_to_async(resolve_item, thread_sensitive=False)(request, itemId)
+
+    etag = item_etag(name, stat)
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = await async_file_response(request, name, path, stat, mime_type, etag)
+    return item_headers(response, itemId, size_name, name, stat, etag)
+
+
+def requested_range(request, size, etag, modified):
+    """The `(start, end)` to serve, None for the whole file; raises RangeNotSatisfiable."""
+    range_header = request.META.get("HTTP_RANGE")
+    if range_header and if_range_matches(request, etag, modified):
+        return parse_range(range_header, size)
+    return None
+
+
+def range_not_satisfiable(size):
+    response = HttpResponse(status=416)
+    response["Content-Range"] = f"bytes */{size}"
+    return response
+
+
+def content_headers(response, start, end, size, byte_range):
+    response["Content-Length"] = str(end - start + 1)
+    response["Accept-Ranges"] = "bytes"
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+def file_response(request, name, path, stat, mime_type, etag):
+    if settings.STORAGE_SENDFILE_HEADER:
+        return offloaded_response(path, mime_type)
+
+    size = stat.st_size
+    try:
+        byte_range = requested_range(request, size, etag, stat.st_mtime)
+    except RangeNotSatisfiable:
+        return range_not_satisfiable(size)
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1
+    status_code = 206 if byte_range else 200
+
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=mime_type, status=status_code)
+    elif storageService.isCacheable(size):
+        # small hot items come from the in-process cache, large ones stream from disk
+        content = storageService.getItemBytes(name)
+        response = HttpResponse(content[start:end + 1], content_type=mime_type, status=status_code)
+    elif byte_range:
+        response = FileResponse(
+            RangeFile(storageService.openItem(name), start, length),
+            content_type=mime_type,
+            status=status_code
+        )
+    else:
+        # a plain file object lets the WSGI server use sendfile()
+        response = FileResponse(storageService.openItem(name), content_type=mime_type)
+    return content_headers(response, start, end, size, byte_range)
+
+
+async def async_file_response(request, name, path, stat, mime_type, etag):
+    if settings.STORAGE_SENDFILE_HEADER:
+        return offloaded_response(path, mime_type)
+
+    size = stat.st_size
+    try:
+        byte_range = requested_range(request, size, etag, stat.st_mtime)
+    except RangeNotSatisfiable:
+        return range_not_satisfiable(size)
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1
+    status_code = 206 if byte_range else 200
+
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=mime_type, status=status_code)
+    elif storageService.isCacheable(size):
+        content = await sync_to_async(storageService.getItemBytes, thread_sensitive=False)(name)
+        response = HttpResponse(content[start:end + 1], content_type=mime_type, status=status_code)
+    else:
+        response = StreamingHttpResponse(
+            stream_item(name, start, length),
+            content_type=mime_type,
+            status=status_code
+        )
+    return content_headers(response, start, end, size, byte_range)
+
+
+async def stream_item(name, start, length):
+    """
+    Async iterator over `length` bytes of an item from `start`. Only the
+    reads leave the event loop, so a slow client costs a suspended
+    coroutine instead of a worker thread.
+    """
+    file = await sync_to_async(storageService.openItem, thread_sensitive=False)(name)
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        file.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
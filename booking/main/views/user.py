@@ -20,15 +20,22 @@ from django.http import JsonResponse
 from main.filters import *
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.conf import settings
+from main.authentication import TokenPrincipal
+from main.tables import AdminTable
+from main.pagination import ProfileBookingPagination
 
 passwordRegex = re.compile(r"^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[!?@$&*])[A-Za-z\d@$!%*?&]{12,}$")
 
 userAccessAccessor = UserAccessAccessor()
 accessTokenAccessor = AccessTokenAccessor()
 
-kdfService = PbKdfService()
+kdfService = KdfService()
+passwordVerifier = PasswordVerifier(kdfService)
 jwtService = JwtService()
 randomService = DefaultRandomService()
+tokenRevocationService = TokenRevocationService()
+responseCache = ResponseCacheService()
 
 class UserViewSet(ModelViewSet):
     queryset = UserAccess.objects.filter(deleted_at__isnull = True)
@@ -44,7 +51,10 @@ class UserViewSet(ModelViewSet):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save()
+        try:
+            instance = serializer.save()
+        except KdfBusyError as e:
+            return kdfBusyResponse(e)
         
         response = RestResponse(
             status=RestStatus(True, 201, "Created"),
@@ -57,6 +67,15 @@ class UserViewSet(ModelViewSet):
         login = request.data.get('user-former-login')
         instance = get_object_or_404(UserAccess, login=login)
 
+        password = request.data.get('user-password')
+        if password:
+            salt = randomService.otp(12)
+            try:
+                instance.dk = passwordVerifier.dk(password, salt)
+            except KdfBusyError as e:
+                return kdfBusyResponse(e)
+            instance.salt = salt
+
         first_name = request.data.get('user-first-name')
         if first_name:
             instance.user_data.first_name = first_name
@@ -77,18 +96,22 @@ class UserViewSet(ModelViewSet):
         if birthdate:
             instance.birthdate = birthdate
 
-        password = request.data.get('user-password')
-        if password:
-            salt = randomService.otp(12)
-            instance.salt = salt
-            instance.dk = kdfService.dk(password, salt)
-
         role_id = request.data.get('user-role')
         if role_id:
             user_role = UserRole.objects.get(id=role_id)
             instance.user_role = user_role
 
         instance.save()
+        # names and logins are embedded in the feedback of realty responses;
+        # touching it changes their ETags as well
+        Feedback.objects.filter(user_access=instance).update(updated_at=timezone.now())
+        reviewed = Feedback.objects.filter(user_access=instance).values_list("realty_id", flat=True).distinct()
+        responseCache.bump(
+            f"profile:{request.data.get('user-former-login')}",
+            f"profile:{instance.login}",
+            "realty",
+            *(f"realty:{realtyId}" for realtyId in reviewed)
+        )
         serializer = UserAccessSerializer(instance, context={'request': request})
         response = RestResponse(
             status=RestStatus(True, 200, "Ok"),
@@ -100,6 +123,7 @@ class UserViewSet(ModelViewSet):
         instance = self.get_object()
         instance.deleted_at = timezone.now()
         instance.save()
+        responseCache.bump(f"profile:{instance.login}")
 
         response = RestResponse(
             status=RestStatus(True, 200, "Ok"),
@@ -108,38 +132,79 @@ class UserViewSet(ModelViewSet):
         return Response(response.to_dict(), status=200)
 
 
+def profile_scopes(login: str) -> list:
+    # booked realties are embedded, so realty edits retire the profile as well
+    return [f"profile:{login}", "realty"]
+
+
+def user_not_found():
+    return Response(
+        RestResponse(
+            RestStatus(False, 404, "User not found"),
+            None
+        ).to_dict(),
+        status=status.HTTP_404_NOT_FOUND
+    )
+
+
 @api_view(['GET'])
 def userDetail(request, login: str):
-    try:
+    """
+    Profile document: user data, cards and the most recent bookings, with
+    `meta.next` as the cursor for `api/user/<login>/bookings`. Assembled in a
+    fixed number of queries and cached until a profile, card or booking
+    write of this user.
+    """
+    def assemble():
         user = (
             UserAccess.objects
             .select_related('user_data', 'user_role')
-            .prefetch_related(
-                'booking_items__realty',
-                'feedbacks__realty',
-                'user_data__cards'
-            )
+            .prefetch_related('user_data__cards')
             .get(login=login, deleted_at__isnull=True)
         )
-    except UserAccess.DoesNotExist:
-        return Response(
-            RestResponse(
-                RestStatus(False, 404, "User not found"),
-                None
-            ).to_dict(),
-            status=status.HTTP_404_NOT_FOUND
+        paginator = ProfileBookingPagination()
+        bookingItems = paginator.paginate_queryset(
+            BookingItemShortSerializer.setup_eager_loading(BookingItem.objects.filter(user_access=user)),
+            request
         )
+        serializer = UserAccessSerializer(user, context={"bookingItems": bookingItems})
+        return {"data": serializer.data, "meta": paginator.get_meta()}
+
+    try:
+        profile = responseCache.getOrSet("user-profile", [login, request.GET], profile_scopes(login), assemble)
+    except UserAccess.DoesNotExist:
+        return user_not_found()
 
-    serializer = UserAccessSerializer(user)
     return Response(
         RestResponse(
             RestStatus(True, 200, "OK"),
-            serializer.data
+            profile["data"],
+            meta=profile["meta"]
         ).to_dict(),
         status=status.HTTP_200_OK
     )
 
 
+@api_view(['GET'])
+def userBookings(request, login: str):
+    userId = (
+        UserAccess.objects
+        .filter(login=login, deleted_at__isnull=True)
+        .values_list("id", flat=True)
+        .first()
+    )
+    if userId is None:
+        return user_not_found()
+
+    paginator = ProfileBookingPagination()
+    bookingItems = paginator.paginate_queryset(
+        BookingItemShortSerializer.setup_eager_loading(BookingItem.objects.filter(user_access_id=userId)),
+        request
+    )
+    serializer = BookingItemShortSerializer(bookingItems, many=True, context={"request": request})
+    return paginator.get_paginated_response(serializer.data)
+
+
 def authenticate(request):
     authorizationHeader = request.headers.get('Authorization') or request.META.get('HTTP_AUTHORIZATION')
  
@@ -167,11 +232,29 @@ def authenticate(request):
     userAccess = userAccessAccessor.getUserAccessByLogin(login, False)
     if(userAccess == None):
         raise ValueError("Authorization credentials rejected: invalid login")
-    if(kdfService.dk(password, userAccess.salt) != userAccess.dk):
+    if(not passwordVerifier.verify(password, userAccess.salt, userAccess.dk)):
         raise KeyError("Authorization credentials rejected: invalid password")
+
+    if kdfService.needsRehash(userAccess.dk):
+        # the password is known only now, upgrade the stored hash to the current KDF;
+        # when the pool is saturated the login still succeeds and a later one upgrades it
+        salt = randomService.otp(12)
+        try:
+            dk = passwordVerifier.dk(password, salt)
+        except KdfBusyError:
+            return userAccess
+        userAccess.salt, userAccess.dk = salt, dk
+        UserAccess.objects.filter(id=userAccess.id).update(salt=userAccess.salt, dk=userAccess.dk)
     return userAccess 
 
 
+def kdfBusyResponse(error: KdfBusyError) -> JsonResponse:
+    # every password hash waits for the same KDF pool, a full pool asks the client to retry
+    responseObj = RestResponse(status=RestStatus(False, 503, "Service Unavailable"), data={"error": error.__str__()})
+    response = JsonResponse(responseObj.to_dict(), status=503, safe=False)
+    response["Retry-After"] = "1"
+    return response
+
 def login(request):
     if request.method == "OPTIONS":
         return HttpResponse()
@@ -179,6 +262,8 @@ def login(request):
     userAccess = None
     try:
         userAccess = authenticate(request)
+    except KdfBusyError as e:
+        return kdfBusyResponse(e)
     except Exception as e:
         responseObj = RestResponse(status=RestStatus(False, 401, "Unauthorized"), data={"error": e.__str__()})
         return JsonResponse(responseObj.to_dict(), safe=False)
@@ -187,8 +272,8 @@ def login(request):
     access_token = AccessToken(
         jti=str(uuid.uuid4()),
         sub=userAccess.id,
-        iat=str(now),
-        exp=str(now + 1000000),
+        issued_at=datetime.datetime.fromtimestamp(now, tz=datetime.timezone.utc),
+        expires_at=datetime.datetime.fromtimestamp(now + settings.JWT_LIFETIME, tz=datetime.timezone.utc),
         iss="Booking_WEB",
         aud=str(userAccess.user_role.id),
         user_access=userAccess
@@ -198,8 +283,8 @@ def login(request):
     jwtPayload = {
         "jti": access_token.jti,
         "sub": str(access_token.sub),
-        "iat": access_token.iat,
-        "Exp": access_token.exp,
+        "iat": str(now),
+        "Exp": str(now + settings.JWT_LIFETIME),
         "iss": access_token.iss,
         "aud": access_token.aud,
         "FirstName": userAccess.user_data.first_name,
@@ -209,7 +294,7 @@ def login(request):
         "Login": userAccess.login,
         "Id": str(userAccess.id)
     }
-    jwt = jwtService.encodeJwt(jwtPayload)
+    jwt = jwtService.encodeJwt(jwtPayload, secret=settings.JWT_SECRET)
     request.session["AuthToken"] = jwt
 
     request.session["userAccess"] = {
@@ -220,10 +305,36 @@ def login(request):
     responseObj = RestResponse(status=RestStatus(True, 200, "Ok"), data=jwt)
     return JsonResponse(responseObj.to_dict(), safe=False)
 
+@api_view(['POST'])
+def logout(request):
+    if not isinstance(request.user, TokenPrincipal):
+        return Response(
+            RestResponse(
+                RestStatus(False, 401, "Unauthorized"),
+                "Bearer token required"
+            ).to_dict(),
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    tokenRevocationService.revoke(request.user.jti)
+    request.session.pop("AuthToken", None)
+    request.session.pop("userAccess", None)
+
+    return Response(
+        RestResponse(
+            RestStatus(True, 200, "Ok"),
+            "Logged out"
+        ).to_dict(),
+        status=status.HTTP_200_OK
+    )
+
 @csrf_exempt
 def register(request):
     data = json.loads(request.body)
-    errors = processSignUpData(data)
+    try:
+        errors = processSignUpData(data)
+    except KdfBusyError as e:
+        return kdfBusyResponse(e)
     print(errors)
     if errors.__len__() > 0:
         responseObj = RestResponse(status=RestStatus(False, 400, "Bad Request"), data={"errors": errors})
@@ -286,7 +397,7 @@ def processSignUpData(model: Any) -> Dict[str, str]:
         user_id = user_id,
         login = model["userLogin"],
         salt = salt,
-        dk = kdfService.dk(model["userPassword"], salt),
+        dk = passwordVerifier.dk(model["userPassword"], salt),
         user_role = UserRole.objects.get(id="SelfRegistered"),
         user_data = user_data
     )
@@ -300,16 +411,33 @@ def processSignUpData(model: Any) -> Dict[str, str]:
     return errors
 
 
+class UserAdminTable(AdminTable):
+    columns = [
+        ("First name", "user_data__first_name"),
+        ("Last name", "user_data__last_name"),
+        ("Email", "user_data__email"),
+        ("Login", "login"),
+        ("Birth date", "user_data__birth_date"),
+        ("Role", "user_role_id"),
+    ]
+    ordering_fields = {
+        "firstName": "user_data__first_name",
+        "lastName": "user_data__last_name",
+        "email": "user_data__email",
+        "login": "login",
+        "birthDate": "user_data__birth_date",
+        "role": "user_role_id",
+    }
+    default_ordering = "login"
+    search_fields = ["login", "user_data__first_name", "user_data__last_name", "user_data__email"]
+    export_name = "users"
+
+    def get_queryset(self):
+        return UserAccess.objects.filter(deleted_at__isnull=True)
+
+
+userAdminTable = UserAdminTable()
+
+
 def getUsersTable(request):
-    userAccesses = UserAccess.objects.all()
-    tableBodyContent = ""
-    for userAccess in userAccesses:
-        if userAccess.deleted_at is not None:
-            continue
-        tableBodyContent +=  f"<tr><td>{userAccess.user_data.first_name}</td> <td>{userAccess.user_data.last_name}</td> <td>{userAccess.user_data.email}</td> <td>{userAccess.login}</td> <td>{userAccess.user_data.birth_date}</td> <td>{userAccess.user_role.id}</td></tr>"
-                
-        response = RestResponse(
-            status=RestStatus(True, 200, "Ok"),
-            data = tableBodyContent
-        )
-    return JsonResponse(response.to_dict(), status=200)
\ No newline at end of file
+    return userAdminTable.response(request)
\ No newline at end of file